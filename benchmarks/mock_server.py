@@ -0,0 +1,564 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  mock_server.py
+#
+
+import argparse
+import json
+import threading
+import time
+import math
+import re
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
+
+
+def sample(schema: Dict[str, Any]) -> Any:
+    """
+    Generate a minimal instance of a JSON schema.
+
+    Args:
+        schema (dict): The JSON schema.
+
+    Returns:
+        Any: A value conforming to the schema.
+    """
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+
+    schema_type = schema.get("type", "object")
+    if isinstance(schema_type, list):
+        schema_type = schema_type[0]
+
+    match schema_type:
+        case "object":
+            return {
+                key: sample(value)
+                for key, value in schema.get("properties", {}).items()
+            }
+        case "array":
+            return [sample(schema.get("items", {}))] * schema.get("minItems", 1)
+        case "string":
+            return "mock"
+        case "integer" | "number":
+            return schema.get("minimum", 0)
+        case "boolean":
+            return True
+        case _:
+            return None
+
+
+class MockAPI:
+    """
+    Local OpenAI (Responses, Files and Batch API) and Mistral (chat completions)
+    compatible API.
+
+    Responses are returned after `latency` seconds. Streaming responses consist
+    of `chunks` text deltas separated by `chunk_delay` seconds. Batches complete
+    after `batch_polls` polls. Requested logprobs report `confidence` as the
+    probability of boolean answer tokens.
+
+    Args:
+        text (str): The text of plain responses.
+        latency (float): The number of seconds before responding.
+        chunks (int): The number of text deltas of streaming responses.
+        chunk_delay (float): The number of seconds between text deltas.
+        host (str): The address to listen on.
+        port (int): The port to listen on, 0 picks a free port.
+    """
+
+    def __init__(
+        self,
+        text: str = "hello",
+        latency: float = 0.0,
+        chunks: int = 5,
+        chunk_delay: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.text = text
+        self.latency = latency
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+        self.requests: List[Dict[str, Any]] = []
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        # The number of polls before a batch completes.
+        self.batch_polls = 2
+        # The custom ids of batch requests which fail.
+        self.failing_requests: set = set()
+        # The request prefixes seen, which are reported as cached tokens.
+        self.prefixes: set = set()
+        # The probability of the sampled token of boolean answers.
+        self.confidence = 0.9
+        self.lock = threading.RLock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "MockAPI":
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def answer(
+        self, response_format: Dict[str, Any] | None, reason: bool = True
+    ) -> str:
+        """
+        Return the response text for the requested response format.
+
+        Args:
+            response_format (dict | None): The `text.format` (OpenAI) or
+                `response_format` (Mistral) of the request.
+            reason (bool): Whether a JSON object answer includes a reason.
+
+        Returns:
+            str: The response text.
+        """
+        if not response_format:
+            return self.text
+        if response_format["type"] == "json_object":
+            return json.dumps({"answer": True} | ({"reason": "mock"} if reason else {}))
+
+        return json.dumps(sample(response_format.get("schema", {})))
+
+    def deltas(self, text: str) -> Iterator[str]:
+        size = max(1, -(-len(text) // self.chunks))
+        for start in range(0, len(text), size):
+            if start:
+                time.sleep(self.chunk_delay)
+            yield text[start : start + size]
+
+    def logprobs(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Return the token logprobs of a response text.
+
+        Args:
+            text (str): The response text.
+
+        Returns:
+            list: The logprobs of the tokens of the text, with the boolean
+                alternatives of `true` and `false` tokens.
+        """
+        logprobs = []
+        for token_id, token in enumerate(re.findall(r"\w+|[^\w\s]+|\s+", text)):
+            top_logprobs = [{"token": token, "logprob": 0.0}]
+            if token in ("true", "false"):
+                other = "false" if token == "true" else "true"
+                top_logprobs = [
+                    {"token": token, "logprob": math.log(self.confidence)},
+                    {"token": other, "logprob": math.log(1 - self.confidence)},
+                ]
+            logprobs.append(
+                {
+                    "token": token,
+                    "token_id": token_id,
+                    "bytes": list(token.encode()),
+                    "logprob": top_logprobs[0]["logprob"],
+                    "top_logprobs": [
+                        alternative
+                        | {
+                            "token_id": token_id,
+                            "bytes": list(alternative["token"].encode()),
+                        }
+                        for alternative in top_logprobs
+                    ],
+                }
+            )
+
+        return logprobs
+
+    def cached_tokens(self, key: Any, prefix: str) -> int:
+        """
+        Return the number of cached tokens of a request prefix, which is cached
+        from the second request onwards.
+
+        Args:
+            key (Any): The prompt cache key of the request.
+            prefix (str): The static prefix of the request.
+
+        Returns:
+            int: The number of cached tokens.
+        """
+        with self.lock:
+            cached = (key, prefix) in self.prefixes
+            self.prefixes.add((key, prefix))
+
+        return len(prefix) // 4 if cached else 0
+
+    def openai_response(self, request: Dict[str, Any], text: str) -> Dict[str, Any]:
+        cached_tokens = self.cached_tokens(
+            request.get("prompt_cache_key"), request.get("instructions") or ""
+        )
+        content = {"type": "output_text", "text": text, "annotations": []}
+        if "message.output_text.logprobs" in request.get("include", []):
+            content["logprobs"] = self.logprobs(text)
+        return {
+            "id": f"resp_{uuid.uuid4().hex}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": "completed",
+            "model": request.get("model"),
+            "output": [
+                {
+                    "type": "message",
+                    "id": f"msg_{uuid.uuid4().hex}",
+                    "status": "completed",
+                    "role": "assistant",
+                    "content": [content],
+                }
+            ],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": len(request.get("input", "")) // 4,
+                "input_tokens_details": {"cached_tokens": cached_tokens},
+                "output_tokens": len(text) // 4,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": (len(request.get("input", "")) + len(text)) // 4,
+            },
+        }
+
+    def openai_events(
+        self, request: Dict[str, Any], text: str
+    ) -> Iterator[Dict[str, Any]]:
+        response = self.openai_response(request, text)
+        item_id = response["output"][0]["id"]
+        yield {"type": "response.created", "response": response | {"output": []}}
+        for delta in self.deltas(text):
+            yield {
+                "type": "response.output_text.delta",
+                "item_id": item_id,
+                "output_index": 0,
+                "content_index": 0,
+                "delta": delta,
+                "logprobs": [],
+            }
+        yield {"type": "response.completed", "response": response}
+
+    def mistral_response(self, request: Dict[str, Any], text: str) -> Dict[str, Any]:
+        prompt_tokens = (
+            sum(len(str(message.get("content", ""))) for message in request["messages"])
+            // 4
+        )
+        system = [m for m in request["messages"] if m.get("role") == "system"]
+        cached_tokens = self.cached_tokens(
+            None, str(system[0].get("content", "")) if system else ""
+        )
+        choice = {
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop",
+        }
+        if request.get("logprobs"):
+            choice["logprobs"] = {"content": self.logprobs(text)}
+        return {
+            "id": uuid.uuid4().hex,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model"),
+            "choices": [choice],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(text) // 4,
+                "total_tokens": prompt_tokens + len(text) // 4,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }
+
+    def mistral_events(
+        self, request: Dict[str, Any], text: str
+    ) -> Iterator[Dict[str, Any]]:
+        response = self.mistral_response(request, text)
+        chunk = {
+            "id": response["id"],
+            "object": "chat.completion.chunk",
+            "created": response["created"],
+            "model": response["model"],
+        }
+        for delta in self.deltas(text):
+            yield chunk | {
+                "choices": [
+                    {"index": 0, "delta": {"content": delta}, "finish_reason": None}
+                ],
+            }
+        # The last chunk reports the usage.
+        yield chunk | {
+            "choices": [
+                {"index": 0, "delta": {"content": ""}, "finish_reason": "stop"}
+            ],
+            "usage": response["usage"],
+        }
+
+    def add_file(self, content: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        file_id = f"file-{uuid.uuid4().hex}"
+        with self.lock:
+            self.files[file_id] = content
+
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+
+    def create_batch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": request["endpoint"],
+            "input_file_id": request["input_file_id"],
+            "completion_window": request["completion_window"],
+            "status": "validating",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "polls": 0,
+        }
+        with self.lock:
+            self.batches[batch["id"]] = batch
+
+        return batch
+
+    def poll_batch(self, batch_id: str) -> Dict[str, Any]:
+        """
+        Return a batch, which progresses through `in_progress` to `completed`
+        after `batch_polls` polls.
+
+        Args:
+            batch_id (str): The id of the batch.
+
+        Returns:
+            dict: The batch.
+        """
+        with self.lock:
+            batch = self.batches[batch_id]
+            batch["polls"] += 1
+            if batch["status"] != "completed" and batch["polls"] >= self.batch_polls:
+                self._complete_batch(batch)
+            elif batch["status"] == "validating":
+                batch["status"] = "in_progress"
+
+        return batch
+
+    def _complete_batch(self, batch: Dict[str, Any]) -> None:
+        outputs, errors = [], []
+        for line in self.files[batch["input_file_id"]].splitlines():
+            request = json.loads(line)
+            if request["custom_id"] in self.failing_requests:
+                errors.append(
+                    {
+                        "id": f"batch_req_{uuid.uuid4().hex}",
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 400,
+                            "body": {"error": {"message": "Mock failure"}},
+                        },
+                        "error": None,
+                    }
+                )
+                continue
+            body = request["body"]
+            text = self.answer(body.get("text", {}).get("format"))
+            outputs.append(
+                {
+                    "id": f"batch_req_{uuid.uuid4().hex}",
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "body": self.openai_response(body, text),
+                    },
+                    "error": None,
+                }
+            )
+
+        def store(lines: List[Dict[str, Any]]) -> str | None:
+            if not lines:
+                return None
+            file_id = f"file-{uuid.uuid4().hex}"
+            self.files[file_id] = "".join(
+                json.dumps(line) + "\n" for line in lines
+            ).encode()
+            return file_id
+
+        batch["status"] = "completed"
+        batch["output_file_id"] = store(outputs)
+        batch["error_file_id"] = store(errors)
+        batch["request_counts"] = {
+            "total": len(outputs) + len(errors),
+            "completed": len(outputs),
+            "failed": len(errors),
+        }
+
+    def _handler(self) -> type:
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_events(self, events: Iterator[Dict[str, Any]], done: bool):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for event in events:
+                    name = f"event: {event['type']}\n" if "type" in event else ""
+                    self.wfile.write(f"{name}data: {json.dumps(event)}\n\n".encode())
+                    self.wfile.flush()
+                if done:
+                    self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def do_GET(self) -> None:
+                parts = self.path.split("/")
+                if self.path.startswith("/v1/batches/"):
+                    if parts[3] not in api.batches:
+                        self._send_json(404, {"error": {"message": "No such batch"}})
+                        return
+                    self._send_json(200, api.poll_batch(parts[3]))
+                elif self.path.startswith("/v1/files/") and self.path.endswith(
+                    "/content"
+                ):
+                    content = api.files.get(parts[3])
+                    if content is None:
+                        self._send_json(404, {"error": {"message": "No such file"}})
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                else:
+                    self._send_json(404, {"error": {"message": "Not found"}})
+
+            def _upload(self, body: bytes) -> None:
+                from email.parser import BytesParser
+
+                message = BytesParser().parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+                    + body
+                )
+                fields = {
+                    part.get_param("name", header="content-disposition"): part
+                    for part in message.get_payload()
+                }
+                self._send_json(
+                    200,
+                    api.add_file(
+                        fields["file"].get_payload(decode=True),
+                        fields["file"].get_filename(),
+                        fields["purpose"].get_payload(decode=True).decode(),
+                    ),
+                )
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                if self.path == "/v1/files":
+                    self._upload(body)
+                    return
+                request = json.loads(body or b"{}")
+                if self.path == "/v1/batches":
+                    self._send_json(200, api.create_batch(request))
+                    return
+                with api.lock:
+                    api.requests.append({"path": self.path} | request)
+                time.sleep(api.latency)
+
+                if self.path.endswith("/responses"):
+                    if "text" in request and "format" not in request["text"]:
+                        self._send_json(
+                            400,
+                            {"error": {"message": "Missing parameter: 'text.format'"}},
+                        )
+                        return
+                    text = api.answer(request.get("text", {}).get("format"))
+                    if request.get("stream"):
+                        self._send_events(api.openai_events(request, text), False)
+                    else:
+                        self._send_json(200, api.openai_response(request, text))
+                elif self.path.endswith("/chat/completions"):
+                    # Answer only boolean prompts don't ask for a reason.
+                    system = [
+                        str(message.get("content", ""))
+                        for message in request["messages"]
+                        if message.get("role") == "system"
+                    ]
+                    text = api.answer(
+                        request.get("response_format"),
+                        reason=any("reason" in content for content in system),
+                    )
+                    if request.get("stream"):
+                        self._send_events(api.mistral_events(request, text), True)
+                    else:
+                        self._send_json(200, api.mistral_response(request, text))
+                else:
+                    self._send_json(404, {"error": {"message": "Not found"}})
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve a local OpenAI and Mistral compatible mock API."
+    )
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--chunks", type=int, default=5)
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    parser.add_argument("--text", type=str, default="hello")
+    args = parser.parse_args()
+
+    api = MockAPI(
+        text=args.text,
+        latency=args.latency,
+        chunks=args.chunks,
+        chunk_delay=args.chunk_delay,
+        port=args.port,
+    )
+    print(f"Serving on {api.url}")
+    api.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
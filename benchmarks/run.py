@@ -0,0 +1,422 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  run.py
+#
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from benchmarks.mock_server import MockAPI
+
+BENCHMARKS = ("cold_start", "overhead", "daemon", "batch", "memory")
+# The commands supported by every benchmarked backend.
+BACKENDS = {
+    "openai": ("prompt", "bool", "structured"),
+    "mistral": ("prompt", "bool"),
+}
+
+# Metrics for which a lower value is better, used by `compare`.
+LOWER_IS_BETTER = ("ms", "bytes")
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["summary", "tags"],
+    "additionalProperties": False,
+}
+
+CLAI = [sys.executable, "-c", "import sys, clai; sys.argv[0] = 'clai'; clai.main()"]
+
+
+def write_config(directory: str, url: str, token_counting: str) -> str:
+    """
+    Write a config with an instance per backend pointing to the mock API.
+
+    Args:
+        directory (str): The directory to write the config to.
+        url (str): The URL of the mock API.
+        token_counting (str): The token counting mode of the instances.
+
+    Returns:
+        str: The path of the config.
+    """
+    instance = {
+        "token": "benchmark",
+        "max_tokens": 10_000_000,
+        "system": "You are a helpful assistant.",
+        "token_counting": token_counting,
+    }
+    config = {
+        "backends": {
+            "openai": {
+                "default": instance | {"model": "gpt-5.4", "base_url": f"{url}/v1"}
+            },
+            "mistral": {
+                "default": instance
+                | {"model": "mistral-small-latest", "server_url": url}
+            },
+        }
+    }
+    path = os.path.join(directory, "config.yaml")
+    with open(path, "w") as config_fh:
+        # JSON is a subset of YAML.
+        json.dump(config, config_fh)
+
+    return path
+
+
+def command_args(command: str, schema_path: str) -> List[str]:
+    if command == "structured":
+        return [command, "Summarize the input.", "--schema", schema_path]
+    return [command, "Summarize the input."]
+
+
+class Suite:
+    """
+    Runs the benchmarks against a mock API and collects the results.
+
+    Args:
+        iterations (int): The number of samples per measurement.
+        latency (float): The latency in seconds of the mock API for throughput
+            benchmarks. Overhead benchmarks always use a latency of 0.
+        requests (int): The number of requests of the batch benchmark.
+        concurrency (int): The concurrency of the batch benchmark.
+        input_size (int): The number of stdin bytes of the memory benchmark.
+        token_counting (str): The token counting mode of the instances.
+    """
+
+    def __init__(
+        self,
+        iterations: int = 10,
+        latency: float = 0.05,
+        requests: int = 200,
+        concurrency: int = 16,
+        input_size: int = 16 * 1024 * 1024,
+        token_counting: str = "approximate",
+    ) -> None:
+        self.iterations = iterations
+        self.latency = latency
+        self.requests = requests
+        self.concurrency = concurrency
+        self.input_size = input_size
+        self.token_counting = token_counting
+        self.results: List[Dict[str, Any]] = []
+
+    def record(
+        self,
+        benchmark: str,
+        backend: str,
+        command: str,
+        samples: List[float],
+        unit: str,
+    ) -> None:
+        self.results.append(
+            {
+                "benchmark": benchmark,
+                "backend": backend,
+                "command": command,
+                "value": statistics.median(samples),
+                "min": min(samples),
+                "max": max(samples),
+                "unit": unit,
+                "samples": len(samples),
+            }
+        )
+
+    def clai(self, *args: str, **kwargs: Any) -> subprocess.CompletedProcess:
+        result = subprocess.run(
+            [*CLAI, "--config", self.config_path, *args],
+            capture_output=True,
+            text=True,
+            env=os.environ | {"PYTHONPATH": os.getcwd()},
+            **kwargs,
+        )
+        if result.returncode not in (0, 1):
+            raise Exception(f"clai {' '.join(args)} failed: {result.stdout}")
+        return result
+
+    def timed(self, func: Callable[[], Any]) -> List[float]:
+        samples = []
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
+
+    def cold_start(self) -> None:
+        for backend, commands in BACKENDS.items():
+            for command in commands:
+                args = ["--backend", backend, "--instance", "default", "--no-daemon"]
+                args += command_args(command, self.schema_path)
+                self.record(
+                    "cold_start",
+                    backend,
+                    command,
+                    self.timed(lambda: self.clai(*args, stdin=subprocess.DEVNULL)),
+                    "ms",
+                )
+
+    def overhead(self) -> None:
+        from clai.commands import run_command
+        from clai.tools import get_client, read_config
+
+        config = read_config(self.config_path)
+        for backend, commands in BACKENDS.items():
+            client = get_client(config, backend, "default", debug=False)
+            for command in commands:
+                args = command_args(command, self.schema_path)
+
+                def call() -> None:
+                    run_command(
+                        client=client,
+                        command=command,
+                        prompt=args[1],
+                        stdin_lines=["The quick brown fox jumps over the lazy dog."],
+                        schema=self.schema_path,
+                    )
+
+                call()
+                self.record("overhead", backend, command, self.timed(call), "ms")
+
+    def daemon(self) -> None:
+        socket_path = os.path.join(self.directory, "daemon.sock")
+        daemon = subprocess.Popen(
+            [*CLAI, "--config", self.config_path, "--socket", socket_path, "serve"],
+            stderr=subprocess.PIPE,
+            text=True,
+            env=os.environ | {"PYTHONPATH": os.getcwd()},
+        )
+        try:
+            daemon.stderr.readline()
+            for backend, commands in BACKENDS.items():
+                for command in commands:
+                    args = ["--backend", backend, "--instance", "default"]
+                    args += ["--socket", socket_path]
+                    args += command_args(command, self.schema_path)
+                    self.clai(*args, stdin=subprocess.DEVNULL)
+                    self.record(
+                        "daemon",
+                        backend,
+                        command,
+                        self.timed(lambda: self.clai(*args, stdin=subprocess.DEVNULL)),
+                        "ms",
+                    )
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    def batch(self) -> None:
+        self.api.latency = self.latency
+        try:
+            for backend, commands in BACKENDS.items():
+                for command in commands:
+                    requests = "".join(
+                        json.dumps(
+                            {
+                                "command": command,
+                                "prompt": f"Summarize input {number}.",
+                                "schema": self.schema_path,
+                            }
+                        )
+                        + "\n"
+                        for number in range(self.requests)
+                    )
+                    args = ["--backend", backend, "--instance", "default"]
+                    args += ["batch", "--concurrency", str(self.concurrency)]
+                    samples = [
+                        self.requests / (duration / 1000)
+                        for duration in self.timed(
+                            lambda: self.clai(*args, input=requests)
+                        )
+                    ]
+                    self.record("batch", backend, command, samples, "requests/s")
+        finally:
+            self.api.latency = 0.0
+
+    def memory(self) -> None:
+        input_path = os.path.join(self.directory, "input.txt")
+        line = "2024-01-01T00:00:00Z INFO worker-3 request handled in 12 ms".ljust(99)
+        with open(input_path, "w") as input_fh:
+            for _ in range(self.input_size // 100):
+                input_fh.write(line + "\n")
+
+        for backend, commands in BACKENDS.items():
+            for command in commands:
+                args = ["--backend", backend, "--instance", "default", "--no-daemon"]
+                args += command_args(command, self.schema_path)
+                samples = []
+                for _ in range(self.iterations):
+                    with open(input_path) as input_fh:
+                        process = subprocess.Popen(
+                            [*CLAI, "--config", self.config_path, *args],
+                            stdin=input_fh,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL,
+                            env=os.environ | {"PYTHONPATH": os.getcwd()},
+                        )
+                        _, _, usage = os.wait4(process.pid, 0)
+                    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS.
+                    scale = 1 if sys.platform == "darwin" else 1024
+                    samples.append(usage.ru_maxrss * scale)
+                self.record("memory", backend, command, samples, "bytes")
+
+    def run(self, benchmarks: List[str]) -> Dict[str, Any]:
+        """
+        Run the benchmarks and return the results.
+
+        Args:
+            benchmarks (list[str]): The names of the benchmarks to run.
+
+        Returns:
+            dict: The environment, parameters and results of the benchmarks.
+        """
+        with tempfile.TemporaryDirectory() as directory, MockAPI() as api:
+            self.directory = directory
+            self.api = api
+            self.config_path = write_config(directory, api.url, self.token_counting)
+            self.schema_path = os.path.join(directory, "schema.json")
+            with open(self.schema_path, "w") as schema_fh:
+                json.dump(SCHEMA, schema_fh)
+
+            for benchmark in benchmarks:
+                getattr(self, benchmark)()
+
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "clai": get_version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "parameters": {
+                "iterations": self.iterations,
+                "latency": self.latency,
+                "requests": self.requests,
+                "concurrency": self.concurrency,
+                "input_size": self.input_size,
+                "token_counting": self.token_counting,
+            },
+            "results": self.results,
+        }
+
+
+def get_version() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("clai")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> List[str]:
+    """
+    Compare two benchmark results and list the regressions.
+
+    Args:
+        baseline (dict): The results of the baseline run.
+        current (dict): The results of the current run.
+        threshold (float): The relative change considered a regression.
+
+    Returns:
+        list[str]: A description of every regression.
+    """
+
+    def key(result: Dict[str, Any]) -> tuple:
+        return result["benchmark"], result["backend"], result["command"]
+
+    baseline_results = {key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        previous = baseline_results.get(key(result))
+        if previous is None or not previous["value"]:
+            continue
+        change = (result["value"] - previous["value"]) / previous["value"]
+        if result["unit"] not in LOWER_IS_BETTER:
+            change = -change
+        if change > threshold:
+            regressions.append(
+                f"{'/'.join(key(result))}: {previous['value']:.6g} -> {result['value']:.6g} {result['unit']} ({change:+.1%})"
+            )
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark clai against a local mock API."
+    )
+    parser.add_argument(
+        "--benchmarks",
+        type=lambda value: value.split(","),
+        default=list(BENCHMARKS),
+        help=f"Comma separated benchmarks to run (default: {','.join(BENCHMARKS)}).",
+    )
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--input-size", type=int, default=16 * 1024 * 1024)
+    parser.add_argument(
+        "--token-counting",
+        choices=("exact", "approximate", "off"),
+        default="approximate",
+    )
+    parser.add_argument(
+        "--output", type=str, help="Write the results to a file instead of stdout."
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        help="Baseline results to compare with. Exits 1 on regressions.",
+    )
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = Suite(
+        iterations=args.iterations,
+        latency=args.latency,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        input_size=args.input_size,
+        token_counting=args.token_counting,
+    ).run(args.benchmarks)
+
+    if args.output:
+        with open(args.output, "w") as output_fh:
+            json.dump(results, output_fh, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as baseline_fh:
+            regressions = compare(json.load(baseline_fh), results, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,72 +7,315 @@
 
 #!/usr/bin/env python
 
-import importlib
+import json
+import os
 import sys
+from typing import Any, Dict, Iterable, Iterator, Tuple
 
+from clai import timings
+from clai.batch import (
+    ClientRegistry,
+    map_requests,
+    read_requests,
+    run_batch,
+    run_map,
+)
+from clai.cache import CachedClient, get_response_cache
+from clai.chunked import run_chunked
+from clai.commands import run_command
+from clai.dedup import SingleFlight
+from clai.hedge import HedgedClient
+from clai.ledger import LedgerClient, get_ledger, parse_window
+from clai.offload import run_offloaded
+from clai.server import COMMANDS as DAEMON_COMMANDS
+from clai.server import (
+    ForwardedStream,
+    forward,
+    get_forwarded_environ,
+    get_socket_path,
+    serve,
+)
 from clai.tools import (
-    get_backend_instance_config,
+    get_cache_namespace,
+    get_client,
     parse_arguments,
     read_config,
+    read_records,
     read_stdin,
 )
 
 
+def write_results(results: Iterable[Dict[str, Any]]) -> bool:
+    """
+    Write result records as NDJSON to stdout as soon as they become available.
+
+    Args:
+        results (iterable): The result records.
+
+    Returns:
+        bool: True when at least one of the records reports an error.
+    """
+    failed = False
+    for result in results:
+        failed = failed or result["error"] is not None
+        print(json.dumps(result), flush=True)
+
+    return failed
+
+
+def write_stream(chunks: Iterable[str], end: str = "\n") -> None:
+    """
+    Write response text deltas to stdout as soon as they arrive.
+
+    Args:
+        chunks (iterable): The response text deltas.
+        end (str): Written after the last delta.
+    """
+    for chunk in chunks:
+        timings.mark_first_token()
+        sys.stdout.write(chunk)
+        sys.stdout.flush()
+    sys.stdout.write(end)
+    sys.stdout.flush()
+
+
 def main() -> None:
+    hedged_clients: Dict[Tuple[str, str], HedgedClient] = {}
+    dedup = None
     try:
         args = parse_arguments()
-        backend_config = get_backend_instance_config(
-            config=read_config(args.config),
-            backend=args.backend,
-            instance=args.instance,
-        )
-        Client = getattr(
-            importlib.import_module(f"clai.backend.{args.backend}"), "Client"
-        )
-        client = Client(**backend_config._asdict() | {"debug": args.debug})
-
-        def prepare_prompt_and_stdin(prompt: str) -> tuple[str, list[str]]:
-            stdin_lines = list(read_stdin())
-            if not prompt and stdin_lines:
-                return "".join(stdin_lines).strip(), []
-
-            return prompt, stdin_lines
-
-        match args.command:
-            case "prompt":
-                prompt_str, stdin_lines = prepare_prompt_and_stdin(args.prompt)
-                if not prompt_str:
-                    print("No prompt provided via argument or stdin.")
-                    sys.exit(1)
-                print(client.prompt(prompt=prompt_str, stdin=lambda: iter(stdin_lines)))
-            case "bool":
-                prompt_str, stdin_lines = prepare_prompt_and_stdin(args.prompt)
-                if not prompt_str:
-                    print("No prompt provided via argument or stdin.")
-                    sys.exit(1)
-                exit_code, response = client.bool_prompt(
-                    prompt=prompt_str, stdin=lambda: iter(stdin_lines)
-                )
-                print(response)
+        if getattr(args, "chunked", False) and getattr(args, "stream", False):
+            raise Exception("`--chunked` can not be combined with `--stream`.")
+        if getattr(args, "dedup", False) and args.offload:
+            raise Exception("`--dedup` can not be combined with `--offload`.")
+        if args.timings or args.timings_trace:
+            timings.enable()
+        # Streamed structured output consists of complete NDJSON lines.
+        stream_end = "" if args.command == "structured" else "\n"
+
+        if args.command == "serve":
+            serve(
+                socket_path=get_socket_path(args.socket),
+                config_path=args.config,
+                backend=args.backend,
+                instance=args.instance,
+            )
+            sys.exit(0)
+
+        # Debug output is written by the backend clients and hedge counters and
+        # timings are reported per process, so none of them is forwarded.
+        if args.command in DAEMON_COMMANDS and not (
+            args.debug or args.no_daemon or args.hedge_after or timings.enabled()
+        ):
+            schema = getattr(args, "schema", None)
+            config_path = os.path.abspath(os.path.expanduser(args.config))
+            forwarded = forward(
+                socket_path=get_socket_path(args.socket),
+                request={
+                    "config": config_path,
+                    "backend": args.backend,
+                    "instance": args.instance,
+                    "command": args.command,
+                    "prompt": args.prompt,
+                    "schema": schema and os.path.abspath(schema),
+                    "stream": getattr(args, "stream", False),
+                    "bool_mode": getattr(args, "bool_mode", "reason"),
+                    "chunked": getattr(args, "chunked", False),
+                    "overlap": getattr(args, "overlap", None),
+                    "concurrency": getattr(args, "concurrency", None),
+                    "no_cache": args.no_cache,
+                    "refresh": args.refresh,
+                    # Config variables and the config cache are resolved in
+                    # the environment of the client.
+                    "environ": get_forwarded_environ(config_path),
+                },
+                stdin_lines=read_stdin(),
+            )
+            if forwarded is not None:
+                exit_code, output = forwarded
+                if isinstance(output, ForwardedStream):
+                    write_stream(output, end=stream_end)
+                    exit_code = output.exit_code
+                elif output is not None:
+                    print(output)
                 sys.exit(exit_code)
-            case "structured":
-                prompt_str, stdin_lines = prepare_prompt_and_stdin(args.prompt)
-                if not prompt_str:
-                    print("No prompt provided via argument or stdin.")
-                    sys.exit(1)
-                if not hasattr(client, "structured"):
-                    print("Structured prompt is not supported by this backend.")
-                    sys.exit(2)
-                print(
-                    client.structured(
-                        prompt=prompt_str,
-                        stdin=lambda: iter(stdin_lines),
-                        schema=args.schema,
+
+        with timings.phase("config"):
+            config = read_config(args.config)
+
+        ledger = get_ledger(config)
+        if args.command == "stats":
+            if ledger is None:
+                raise Exception("The usage ledger is not configured in `config`.")
+            for report in ledger.stats(
+                window=parse_window(args.window),
+                backend=args.backend,
+                instance=args.instance,
+            ):
+                print(json.dumps(report))
+            sys.exit(0)
+
+        cache = None if args.no_cache else get_response_cache(config)
+
+        def client_factory(backend: str, instance: str) -> Any:
+            client = cached_client_factory(backend, instance)
+            if ledger is None:
+                return client
+
+            return LedgerClient(
+                client,
+                ledger=ledger,
+                backend=backend,
+                instance=instance,
+                model=get_cache_namespace(config, backend, instance).get("model"),
+            )
+
+        def cached_client_factory(backend: str, instance: str) -> Any:
+            def factory() -> Any:
+                client = get_client(
+                    config=config,
+                    backend=backend,
+                    instance=instance,
+                    debug=args.debug,
+                )
+                if args.hedge_after:
+                    client = HedgedClient(client, hedge_after=args.hedge_after / 1000)
+                    hedged_clients[(backend, instance)] = client
+                return client
+
+            if cache is None:
+                return factory()
+
+            return CachedClient(
+                factory=factory,
+                cache=cache,
+                namespace=get_cache_namespace(config, backend, instance),
+                refresh=args.refresh,
+                debug=args.debug,
+            )
+
+        if args.command in ("batch", "map") and args.offload:
+            # Batches are submitted directly, the cache, hedging and usage ledger
+            # don't apply.
+            clients = ClientRegistry(
+                lambda backend, instance: get_client(
+                    config=config, backend=backend, instance=instance, debug=args.debug
+                )
+            )
+        elif args.command in ("batch", "map"):
+            clients = ClientRegistry(client_factory)
+            if args.dedup:
+                dedup = SingleFlight()
+
+        if args.command == "batch":
+            with (
+                sys.stdin if args.requests == "-" else open(args.requests)
+            ) as requests_fh:
+                if args.offload:
+                    results = run_offloaded(
+                        requests=read_requests(requests_fh),
+                        clients=clients,
+                        backend=args.backend,
+                        instance=args.instance,
+                        batch_size=args.batch_size,
+                        poll_interval=args.poll_interval,
+                        max_poll_interval=args.max_poll_interval,
                     )
+                else:
+                    results = run_batch(
+                        requests=read_requests(requests_fh),
+                        clients=clients,
+                        backend=args.backend,
+                        instance=args.instance,
+                        concurrency=args.concurrency,
+                        ordered=not args.unordered,
+                        dedup=dedup,
+                    )
+                failed = write_results(results)
+            sys.exit(1 if failed else 0)
+
+        if args.command == "map" and args.offload:
+            failed = write_results(
+                run_offloaded(
+                    requests=map_requests(
+                        records=read_records(read_stdin(), args.lines),
+                        command=args.map_command,
+                        prompt=args.prompt,
+                        schema=args.schema,
+                        bool_mode=args.bool_mode,
+                    ),
+                    clients=clients,
+                    backend=args.backend,
+                    instance=args.instance,
+                    batch_size=args.batch_size,
+                    poll_interval=args.poll_interval,
+                    max_poll_interval=args.max_poll_interval,
+                )
+            )
+            sys.exit(1 if failed else 0)
+
+        if args.command == "map":
+            failed = write_results(
+                run_map(
+                    records=read_records(read_stdin(), args.lines),
+                    clients=clients,
+                    command=args.map_command,
+                    prompt=args.prompt,
+                    schema=args.schema,
+                    backend=args.backend,
+                    instance=args.instance,
+                    concurrency=args.concurrency,
+                    dedup=dedup,
+                    bool_mode=args.bool_mode,
                 )
+            )
+            sys.exit(1 if failed else 0)
+
+        client = client_factory(args.backend, args.instance)
+        if getattr(args, "chunked", False):
+            exit_code, output = run_chunked(
+                client=client,
+                command=args.command,
+                prompt=args.prompt,
+                stdin_lines=read_stdin(),
+                schema=getattr(args, "schema", None),
+                overlap=args.overlap,
+                concurrency=args.concurrency,
+            )
+            print(output)
+            sys.exit(exit_code)
+
+        exit_code, output = run_command(
+            client=client,
+            command=args.command,
+            prompt=args.prompt,
+            stdin_lines=read_stdin(),
+            schema=getattr(args, "schema", None),
+            stream=getattr(args, "stream", False),
+            bool_mode=getattr(args, "bool_mode", "reason"),
+        )
+        if isinstance(output, Iterator):
+            write_stream(output, end=stream_end)
+        else:
+            print(output)
+        sys.exit(exit_code)
+    except BrokenPipeError:
+        # The reader of stdout went away, silence the flush at interpreter exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
     except Exception as err:
         print(f"Failed to execute command. Reason: {err}")
         sys.exit(1)
+    finally:
+        for (backend, instance), client in hedged_clients.items():
+            summary = {"backend": backend, "instance": instance} | client.summary()
+            print(f"Hedge: {json.dumps(summary)}", file=sys.stderr)
+        if dedup is not None:
+            print(f"Dedup: {json.dumps(dedup.summary())}", file=sys.stderr)
+        if timings.enabled():
+            print(f"Timings: {json.dumps(timings.TIMINGS.summary())}", file=sys.stderr)
+            if args.timings_trace:
+                timings.write_trace(args.timings_trace)
 
 
 if __name__ == "__main__":
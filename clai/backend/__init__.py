@@ -5,10 +5,301 @@
 # This software is released under the MIT License.
 # See the LICENSE file in the project root for more information.
 
-from typing import Callable, Iterable, NoReturn, final
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    NoReturn,
+    TypeVar,
+    final,
+)
+
+from clai import ledger, timings
+from clai.backend.ratelimit import RateLimiter, get_retry_settings, is_retryable
+from clai.backend.transport import get_transport_settings
+
+T = TypeVar("T")
 
 SUPPORTED_BACKENDS = ["azure_openai", "openai", "mistral"]
 REASONING_EFFORTS = ("none", "minimal", "low", "medium", "high", "xhigh")
+TOKEN_COUNTING_MODES = ("exact", "approximate", "off")
+TOKEN_BATCH_SIZE = 1024 * 1024
+
+
+def approximate_token_count(data: str) -> int:
+    """
+    Return a cheap upper bound of the number of tokens of data.
+
+    Byte level BPE tokens always cover at least one byte, so the UTF-8 encoded
+    length is never lower than the actual token count.
+
+    Args:
+        data (str): The text to count.
+
+    Returns:
+        int: The upper bound of the token count.
+    """
+    if data.isascii():
+        return len(data)
+
+    return len(data.encode("utf-8"))
+
+
+@lru_cache(maxsize=64)
+def get_prompt_cache_key(model: str, instructions: str, text: str) -> str:
+    """
+    Derive the prompt cache key of requests sharing the same static prefix.
+
+    Requests with the same key are routed to the same provider cache, so the
+    tokens of their common prefix are only processed once.
+
+    Args:
+        model (str): The model or deployment of the request.
+        instructions (str): The instructions of the request.
+        text (str): The serialized output format of the request.
+
+    Returns:
+        str: The prompt cache key.
+    """
+    import hashlib
+
+    digest = hashlib.sha256("\0".join((model, instructions, text)).encode())
+
+    return f"clai-{digest.hexdigest()[:32]}"
+
+
+def _windows(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Join lines by newlines and yield the result in pieces of at least
+    `TOKEN_BATCH_SIZE` characters, cut after a line.
+    """
+    window: List[str] = []
+    length = 0
+    separator = ""
+    for line in lines:
+        window.append(line)
+        length += len(line) + 1
+        if length >= TOKEN_BATCH_SIZE:
+            yield separator + "\n".join(window)
+            window, length, separator = [], 0, "\n"
+    if window or not separator:
+        yield separator + "\n".join(window)
+
+
+class TokenCount(NamedTuple):
+    """
+    The token count of a request input.
+
+    Attributes:
+        total (int): The number of tokens counted.
+        token_counting (str): The token counting mode used to count `total`.
+    """
+
+    total: int
+    token_counting: str
+
+
+class BaseValidateTokenLength:
+    """
+    Track and enforce token length limits of a request input.
+
+    Backends implement `count_exact` and `max_token_bytes` for their tokenizer.
+    Text is tokenized in batches and a batch is rejected without tokenizing it
+    when a lower bound of its token count already exceeds the limit.
+
+    Attributes:
+        token_counting (str): One of `exact`, `approximate` or `off`.
+        total_tokens (int): Running total of token count.
+        max_tokens (int): Maximum allowed tokens.
+    """
+
+    def __init__(self, max_tokens: int, token_counting: str = "exact") -> None:
+        self.token_counting = token_counting
+        self.total_tokens = 0
+        self.max_tokens = max_tokens
+
+    def count_exact(self, batch: List[str]) -> int:
+        raise NotImplementedError
+
+    def max_token_bytes(self) -> int:
+        raise NotImplementedError
+
+    def encode(self, data: str) -> List[int]:
+        raise NotImplementedError
+
+    def decode(self, tokens: List[int]) -> str:
+        raise NotImplementedError
+
+    def split(self, data: str, size: int, overlap: int = 0) -> List[str]:
+        """
+        Split data into chunks of at most `size` tokens, overlapping by `overlap` tokens.
+
+        Args:
+            data (str): The text to split.
+            size (int): The maximum number of tokens per chunk.
+            overlap (int): The number of tokens shared by consecutive chunks.
+
+        Returns:
+            list[str]: The chunks.
+
+        Raises:
+            ValueError: If `size` is not larger than `overlap`.
+        """
+        return list(self.split_lines([data], size=size, overlap=overlap))
+
+    def split_lines(
+        self, lines: Iterable[str], size: int, overlap: int = 0
+    ) -> Iterator[str]:
+        """
+        Split lines, joined by newlines, into chunks of at most `size` tokens,
+        overlapping by `overlap` tokens.
+
+        The lines are read and tokenized a window of `TOKEN_BATCH_SIZE`
+        characters at a time, so only the current window and the chunk being
+        built are held in memory. Chunks are cut on token boundaries when
+        counting tokens exactly. Otherwise they are cut on character boundaries
+        such that the approximate token count of every chunk stays within
+        `size`.
+
+        Args:
+            lines (iterable): The lines to split.
+            size (int): The maximum number of tokens per chunk.
+            overlap (int): The number of tokens shared by consecutive chunks.
+
+        Yields:
+            str: The chunks.
+
+        Raises:
+            ValueError: If `size` is not larger than `overlap`.
+        """
+        if size <= overlap:
+            raise ValueError(
+                f"The chunk size of {size} tokens must exceed the overlap of {overlap} tokens."
+            )
+
+        if self.token_counting == "exact":
+            tokens: List[int] = []
+            for window in _windows(lines):
+                tokens.extend(self.encode(window))
+                # A full chunk is only cut when more tokens follow it.
+                while len(tokens) > size:
+                    yield self.decode(tokens[:size])
+                    del tokens[: size - overlap]
+            yield self.decode(tokens)
+            return
+
+        text = ""
+        for window in _windows(lines):
+            text += window
+            while True:
+                # A character is encoded in at most 4 UTF-8 bytes.
+                ratio = 1 if text[:size].isascii() else 4
+                length = max(1, size // ratio)
+                if len(text) <= length:
+                    break
+                yield text[:length]
+                text = text[max(1, length - overlap // ratio) :]
+        yield text
+
+    def count(self, data: str) -> int:
+        """
+        Count the tokens of data according to the token counting mode.
+
+        Args:
+            data (str): Text to count.
+
+        Returns:
+            int: The exact token count, an upper bound of it or 0 when counting is off.
+        """
+        match self.token_counting:
+            case "exact":
+                return self.count_exact([data])
+            case "approximate":
+                return approximate_token_count(data)
+            case _:
+                return 0
+
+    def _add_batch(self, batch: List[str]) -> None:
+        if self.token_counting == "exact":
+            lower_bound = -(
+                -sum(approximate_token_count(data) for data in batch)
+                // self.max_token_bytes()
+            )
+            if self.total_tokens + lower_bound > self.max_tokens:
+                self.total_tokens += lower_bound
+                raise Exception(f"Total input exceeds {self.total_tokens} tokens.")
+            self.total_tokens += self.count_exact(batch)
+        else:
+            self.total_tokens += sum(self.count(data) for data in batch)
+
+        if self.total_tokens > self.max_tokens:
+            raise Exception(f"Total input exceeds {self.total_tokens} tokens.")
+
+    def add(self, data: str) -> str:
+        """
+        Add the token count of data to the running total and raise if limit exceeded.
+
+        Args:
+            data (str): Text to tokenize and count.
+
+        Returns:
+            str: The data.
+
+        Raises:
+            Exception: If total token count exceeds max_tokens.
+        """
+        self._add_batch([data])
+
+        return data
+
+    def add_many(self, lines: Iterable[str], separator: str = "\n") -> List[str]:
+        """
+        Add the token count of all lines in batches and raise as soon as the limit is exceeded.
+
+        The lines of every batch are joined into a single block so no per line
+        objects are retained. Joining the returned blocks with `separator`
+        yields the same text as joining the lines.
+
+        Args:
+            lines (iterable): Text lines to tokenize and count.
+            separator (str): The separator to join the lines with.
+
+        Returns:
+            list[str]: The joined blocks of lines.
+
+        Raises:
+            Exception: If total token count exceeds max_tokens.
+        """
+        blocks = []
+        batch = []
+        batch_size = 0
+        for line in lines:
+            batch.append(line)
+            batch_size += len(line)
+            if batch_size >= TOKEN_BATCH_SIZE:
+                self._add_batch(batch)
+                blocks.append(separator.join(batch))
+                batch = []
+                batch_size = 0
+
+        if batch:
+            self._add_batch(batch)
+            blocks.append(separator.join(batch))
+
+        return blocks
+
+    def result(self) -> TokenCount:
+        """
+        Return the token count of everything added so far.
+        """
+        return TokenCount(total=self.total_tokens, token_counting=self.token_counting)
 
 
 @final
@@ -16,12 +307,16 @@ class BaseBackend:
     """
     Base class for CLI backend clients defining common interface and parameters.
 
+    The `*_async` methods are the coroutine counterparts of the commands, which
+    allow many concurrent requests to run on a single event loop.
+
     Attributes:
         token (str): API token or key for authentication.
         model (str): Model identifier to use for requests.
         max_tokens (int): Maximum number of tokens allowed in generated responses.
         temperature (float): Sampling temperature for model outputs.
         reasoning (str | None): Reasoning effort for supported reasoning models.
+        token_counting (str): How input tokens are counted: `exact`, `approximate` or `off`.
         debug (bool): Flag to enable debug-mode logging of payloads.
     """
 
@@ -35,6 +330,11 @@ class BaseBackend:
         debug: bool,
         temperature: float = 1.0,
         reasoning: str | None = None,
+        token_counting: str = "exact",
+        transport: Dict[str, Any] | None = None,
+        rpm: int | None = None,
+        tpm: int | None = None,
+        retry: Dict[str, Any] | None = None,
     ) -> None:
         """
         Initialize common backend parameters.
@@ -46,6 +346,11 @@ class BaseBackend:
             debug (bool): Enable debug output if True.
             temperature (float): Sampling temperature. Defaults to 1.0.
             reasoning (str | None): Reasoning effort for supported reasoning models.
+            token_counting (str): One of `exact`, `approximate` or `off`. Defaults to `exact`.
+            transport (dict | None): HTTP connection pool, HTTP/2 and timeout settings.
+            rpm (int | None): The maximum number of requests per minute.
+            tpm (int | None): The maximum number of input tokens per minute.
+            retry (dict | None): Retry and backoff settings for transient errors.
         """
         self.token = token
         self.model = model
@@ -59,13 +364,195 @@ class BaseBackend:
         if reasoning is not None and not self.supports_reasoning:
             raise ValueError("Reasoning is not supported by this backend.")
         self.reasoning = reasoning
+        if token_counting not in TOKEN_COUNTING_MODES:
+            supported_token_counting_modes = ", ".join(TOKEN_COUNTING_MODES)
+            raise ValueError(
+                f"Token counting must be one of: {supported_token_counting_modes}"
+            )
+        self.token_counting = token_counting
+        self.transport = get_transport_settings(transport)
+        self.limiter = RateLimiter(
+            rpm=rpm,
+            tpm=tpm,
+            retry=get_retry_settings(retry),
+            retryable=self.retryable,
+        )
         self.debug = debug
 
-    def bool_prompt(self, prompt: str, stdin: Callable[[], Iterable[str]]) -> NoReturn:
+    def retryable(self, err: Exception) -> bool:
+        """
+        Determine whether a request failed due to a transient error.
+
+        Args:
+            err (Exception): The error raised by the SDK.
+
+        Returns:
+            bool: True when the request is worth retrying.
+        """
+        return is_retryable(err)
+
+    def _send(self, send: Callable[[], T], tokens: int = 0) -> T:
+        """
+        Send a request within the rate limits of the instance, retrying transient errors.
+
+        Args:
+            send (callable): Function sending the request.
+            tokens (int): The number of input tokens of the request.
+
+        Returns:
+            The return value of `send`.
+        """
+        try:
+            ledger.set_model(self.model)
+            with timings.phase("network"):
+                response = self.limiter.call(send, tokens=tokens)
+        finally:
+            if self.debug:
+                print("Rate limiter: ", self.limiter.counters)
+
+        usage = getattr(response, "usage", None)
+        if usage is not None and self._tracks_usage():
+            self._record_usage(usage)
+
+        return response
+
+    async def _send_async(self, send: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        """
+        Send a request from a coroutine within the rate limits of the instance,
+        retrying transient errors.
+
+        Args:
+            send (callable): Function returning the awaitable sending the request.
+            tokens (int): The number of input tokens of the request.
+
+        Returns:
+            The result of the awaitable returned by `send`.
+        """
+        try:
+            ledger.set_model(self.model)
+            with timings.phase("network"):
+                response = await self.limiter.call_async(send, tokens=tokens)
+        finally:
+            if self.debug:
+                print("Rate limiter: ", self.limiter.counters)
+
+        usage = getattr(response, "usage", None)
+        if usage is not None and self._tracks_usage():
+            self._record_usage(usage)
+
+        return response
+
+    def _tracks_usage(self) -> bool:
+        """
+        Determine whether the token usage of responses is recorded, which is
+        the case with `--timings`, `--debug` and the usage ledger.
+        """
+        return self.debug or timings.enabled() or ledger.active()
+
+    def _get_usage(self, usage: Any) -> Dict[str, int]:
+        """
+        Return the token usage reported by the provider by kind.
+
+        Args:
+            usage (Any): The usage object of the SDK response.
+
+        Returns:
+            dict: The number of tokens by kind, including the cached input tokens.
+        """
+        return {}
+
+    def _record_usage(self, usage: Any) -> None:
+        """
+        Record the token usage reported by the provider with `--timings` and in
+        the usage ledger, and print it with `--debug`.
+
+        Args:
+            usage (Any): The usage object of the SDK response.
+        """
+        usage = self._get_usage(usage)
+        if self.debug:
+            print("Usage: ", usage)
+        timings.add_usage(usage)
+        ledger.add_usage(usage)
+
+    def _validator(self) -> BaseValidateTokenLength:
+        raise NotImplementedError("Command not Implemented. Try another backend.")
+
+    def count_tokens(self, data: str) -> int:
+        """
+        Count the tokens of data according to the token counting mode.
+
+        Args:
+            data (str): The text to count.
+
+        Returns:
+            int: The token count.
+        """
+        return self._validator().count(data)
+
+    def chunk(self, data: str, size: int, overlap: int = 0) -> List[str]:
+        """
+        Split data into chunks of at most `size` tokens, overlapping by `overlap` tokens.
+
+        Args:
+            data (str): The text to split.
+            size (int): The maximum number of tokens per chunk.
+            overlap (int): The number of tokens shared by consecutive chunks.
+
+        Returns:
+            list[str]: The chunks.
+        """
+        return self._validator().split(data, size=size, overlap=overlap)
+
+    def chunk_lines(
+        self, lines: Iterable[str], size: int, overlap: int = 0
+    ) -> Iterator[str]:
+        """
+        Split lines, joined by newlines, into chunks of at most `size` tokens,
+        overlapping by `overlap` tokens, while they are read.
+
+        Args:
+            lines (iterable): The lines to split.
+            size (int): The maximum number of tokens per chunk.
+            overlap (int): The number of tokens shared by consecutive chunks.
+
+        Yields:
+            str: The chunks.
+        """
+        return self._validator().split_lines(lines, size=size, overlap=overlap)
+
+    def bool_prompt(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], mode: str = "reason"
+    ) -> NoReturn:
         raise NotImplementedError("Command not Implemented. Try another backend.")
 
     def prompt(self, prompt: str, stdin: Callable[[], Iterable[str]]) -> NoReturn:
         raise NotImplementedError("Command not Implemented. Try another backend.")
 
+    def prompt_stream(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> NoReturn:
+        raise NotImplementedError("Command not Implemented. Try another backend.")
+
     def structured_prompt(self) -> NoReturn:
         raise NotImplementedError("Command not Implemented. Try another backend.")
+
+    async def prompt_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> NoReturn:
+        raise NotImplementedError("Command not Implemented. Try another backend.")
+
+    def prompt_stream_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> AsyncIterator[str]:
+        raise NotImplementedError("Command not Implemented. Try another backend.")
+
+    async def bool_prompt_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], mode: str = "reason"
+    ) -> NoReturn:
+        raise NotImplementedError("Command not Implemented. Try another backend.")
+
+    async def structured_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], schema: str
+    ) -> NoReturn:
+        raise NotImplementedError("Command not Implemented. Try another backend.")
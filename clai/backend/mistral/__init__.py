@@ -8,13 +8,24 @@
 # mistral.py
 #
 
-from typing import Any, Callable, Iterable, Tuple
+import json
+import weakref
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Tuple
 
-from clai.backend import BaseBackend
-from clai.backend.mistral.tools import build_messages
-from clai.prompts import BOOL_PROMPT
-from clai.tools import get_exit_code
-from mistralai.client import Mistral
+from clai import timings
+from clai.backend import BaseBackend, TokenCount, get_prompt_cache_key
+from clai.backend.mistral.tools import ValidateTokenLength, build_messages, get_usage
+from clai.backend.transport import (
+    create_http_client,
+    get_http_client,
+    get_httpx,
+    get_loop_client,
+)
+from clai.prompts import BOOL_ANSWER_PROMPT, BOOL_PROMPT
+from clai.tools import BOOL_MAX_OUTPUT_TOKENS, BOOL_TOP_LOGPROBS, get_bool_result
+
+MISTRAL_SERVER_URL = "https://api.mistral.ai"
+BOOL_FORMAT = {"type": "json_object"}
 
 
 class Client(BaseBackend):
@@ -26,53 +37,209 @@ class Client(BaseBackend):
         *args, **kwargs: Additional parameters for BaseBackend.
     """
 
-    def __init__(self, system: str, *args: Any, **kwargs: Any) -> None:
+    def __init__(
+        self,
+        system: str,
+        *args: Any,
+        server_url: str | None = None,
+        prompt_cache_key: str | bool | None = None,
+        **kwargs: Any,
+    ) -> None:
         """
         Initialize the Mistral client with system prompt and credentials.
 
         Args:
             system (str): System prompt message.
+            server_url (str | None): URL of a Mistral compatible API.
+            prompt_cache_key (str | bool | None): The prompt cache key of all
+                requests, derived from the static prefix of every request when
+                None and omitted when False.
         """
+        with timings.phase("imports"):
+            import mistralai.client  # noqa: F401
+
         self.system = system
+        self.server_url = server_url or MISTRAL_SERVER_URL
+        self.prompt_cache_key = prompt_cache_key
         super().__init__(*args, **kwargs)
 
-        self.client = Mistral(api_key=self.token)
+        self.client = self._create_client()
+        self._async_clients = weakref.WeakKeyDictionary()
 
-    def prompt(self, prompt: str, stdin: Callable[[], Iterable[str]]) -> str:
+    def _create_client(self, asynchronous: bool = False) -> Any:
+        from mistralai.client import Mistral
+
+        return Mistral(
+            api_key=self.token,
+            server_url=self.server_url,
+            client=get_http_client(self.server_url, self.transport),
+            # The asynchronous client is bound to the event loop it is used on,
+            # so it is not shared with other clients.
+            async_client=(
+                create_http_client(self.transport, get_httpx().AsyncClient)
+                if asynchronous
+                else None
+            ),
+        )
+
+    @property
+    def async_client(self) -> Any:
         """
-        Send a user prompt to Mistral and return the response content.
+        The `Mistral` client of the running event loop, created on first use.
+        """
+        return get_loop_client(
+            self._async_clients, lambda: self._create_client(asynchronous=True)
+        )
+
+    def _get_usage(self, usage: Any) -> Dict[str, int]:
+        return get_usage(usage)
+
+    def _validator(self) -> ValidateTokenLength:
+        return ValidateTokenLength(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            token_counting=self.token_counting,
+        )
+
+    def _prompt_cache_key(
+        self, system: str, response_format: Dict[str, Any] | None
+    ) -> str | None:
+        if self.prompt_cache_key is False:
+            return None
+        if self.prompt_cache_key:
+            return self.prompt_cache_key
+
+        return get_prompt_cache_key(
+            self.model,
+            system,
+            json.dumps(response_format, sort_keys=True, separators=(",", ":")),
+        )
+
+    def _build_request(
+        self,
+        system: str,
+        prompt: str,
+        stdin: Callable[[], Iterable[str]],
+        response_format: Dict[str, Any] | None = None,
+    ) -> Tuple[Dict[str, Any], TokenCount]:
+        """
+        Validate the token length of the input and build the chat completion request.
 
         Args:
+            system (str): The system prompt.
             prompt (str): User prompt text.
             stdin (callable): Function yielding additional stdin lines.
+            response_format (dict | None): The optional response format.
 
         Returns:
-            str: The response content from the Mistral model.
+            tuple[dict, TokenCount]: The keyword arguments for `chat.complete`
+                and the token count of the input.
         """
-
-        messages = build_messages(
+        messages, token_count = build_messages(
             max_tokens=self.max_tokens,
             model=self.model,
-            system=self.system,
+            system=system,
             prompts=[prompt],
             stdin=stdin,
+            token_counting=self.token_counting,
         )
 
         if self.debug:
             print(messages)
+            print("Tokens: ", token_count.total)
+
+        request = {
+            "messages": messages,
+            "model": self.model,
+            "temperature": self.temperature,
+        }
+        if response_format is not None:
+            request["response_format"] = response_format
+        prompt_cache_key = self._prompt_cache_key(system, response_format)
+        if prompt_cache_key is not None:
+            request["prompt_cache_key"] = prompt_cache_key
+
+        return request, token_count
+
+    def prompt(self, prompt: str, stdin: Callable[[], Iterable[str]]) -> str:
+        """
+        Send a user prompt to Mistral and return the response content.
+
+        Args:
+            prompt (str): User prompt text.
+            stdin (callable): Function yielding additional stdin lines.
+
+        Returns:
+            str: The response content from the Mistral model.
+        """
+        request, token_count = self._build_request(self.system, prompt, stdin)
+
+        response = self._send(
+            lambda: self.client.chat.complete(**request), token_count.total
+        )
+
+        return response.choices[0].message.content
+
+    def prompt_stream(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> Iterator[str]:
+        """
+        Send a user prompt to Mistral and yield the response text as it is generated.
+
+        Args:
+            prompt (str): User prompt text.
+            stdin (callable): Function yielding additional stdin lines.
+
+        Yields:
+            str: The response text deltas.
+        """
+        request, token_count = self._build_request(self.system, prompt, stdin)
+
+        with self._send(
+            lambda: self.client.chat.stream(**request), token_count.total
+        ) as stream, timings.phase("streaming"):
+            for event in stream:
+                yield from self._stream_content(event)
 
-        return (
-            self.client.chat.complete(
-                messages=messages,
-                model=self.model,
-                temperature=self.temperature,
+    def _stream_content(self, event: Any) -> Iterator[str]:
+        content = event.data.choices[0].delta.content
+        if isinstance(content, str) and content:
+            yield content
+        usage = getattr(event.data, "usage", None)
+        if usage is not None and self._tracks_usage():
+            self._record_usage(usage)
+
+    def _bool_request(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], mode: str
+    ) -> Tuple[Dict[str, Any], TokenCount]:
+        if mode == "reason":
+            return self._build_request(
+                self.system + BOOL_PROMPT, prompt, stdin, response_format=BOOL_FORMAT
             )
-            .choices[0]
-            .message.content
+
+        request, token_count = self._build_request(
+            self.system + BOOL_ANSWER_PROMPT,
+            prompt,
+            stdin,
+            response_format=BOOL_FORMAT,
         )
+        request["max_tokens"] = BOOL_MAX_OUTPUT_TOKENS
+        if mode == "confidence":
+            request["logprobs"] = True
+            request["top_logprobs"] = BOOL_TOP_LOGPROBS
+
+        return request, token_count
+
+    def _bool_result(self, response: Any, mode: str) -> Tuple[int, str]:
+        choice = response.choices[0]
+        logprobs = None
+        if mode == "confidence" and choice.logprobs is not None:
+            logprobs = choice.logprobs.content
+
+        return get_bool_result(choice.message.content, mode, logprobs)
 
     def bool_prompt(
-        self, prompt: str, stdin: Callable[[], Iterable[str]]
+        self, prompt: str, stdin: Callable[[], Iterable[str]], mode: str = "reason"
     ) -> Tuple[int, str]:
         """
         Send a true/false prompt, parse and return exit code and model response.
@@ -80,30 +247,82 @@ class Client(BaseBackend):
         Args:
             prompt (str): True/false question prompt.
             stdin (callable): Function yielding additional stdin lines.
+            mode (str): One of `reason`, `answer` or `confidence`.
 
         Returns:
             tuple[int, str]: A tuple of exit code and raw JSON response.
         """
+        request, token_count = self._bool_request(prompt, stdin, mode)
 
-        messages = build_messages(
-            max_tokens=self.max_tokens,
-            model=self.model,
-            system=self.system + BOOL_PROMPT,
-            prompts=[prompt],
-            stdin=stdin,
+        response = self._send(
+            lambda: self.client.chat.complete(**request), token_count.total
         )
+        return self._bool_result(response, mode)
 
-        if self.debug:
-            print(messages)
+    async def prompt_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> str:
+        """
+        Send a user prompt to Mistral from a coroutine and return the response content.
 
-        response = (
-            self.client.chat.complete(
-                messages=messages,
-                model=self.model,
-                temperature=self.temperature,
-                response_format={"type": "json_object"},
-            )
-            .choices[0]
-            .message.content
+        Args:
+            prompt (str): User prompt text.
+            stdin (callable): Function yielding additional stdin lines.
+
+        Returns:
+            str: The response content from the Mistral model.
+        """
+        request, token_count = self._build_request(self.system, prompt, stdin)
+
+        response = await self._send_async(
+            lambda: self.async_client.chat.complete_async(**request), token_count.total
+        )
+
+        return response.choices[0].message.content
+
+    async def prompt_stream_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> AsyncIterator[str]:
+        """
+        Send a user prompt to Mistral from a coroutine and yield the response text
+        as it is generated.
+
+        Args:
+            prompt (str): User prompt text.
+            stdin (callable): Function yielding additional stdin lines.
+
+        Yields:
+            str: The response text deltas.
+        """
+        request, token_count = self._build_request(self.system, prompt, stdin)
+
+        stream = await self._send_async(
+            lambda: self.async_client.chat.stream_async(**request), token_count.total
+        )
+        async with stream:
+            with timings.phase("streaming"):
+                async for event in stream:
+                    for content in self._stream_content(event):
+                        yield content
+
+    async def bool_prompt_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], mode: str = "reason"
+    ) -> Tuple[int, str]:
+        """
+        Send a true/false prompt from a coroutine, parse and return exit code and
+        model response.
+
+        Args:
+            prompt (str): True/false question prompt.
+            stdin (callable): Function yielding additional stdin lines.
+            mode (str): One of `reason`, `answer` or `confidence`.
+
+        Returns:
+            tuple[int, str]: A tuple of exit code and raw JSON response.
+        """
+        request, token_count = self._bool_request(prompt, stdin, mode)
+
+        response = await self._send_async(
+            lambda: self.async_client.chat.complete_async(**request), token_count.total
         )
-        return (get_exit_code(response), response)
+        return self._bool_result(response, mode)
@@ -5,40 +5,89 @@
 # This software is released under the MIT License.
 # See the LICENSE file in the project root for more information.
 
-from typing import Callable, Iterable, List
+import os
+from functools import cache
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Tuple
 
-from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+from clai import timings
+from clai.backend import BaseValidateTokenLength, TokenCount
 
+if TYPE_CHECKING:
+    from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+    from sentencepiece import SentencePieceProcessor
 
-MISTRAL_TOKENIZER = MistralTokenizer.v3()
+
+@cache
+def get_tokenizer() -> "MistralTokenizer":
+    from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+
+    return MistralTokenizer.v3()
 
 
 def get_token_length(data: str) -> int:
     return len(
-        MISTRAL_TOKENIZER.instruct_tokenizer.tokenizer.encode(
-            data, bos=False, eos=False
-        )
+        get_tokenizer().instruct_tokenizer.tokenizer.encode(data, bos=False, eos=False)
+    )
+
+
+@cache
+def get_sentencepiece() -> "SentencePieceProcessor":
+    from sentencepiece import SentencePieceProcessor
+
+    return SentencePieceProcessor(
+        model_file=str(get_tokenizer().instruct_tokenizer.tokenizer.file_path)
     )
 
 
-class ValidateTokenLength:
+@cache
+def get_max_token_bytes() -> int:
+    return max(
+        len(piece.encode("utf-8"))
+        for piece in get_tokenizer().instruct_tokenizer.tokenizer.vocab()
+    )
+
+
+class ValidateTokenLength(BaseValidateTokenLength):
     """
     Track and enforce token length limits for Mistral model prompts.
 
     Attributes:
-        tokenizer: The Mistral tokenizer instance.
+        token_counting (str): One of `exact`, `approximate` or `off`.
         total_tokens (int): Running total of token count.
         max_tokens (int): Maximum allowed tokens.
     """
 
-    def __init__(self, model: str, max_tokens: int) -> None:
-        self.total_tokens = 0
-        self.max_tokens = max_tokens
+    def __init__(
+        self, model: str, max_tokens: int, token_counting: str = "exact"
+    ) -> None:
+        super().__init__(max_tokens=max_tokens, token_counting=token_counting)
+
+    def count(self, data: str) -> int:
+        if self.token_counting == "approximate":
+            # SentencePiece prepends a whitespace marker to the encoded text.
+            return super().count(data) + 1
 
-    def add(self, data: str) -> None:
-        self.total_tokens += get_token_length(data)
-        if self.total_tokens > self.max_tokens:
-            raise Exception(f"Total input exceeds {self.total_tokens} tokens.")
+        return super().count(data)
+
+    def count_exact(self, batch: List[str]) -> int:
+        if len(batch) == 1:
+            return get_token_length(batch[0])
+
+        return sum(
+            len(tokens)
+            for tokens in get_sentencepiece().encode(batch, num_threads=os.cpu_count())
+        )
+
+    def max_token_bytes(self) -> int:
+        return get_max_token_bytes()
+
+    def encode(self, data: str) -> List[int]:
+        return get_tokenizer().instruct_tokenizer.tokenizer.encode(
+            data, bos=False, eos=False
+        )
+
+    def decode(self, tokens: List[int]) -> str:
+        return get_tokenizer().instruct_tokenizer.tokenizer.decode(tokens)
 
 
 def build_messages(
@@ -47,26 +96,58 @@ def build_messages(
     system: str,
     prompts: List[str],
     stdin: Callable[[], Iterable[str]],
-) -> list[dict[str, str]]:
+    token_counting: str = "exact",
+) -> Tuple[list[dict[str, str]], TokenCount]:
     messages = []
 
-    vtl = ValidateTokenLength(model=model, max_tokens=max_tokens)
+    with timings.phase("tokenization"):
+        vtl = ValidateTokenLength(
+            model=model, max_tokens=max_tokens, token_counting=token_counting
+        )
 
-    vtl.add(system)
-    messages.append({"role": "system", "content": system.lstrip().rstrip()})
+        vtl.add(system)
+        messages.append({"role": "system", "content": system.lstrip().rstrip()})
 
-    for prompt in prompts:
-        vtl.add(prompt)
-        messages.append({"role": "user", "content": prompt.lstrip().rstrip()})
+        for prompt in prompts:
+            vtl.add(prompt)
+            messages.append({"role": "user", "content": prompt.lstrip().rstrip()})
 
-    stdin_content = []
-    for line in stdin():
-        vtl.add(line)
-        stdin_content.append(line.lstrip().rstrip())
+        stdin_content = vtl.add_many(
+            (line.lstrip().rstrip() for line in stdin()), separator=""
+        )
 
     if len(stdin_content) > 0:
         messages.append(
             {"role": "user", "content": "".join(stdin_content)},
         )
 
-    return messages
+    return messages, vtl.result()
+
+
+def get_usage(usage) -> Dict[str, int]:
+    """
+    Return the token usage of a chat completion.
+
+    Args:
+        usage (UsageInfo): The usage of the chat completion.
+
+    Returns:
+        dict: The number of input, output, total and cached tokens.
+    """
+    # The SDK keeps the prompt token details as an additional property.
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is None:
+        details = (getattr(usage, "additional_properties", None) or {}).get(
+            "prompt_tokens_details"
+        )
+    if isinstance(details, dict):
+        cached_tokens = details.get("cached_tokens")
+    else:
+        cached_tokens = getattr(details, "cached_tokens", None)
+
+    return {
+        "input_tokens": usage.prompt_tokens or 0,
+        "output_tokens": usage.completion_tokens or 0,
+        "total_tokens": usage.total_tokens or 0,
+        "cached_tokens": cached_tokens or 0,
+    }
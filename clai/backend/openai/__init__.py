@@ -9,15 +9,48 @@
 #
 import json
 import sys
-from typing import Any, Callable, Iterable, Tuple
-
-import jsonschema
-from openai import OpenAI as _OpenAI
-
-from clai.backend import BaseBackend
-from clai.backend.openai.tools import ValidateTokenLength, get_output_text
-from clai.prompts import BOOL_PROMPT
-from clai.tools import get_exit_code
+import weakref
+from typing import (
+    Any,
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Tuple,
+)
+
+from clai import timings
+from clai.backend import BaseBackend, TokenCount, get_prompt_cache_key
+from clai.backend.openai.tools import (
+    ValidateTokenLength,
+    get_output_logprobs,
+    get_output_text,
+    get_response,
+    get_usage,
+)
+from clai.backend.transport import (
+    create_http_client,
+    get_http_client,
+    get_loop_client,
+    get_timeout,
+)
+from clai.jsonstream import ArrayStream
+from clai.offload import BatchJob
+from clai.prompts import BOOL_ANSWER_PROMPT, BOOL_PROMPT
+from clai.schema import (
+    Schema,
+    get_stream_items,
+    get_validator,
+    load_schema,
+    validate_structured_element,
+    validate_structured_response,
+)
+from clai.tools import BOOL_MAX_OUTPUT_TOKENS, BOOL_TOP_LOGPROBS, get_bool_result
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+BATCH_ENDPOINT = "/v1/responses"
 
 RESPONSE_FORMAT = {
     "format": {
@@ -38,6 +71,24 @@ RESPONSE_FORMAT = {
     }
 }
 
+ANSWER_FORMAT = {
+    "format": {
+        "type": "json_schema",
+        "name": "true_false",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "answer": {
+                    "type": "boolean",
+                },
+            },
+            "required": ["answer"],
+            "additionalProperties": False,
+        },
+        "strict": True,
+    }
+}
+
 
 class Client(BaseBackend):
     """
@@ -49,19 +100,99 @@ class Client(BaseBackend):
     """
 
     supports_reasoning = True
+    batch_endpoint = BATCH_ENDPOINT
 
-    def __init__(self, system: str, *args: Any, **kwargs: Any) -> None:
+    def __init__(
+        self,
+        system: str,
+        *args: Any,
+        tokenizer_cache: str | None = None,
+        base_url: str | None = None,
+        prompt_cache_key: str | bool | None = None,
+        **kwargs: Any,
+    ) -> None:
         """
         Initialize the OpenAI client with system prompt and credentials.
 
         Args:
             system (str): System prompt message.
+            tokenizer_cache (str | None): Directory holding pre-seeded tiktoken encoding files.
+            base_url (str | None): Base URL of an OpenAI compatible API.
+            prompt_cache_key (str | bool | None): The prompt cache key of all
+                requests, derived from the static prefix of every request when
+                None and omitted when False.
         """
+        with timings.phase("imports"):
+            from openai import OpenAI as _OpenAI
+
         self.system = system
+        self.tokenizer_cache = tokenizer_cache
+        self.base_url = base_url or OPENAI_BASE_URL
+        self.prompt_cache_key = prompt_cache_key
         super().__init__(*args, **kwargs)
-        self.client = _OpenAI(api_key=self.token)
+        self.client = _OpenAI(**self._client_args())
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @property
+    def async_client(self) -> Any:
+        """
+        The `AsyncOpenAI` client of the running event loop, created on first use.
+        """
+
+        def create() -> Any:
+            from openai import AsyncOpenAI
+
+            return AsyncOpenAI(**self._client_args(asynchronous=True))
+
+        return get_loop_client(self._async_clients, create)
+
+    def _client_args(self, asynchronous: bool = False) -> Dict[str, Any]:
+        return {
+            "api_key": self.token,
+            "base_url": self.base_url,
+        } | self._transport_args(self.base_url, asynchronous)
+
+    def _transport_args(
+        self, base_url: str, asynchronous: bool = False
+    ) -> Dict[str, Any]:
+        from openai import DefaultAsyncHttpxClient, DefaultHttpxClient
+
+        if asynchronous:
+            # The asynchronous client is bound to the event loop it is used on,
+            # so it is not shared with other clients.
+            http_client = create_http_client(
+                self.transport, factory=DefaultAsyncHttpxClient
+            )
+        else:
+            http_client = get_http_client(
+                base_url, self.transport, factory=DefaultHttpxClient
+            )
+
+        return {
+            "http_client": http_client,
+            "timeout": get_timeout(self.transport),
+            # Retries are handled by the rate limiter of the instance.
+            "max_retries": 0,
+        }
+
+    def retryable(self, err: Exception) -> bool:
+        from openai import APIConnectionError
+
+        return isinstance(err, APIConnectionError) or super().retryable(err)
 
-        self.vtl = ValidateTokenLength(model=self.model, max_tokens=self.max_tokens)
+    def _get_usage(self, usage: Any) -> Dict[str, int]:
+        return get_usage(usage)
+
+    def _request_model(self) -> str:
+        return self.model
+
+    def _validator(self) -> ValidateTokenLength:
+        return ValidateTokenLength(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            token_counting=self.token_counting,
+            cache_dir=self.tokenizer_cache,
+        )
 
     def _reasoning(self) -> dict[str, str] | None:
         if self.reasoning is None:
@@ -69,41 +200,227 @@ class Client(BaseBackend):
 
         return {"effort": self.reasoning}
 
-    def prompt(self, prompt: str, stdin: Callable[[], Iterable[str]]) -> str | None:
+    def _prompt_cache_key(
+        self, instructions: str, text: Dict[str, Any] | None
+    ) -> str | None:
+        if self.prompt_cache_key is False:
+            return None
+        if self.prompt_cache_key:
+            return self.prompt_cache_key
+
+        return get_prompt_cache_key(
+            self._request_model(),
+            instructions,
+            json.dumps(text, sort_keys=True, separators=(",", ":")),
+        )
+
+    def _build_request(
+        self,
+        instructions: str,
+        prompt: str,
+        stdin: Callable[[], Iterable[str]],
+        text: Dict[str, Any] | None = None,
+        options: Dict[str, Any] | None = None,
+    ) -> Tuple[Dict[str, Any], TokenCount]:
         """
-        Send a user prompt to OpenAI and return the response content.
+        Validate the token length of the input and build the Responses API request.
+
+        The static prefix of the request, the instructions and output format, is
+        placed before the input and is identified by the prompt cache key, so
+        providers can reuse it across requests.
 
         Args:
+            instructions (str): The instructions (system prompt).
             prompt (str): User prompt text.
             stdin (callable): Function yielding additional stdin lines.
+            text (dict | None): The optional text output format.
+            options (dict | None): Additional request parameters.
 
         Returns:
-            str: The response content from the model.
+            tuple[dict, TokenCount]: The keyword arguments for `responses.create`
+                and the token count of the input.
         """
+        with timings.phase("tokenization"):
+            vtl = self._validator()
+            final_p = [vtl.add(prompt)]
+            final_i = [vtl.add(instructions)]
 
-        final_p = [self.vtl.add(prompt)]
-        final_i = [self.vtl.add(self.system)]
-
-        for line in stdin():
-            final_p.append(self.vtl.add(line))
+            final_p.extend(vtl.add_many(stdin(), separator="\n"))
 
         if self.debug:
             print("Instructions: ", final_i)
             print("Prompt: ", final_p)
+            print("Tokens: ", vtl.result().total)
 
         request = {
-            "model": self.model,
+            "model": self._request_model(),
             "temperature": self.temperature,
             "instructions": "\n".join(final_i),
-            "input": "\n".join(final_p),
         }
+        if text is not None:
+            request["text"] = text
         if self.reasoning is not None:
             request["reasoning"] = self._reasoning()
+        prompt_cache_key = self._prompt_cache_key(request["instructions"], text)
+        if prompt_cache_key is not None:
+            request["prompt_cache_key"] = prompt_cache_key
+        request.update(options or {})
+        request["input"] = "\n".join(final_p)
 
-        return get_output_text(self.client.responses.create(**request))
+        return request, vtl.result()
 
-    def bool_prompt(
+    def _command_request(
+        self,
+        command: str,
+        prompt: str,
+        stdin: Callable[[], Iterable[str]],
+        schema: str | None = None,
+        bool_mode: str = "reason",
+    ) -> Tuple[Dict[str, Any], TokenCount, Schema | None]:
+        """
+        Build the Responses API request of a `prompt`, `bool` or `structured` command.
+
+        Args:
+            command (str): One of `prompt`, `bool` or `structured`.
+            prompt (str): User prompt text.
+            stdin (callable): Function yielding additional stdin lines.
+            schema (str | None): Path to the JSON schema file for `structured`.
+            bool_mode (str): One of `reason`, `answer` or `confidence` for `bool`.
+
+        Returns:
+            tuple[dict, TokenCount, Schema | None]: The keyword arguments for
+                `responses.create`, the token count of the input and the schema.
+
+        Raises:
+            SystemExit: If the provided schema is invalid.
+        """
+        match command:
+            case "bool" if bool_mode != "reason":
+                request, token_count = self._build_request(
+                    self.system + BOOL_ANSWER_PROMPT,
+                    prompt,
+                    stdin,
+                    text=ANSWER_FORMAT,
+                    options=self._answer_options(bool_mode),
+                )
+                return request, token_count, None
+            case "bool":
+                request, token_count = self._build_request(
+                    self.system + BOOL_PROMPT, prompt, stdin, text=RESPONSE_FORMAT
+                )
+                return request, token_count, None
+            case "structured":
+                from jsonschema.exceptions import SchemaError
+
+                schema = load_schema(schema)
+                schema_obj = {
+                    "format": {
+                        "type": "json_schema",
+                        "name": "clai",
+                        "schema": schema.schema,
+                        "strict": True,
+                    }
+                }
+
+                try:
+                    get_validator(schema)
+                except SchemaError as e:
+                    print("❌ Invalid JSON Schema:", e)
+                    sys.exit(1)
+
+                request, token_count = self._build_request(
+                    self.system, prompt, stdin, text=schema_obj
+                )
+                return request, token_count, schema
+            case _:
+                request, token_count = self._build_request(self.system, prompt, stdin)
+                return request, token_count, None
+
+    def _answer_options(self, bool_mode: str) -> Dict[str, Any]:
+        """
+        Return the request parameters of an answer without a reason.
+
+        The output is capped to the few tokens of the answer. Reasoning tokens
+        count against the cap, so it only applies when reasoning is disabled.
+        """
+        options = {}
+        if self.reasoning in (None, "none"):
+            options["max_output_tokens"] = BOOL_MAX_OUTPUT_TOKENS
+        if bool_mode == "confidence":
+            options["include"] = ["message.output_text.logprobs"]
+            options["top_logprobs"] = BOOL_TOP_LOGPROBS
+
+        return options
+
+    def _command_result(
+        self,
+        command: str,
+        response: Any,
+        schema: Schema | None,
+        bool_mode: str = "reason",
+    ) -> Tuple[int, str]:
+        text = get_output_text(response)
+        match command:
+            case "bool":
+                logprobs = None
+                if bool_mode == "confidence":
+                    logprobs = get_output_logprobs(response)
+                return get_bool_result(text, bool_mode, logprobs)
+            case "structured":
+                with timings.phase("parsing"):
+                    validate_structured_response(text, schema)
+
+        return 0, text
+
+    def prompt(self, prompt: str, stdin: Callable[[], Iterable[str]]) -> str | None:
+        """
+        Send a user prompt to OpenAI and return the response content.
+
+        Args:
+            prompt (str): User prompt text.
+            stdin (callable): Function yielding additional stdin lines.
+
+        Returns:
+            str: The response content from the model.
+        """
+        request, token_count, _ = self._command_request("prompt", prompt, stdin)
+
+        return get_output_text(
+            self._send(
+                lambda: self.client.responses.create(**request), token_count.total
+            )
+        )
+
+    def prompt_stream(
         self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> Iterator[str]:
+        """
+        Send a user prompt to OpenAI and yield the response text as it is generated.
+
+        Args:
+            prompt (str): User prompt text.
+            stdin (callable): Function yielding additional stdin lines.
+
+        Yields:
+            str: The response text deltas.
+        """
+        request, token_count, _ = self._command_request("prompt", prompt, stdin)
+
+        with (
+            self._send(
+                lambda: self.client.responses.create(**request, stream=True),
+                token_count.total,
+            ) as stream,
+            timings.phase("streaming"),
+        ):
+            for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type == "response.completed" and self._tracks_usage():
+                    self._record_usage(event.response.usage)
+
+    def bool_prompt(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], mode: str = "reason"
     ) -> Tuple[int, str]:
         """
         Send a true/false prompt, parse and return exit code and model response.
@@ -111,43 +428,188 @@ class Client(BaseBackend):
         Args:
             prompt (str): True/false question prompt.
             stdin (callable): Function yielding additional stdin lines.
+            mode (str): One of `reason`, `answer` or `confidence`.
 
         Returns:
             tuple[int, str]: A tuple of exit code and raw JSON response.
         """
+        request, token_count, _ = self._command_request(
+            "bool", prompt, stdin, bool_mode=mode
+        )
 
-        final_p = [self.vtl.add(prompt)]
-        final_i = [self.vtl.add(self.system + BOOL_PROMPT)]
+        response = self._send(
+            lambda: self.client.responses.create(**request), token_count.total
+        )
 
-        for line in stdin():
-            final_p.append(self.vtl.add(line))
+        return self._command_result("bool", response, None, mode)
 
-        if self.debug:
-            print("Instructions: ", final_i)
-            print("Prompt: ", final_p)
+    def structured(
+        self,
+        prompt: str,
+        stdin: Callable[[], Iterable[str]],
+        schema: str,
+    ) -> str:
+        """
+        Generate a structured response from the LLM using a provided JSON schema.
 
-        request = {
-            "model": self.model,
-            "temperature": self.temperature,
-            "instructions": "\n".join(final_i),
-            "input": "\n".join(final_p),
-            "text": RESPONSE_FORMAT,
-        }
-        if self.reasoning is not None:
-            request["reasoning"] = self._reasoning()
+        Args:
+            prompt (str): The user prompt to send to the LLM.
+            stdin (Callable[[], Iterable[str]]): Function yielding additional stdin lines.
+            schema (str): Path to the JSON schema file to use for the structured response.
+
+        Returns:
+            str: The response content from the model.
 
-        response = get_output_text(self.client.responses.create(**request))
+        Raises:
+            SystemExit: If the provided schema is invalid.
+        """
+        request, token_count, schema = self._command_request(
+            "structured", prompt, stdin, schema
+        )
 
-        return (get_exit_code(response), response)
+        response = self._send(
+            lambda: self.client.responses.create(**request), token_count.total
+        )
 
-    def structured(
+        return self._command_result("structured", response, schema)[1]
+
+    def structured_stream(
         self,
         prompt: str,
         stdin: Callable[[], Iterable[str]],
         schema: str,
+    ) -> Iterator[str]:
+        """
+        Generate a structured response and yield the elements of its array as
+        NDJSON lines as soon as each element is complete.
+
+        The array is either the top level of the schema or the single property
+        of a top-level object. Every element is validated against the schema
+        of the array elements.
+
+        Args:
+            prompt (str): The user prompt to send to the LLM.
+            stdin (Callable[[], Iterable[str]]): Function yielding additional stdin lines.
+            schema (str): Path to the JSON schema file to use for the structured response.
+
+        Returns:
+            iterator: The elements, each JSON encoded on a line of its own.
+
+        Raises:
+            SystemExit: If the provided schema is invalid.
+            Exception: If the schema has no array to stream.
+        """
+        request, token_count, schema = self._command_request(
+            "structured", prompt, stdin, schema
+        )
+        path, items = get_stream_items(schema)
+
+        def stream_elements() -> Iterator[str]:
+            parser = ArrayStream(path)
+            index = 0
+            with (
+                self._send(
+                    lambda: self.client.responses.create(**request, stream=True),
+                    token_count.total,
+                ) as stream,
+                timings.phase("streaming"),
+            ):
+                for event in stream:
+                    if event.type == "response.output_text.delta":
+                        for element in parser.feed(event.delta):
+                            validate_structured_element(element, schema, items, index)
+                            index += 1
+                            yield json.dumps(element) + "\n"
+                    elif event.type == "response.completed" and self._tracks_usage():
+                        self._record_usage(event.response.usage)
+            parser.close()
+
+        return stream_elements()
+
+    async def prompt_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
     ) -> str:
         """
-        Generate a structured response from the LLM using a provided JSON schema.
+        Send a user prompt to OpenAI from a coroutine and return the response content.
+
+        Args:
+            prompt (str): User prompt text.
+            stdin (callable): Function yielding additional stdin lines.
+
+        Returns:
+            str: The response content from the model.
+        """
+        request, token_count, _ = self._command_request("prompt", prompt, stdin)
+
+        return get_output_text(
+            await self._send_async(
+                lambda: self.async_client.responses.create(**request),
+                token_count.total,
+            )
+        )
+
+    async def prompt_stream_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> AsyncIterator[str]:
+        """
+        Send a user prompt to OpenAI from a coroutine and yield the response text
+        as it is generated.
+
+        Args:
+            prompt (str): User prompt text.
+            stdin (callable): Function yielding additional stdin lines.
+
+        Yields:
+            str: The response text deltas.
+        """
+        request, token_count, _ = self._command_request("prompt", prompt, stdin)
+
+        stream = await self._send_async(
+            lambda: self.async_client.responses.create(**request, stream=True),
+            token_count.total,
+        )
+        async with stream:
+            with timings.phase("streaming"):
+                async for event in stream:
+                    if event.type == "response.output_text.delta":
+                        yield event.delta
+                    elif event.type == "response.completed" and self._tracks_usage():
+                        self._record_usage(event.response.usage)
+
+    async def bool_prompt_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], mode: str = "reason"
+    ) -> Tuple[int, str]:
+        """
+        Send a true/false prompt from a coroutine, parse and return exit code and
+        model response.
+
+        Args:
+            prompt (str): True/false question prompt.
+            stdin (callable): Function yielding additional stdin lines.
+            mode (str): One of `reason`, `answer` or `confidence`.
+
+        Returns:
+            tuple[int, str]: A tuple of exit code and raw JSON response.
+        """
+        request, token_count, _ = self._command_request(
+            "bool", prompt, stdin, bool_mode=mode
+        )
+
+        response = await self._send_async(
+            lambda: self.async_client.responses.create(**request),
+            token_count.total,
+        )
+
+        return self._command_result("bool", response, None, mode)
+
+    async def structured_async(
+        self,
+        prompt: str,
+        stdin: Callable[[], Iterable[str]],
+        schema: str,
+    ) -> str:
+        """
+        Generate a structured response from a coroutine using a provided JSON schema.
 
         Args:
             prompt (str): The user prompt to send to the LLM.
@@ -160,41 +622,132 @@ class Client(BaseBackend):
         Raises:
             SystemExit: If the provided schema is invalid.
         """
-        validator_cls = jsonschema.validators.validator_for(schema)
-        with open(schema) as schema_fh:
-            schema_obj = {
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "clai",
-                    "schema": json.load(schema_fh),
-                    "strict": True,
-                },
-            }
+        request, token_count, schema = self._command_request(
+            "structured", prompt, stdin, schema
+        )
 
-        try:
-            validator_cls.check_schema(schema_obj["json_schema"])
-        except jsonschema.exceptions.SchemaError as e:
-            print("❌ Invalid JSON Schema:", e)
-            sys.exit(1)
+        response = await self._send_async(
+            lambda: self.async_client.responses.create(**request),
+            token_count.total,
+        )
 
-        final_p = [self.vtl.add(prompt)]
-        final_i = [self.vtl.add(self.system)]
+        return self._command_result("structured", response, schema)[1]
 
-        for line in stdin():
-            final_p.append(self.vtl.add(line))
+    def batch_request(
+        self,
+        command: str,
+        prompt: str,
+        stdin: Callable[[], Iterable[str]],
+        schema: str | None = None,
+        bool_mode: str = "reason",
+    ) -> Dict[str, Any]:
+        """
+        Build the request body of a command for the Batch API.
 
-        if self.debug:
-            print("Instructions: ", final_i)
-            print("Prompt: ", final_p)
+        Args:
+            command (str): One of `prompt`, `bool` or `structured`.
+            prompt (str): User prompt text.
+            stdin (callable): Function yielding additional stdin lines.
+            schema (str | None): Path to the JSON schema file for `structured`.
+            bool_mode (str): One of `reason`, `answer` or `confidence` for `bool`.
 
-        request = {
-            "model": self.model,
-            "temperature": self.temperature,
-            "instructions": "\n".join(final_i),
-            "input": "\n".join(final_p),
-            "text": schema_obj,
-        }
-        if self.reasoning is not None:
-            request["reasoning"] = self._reasoning()
+        Returns:
+            dict: The Responses API request body.
+        """
+        return self._command_request(command, prompt, stdin, schema, bool_mode)[0]
 
-        return get_output_text(self.client.responses.create(**request))
+    def batch_result(
+        self,
+        command: str,
+        body: Dict[str, Any],
+        schema: str | None = None,
+        bool_mode: str = "reason",
+    ) -> Tuple[int, str]:
+        """
+        Convert the response body of a Batch API request into the command result.
+
+        Args:
+            command (str): One of `prompt`, `bool` or `structured`.
+            body (dict): The Responses API response body.
+            schema (str | None): Path to the JSON schema file for `structured`.
+            bool_mode (str): One of `reason`, `answer` or `confidence` for `bool`.
+
+        Returns:
+            tuple[int, str]: The exit code and the response content.
+        """
+        response = get_response(body)
+        if self._tracks_usage() and getattr(response, "usage", None) is not None:
+            self._record_usage(response.usage)
+
+        return self._command_result(
+            command,
+            response,
+            None if schema is None else load_schema(schema),
+            bool_mode,
+        )
+
+    def submit_batch(self, input_fh: BinaryIO) -> str:
+        """
+        Upload a Batch API input file and create a batch processing it.
+
+        Args:
+            input_fh (BinaryIO): The JSONL input file.
+
+        Returns:
+            str: The id of the batch.
+        """
+
+        def upload() -> Any:
+            input_fh.seek(0)
+            return self.client.files.create(
+                file=("requests.jsonl", input_fh), purpose="batch"
+            )
+
+        input_file = self._send(upload)
+        batch = self._send(
+            lambda: self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=self.batch_endpoint,
+                completion_window="24h",
+            )
+        )
+
+        return batch.id
+
+    def get_batch(self, batch_id: str) -> BatchJob:
+        """
+        Retrieve the status of a batch.
+
+        Args:
+            batch_id (str): The id of the batch.
+
+        Returns:
+            BatchJob: The status, request counts and result files of the batch.
+        """
+        batch = self._send(lambda: self.client.batches.retrieve(batch_id))
+        counts = batch.request_counts
+
+        return BatchJob(
+            id=batch.id,
+            status=batch.status,
+            total=counts.total if counts else 0,
+            completed=counts.completed if counts else 0,
+            failed=counts.failed if counts else 0,
+            output_file_id=batch.output_file_id,
+            error_file_id=batch.error_file_id,
+        )
+
+    def read_batch_file(self, file_id: str) -> Iterator[Dict[str, Any]]:
+        """
+        Download a Batch API output or error file.
+
+        Args:
+            file_id (str): The id of the file.
+
+        Yields:
+            dict: The result lines.
+        """
+        content = self._send(lambda: self.client.files.content(file_id))
+        for line in content.text.splitlines():
+            if line.strip():
+                yield json.loads(line)
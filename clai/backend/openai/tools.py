@@ -5,12 +5,22 @@
 # This software is released under the MIT License.
 # See the LICENSE file in the project root for more information.
 
-from typing import Callable, Iterable, List
+import json
+import os
+from functools import cache
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Tuple
 
-import tiktoken
+from clai import timings
+from clai.backend import BaseValidateTokenLength, TokenCount
 
+if TYPE_CHECKING:
+    import tiktoken
+
+
+def _encoding_for_model(model: str) -> "tiktoken.Encoding":
+    import tiktoken
 
-def get_tokenizer(model: str) -> tiktoken.Encoding:
     try:
         return tiktoken.encoding_for_model(model)
     except KeyError:
@@ -31,55 +41,167 @@ def get_tokenizer(model: str) -> tiktoken.Encoding:
         raise
 
 
+def get_tokenizer(model: str, cache_dir: str | None = None) -> "tiktoken.Encoding":
+    """
+    Load the tiktoken encoding of a model.
+
+    `tiktoken` downloads the encoding files on first use and stores them in its
+    cache directory. Pointing `cache_dir` to a directory pre-seeded with these
+    files avoids any network access.
+
+    Args:
+        model (str): Model name to select the tokenizer.
+        cache_dir (str | None): The tiktoken cache directory to use.
+
+    Returns:
+        tiktoken.Encoding: The encoding of the model.
+
+    Raises:
+        KeyError: If the model is unknown to tiktoken.
+        Exception: If the encoding files could not be loaded.
+    """
+    if cache_dir is not None:
+        os.environ["TIKTOKEN_CACHE_DIR"] = os.path.expanduser(cache_dir)
+
+    try:
+        return _encoding_for_model(model)
+    except KeyError:
+        raise
+    except Exception as err:
+        raise Exception(
+            f"Failed to load the tokenizer of model `{model}` ({err}). Configure a pre-seeded `tokenizer_cache` or set `token_counting` to `approximate` or `off`."
+        )
+
+
 def get_output_text(response) -> str:
     texts = []
 
+    with timings.phase("parsing"):
+        for output in response.output:
+            if output.type != "message":
+                continue
+
+            message_text = []
+            for content in output.content:
+                if content.type == "output_text":
+                    message_text.append(content.text)
+
+            if message_text:
+                texts.append("".join(message_text))
+
+    if not texts:
+        return ""
+
+    return texts[-1]
+
+
+def get_output_logprobs(response) -> List[Any]:
+    """
+    Return the token logprobs of the last output message of a response.
+
+    Args:
+        response (Response): The response, requested with the
+            `message.output_text.logprobs` include.
+
+    Returns:
+        list: The logprobs of the output text tokens.
+    """
+    logprobs = []
     for output in response.output:
         if output.type != "message":
             continue
 
-        message_text = []
+        message_logprobs = []
         for content in output.content:
             if content.type == "output_text":
-                message_text.append(content.text)
+                message_logprobs.extend(getattr(content, "logprobs", None) or [])
 
-        if message_text:
-            texts.append("".join(message_text))
+        if message_logprobs:
+            logprobs = message_logprobs
 
-    if not texts:
-        return ""
+    return logprobs
 
-    return texts[-1]
 
+def get_response(body: Dict[str, Any]) -> SimpleNamespace:
+    """
+    Return a Responses API response body with attribute access, like the
+    responses returned by the SDK.
+
+    Args:
+        body (dict): The response body.
+
+    Returns:
+        SimpleNamespace: The response.
+    """
+    return json.loads(
+        json.dumps(body), object_hook=lambda value: SimpleNamespace(**value)
+    )
+
+
+def get_usage(usage) -> Dict[str, int]:
+    """
+    Return the token usage of a Responses API response.
+
+    Args:
+        usage (ResponseUsage): The usage of the response.
 
-class ValidateTokenLength:
-    def __init__(self, model: str, max_tokens: int) -> None:
+    Returns:
+        dict: The number of input, output, total, cached and reasoning tokens.
+    """
+    input_details = getattr(usage, "input_tokens_details", None)
+    output_details = getattr(usage, "output_tokens_details", None)
+
+    return {
+        "input_tokens": usage.input_tokens or 0,
+        "output_tokens": usage.output_tokens or 0,
+        "total_tokens": usage.total_tokens or 0,
+        "cached_tokens": getattr(input_details, "cached_tokens", None) or 0,
+        "reasoning_tokens": getattr(output_details, "reasoning_tokens", None) or 0,
+    }
+
+
+@cache
+def get_max_token_bytes(tokenizer: "tiktoken.Encoding") -> int:
+    return max(len(token) for token in tokenizer.token_byte_values())
+
+
+class ValidateTokenLength(BaseValidateTokenLength):
+    def __init__(
+        self,
+        model: str,
+        max_tokens: int,
+        token_counting: str = "exact",
+        cache_dir: str | None = None,
+    ) -> None:
         """
         Initialize the token length validator.
 
         Args:
             model (str): Model name to select the tokenizer.
             max_tokens (int): Maximum number of tokens allowed.
+            token_counting (str): One of `exact`, `approximate` or `off`.
+            cache_dir (str | None): The tiktoken cache directory to use.
         """
-        self.tokenizer = get_tokenizer(model)
+        super().__init__(max_tokens=max_tokens, token_counting=token_counting)
+        if token_counting == "exact":
+            self.tokenizer = get_tokenizer(model, cache_dir=cache_dir)
 
-        self.total_tokens = 0
-        self.max_tokens = max_tokens
+    def count_exact(self, batch: List[str]) -> int:
+        if len(batch) == 1:
+            return len(self.tokenizer.encode_ordinary(batch[0]))
 
-    def add(self, data: str) -> None:
-        """
-        Add the token count of data to the running total and raise if limit exceeded.
+        return sum(
+            len(tokens) for tokens in self.tokenizer.encode_ordinary_batch(batch)
+        )
 
-        Args:
-            data (str): Text to tokenize and count.
+    def max_token_bytes(self) -> int:
+        return get_max_token_bytes(self.tokenizer)
 
-        Raises:
-            Exception: If total token count exceeds max_tokens.
-        """
-        self.total_tokens += len(self.tokenizer.encode(data))
-        if self.total_tokens > self.max_tokens:
-            raise Exception(f"Total input exceeds {self.total_tokens} tokens.")
-        return data
+    def encode(self, data: str) -> List[int]:
+        return self.tokenizer.encode_ordinary(data)
+
+    def decode(self, tokens: List[int]) -> str:
+        return self.tokenizer.decode(tokens)
 
 
 def build_messages(
@@ -88,10 +210,13 @@ def build_messages(
     system: str,
     prompts: List[str],
     stdin: Callable[[], Iterable[str]],
-) -> list[dict[str, str]]:
+    token_counting: str = "exact",
+) -> Tuple[list[dict[str, str]], TokenCount]:
     messages = []
 
-    vtl = ValidateTokenLength(model=model, max_tokens=max_tokens)
+    vtl = ValidateTokenLength(
+        model=model, max_tokens=max_tokens, token_counting=token_counting
+    )
 
     vtl.add(system)
     messages.append({"role": "system", "content": system.lstrip().rstrip()})
@@ -100,14 +225,13 @@ def build_messages(
         vtl.add(prompt)
         messages.append({"role": "user", "content": prompt.lstrip().rstrip()})
 
-    stdin_content = []
-    for line in stdin():
-        vtl.add(line)
-        stdin_content.append(line.lstrip().rstrip())
+    stdin_content = vtl.add_many(
+        (line.lstrip().rstrip() for line in stdin()), separator=""
+    )
 
     if len(stdin_content) > 0:
         messages.append(
             {"role": "user", "content": "".join(stdin_content)},
         )
 
-    return messages
+    return messages, vtl.result()
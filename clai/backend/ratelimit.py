@@ -0,0 +1,311 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  ratelimit.py
+#
+
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, TypeVar
+
+from clai import ledger
+from clai.backend.transport import get_httpx
+
+T = TypeVar("T")
+
+# Status codes of responses worth retrying besides all 5xx responses.
+RETRY_STATUS_CODES = (408, 409, 429)
+
+
+class RetrySettings(NamedTuple):
+    max_retries: int = 3
+    initial_backoff: float = 0.5
+    max_backoff: float = 30.0
+    budget_ratio: float = 0.2
+    budget_min: int = 10
+    max_retry_after: float = 300.0
+
+
+def get_retry_settings(retry: Dict[str, Any] | None) -> RetrySettings:
+    """
+    Validate the `retry` parameters of a backend instance.
+
+    Args:
+        retry (dict | None): The retry parameters.
+
+    Returns:
+        RetrySettings: The retry parameters completed with defaults.
+
+    Raises:
+        ValueError: If an unknown retry parameter is provided.
+    """
+    retry = retry or {}
+    unknown = set(retry) - set(RetrySettings._fields)
+    if unknown:
+        supported = ", ".join(RetrySettings._fields)
+        raise ValueError(
+            f"Unknown retry parameter `{sorted(unknown)[0]}`. Supported parameters are: {supported}"
+        )
+
+    return RetrySettings(**retry)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilling `rate` tokens per minute.
+
+    Callers reserve tokens up front and sleep off the deficit outside of the
+    lock, so concurrent callers are served in arrival order.
+
+    Args:
+        rate (int): The number of tokens added per minute, which is also the
+            capacity of the bucket.
+    """
+
+    def __init__(self, rate: int) -> None:
+        if rate <= 0:
+            raise ValueError("Rate limits must be positive.")
+        self.rate = rate
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount: int) -> float:
+        """
+        Take `amount` tokens from the bucket.
+
+        Args:
+            amount (int): The number of tokens, capped at the bucket capacity.
+
+        Returns:
+            float: The number of seconds to wait before the tokens are available.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.rate, self.tokens + (now - self.updated) * self.rate / 60
+            )
+            self.updated = now
+            self.tokens -= min(amount, self.rate)
+
+            return max(0.0, -self.tokens * 60 / self.rate)
+
+
+class RateLimiter:
+    """
+    Enforces requests-per-minute and tokens-per-minute limits and retries failed
+    requests with jittered exponential backoff.
+
+    Retries honor the full delay of the `Retry-After` header of the response, up
+    to `max_retry_after` seconds, and are limited by a retry budget: retries may
+    not exceed `budget_min` plus `budget_ratio` of the number of requests, which
+    prevents retry storms when a backend is down.
+
+    Args:
+        rpm (int | None): The maximum number of requests per minute.
+        tpm (int | None): The maximum number of input tokens per minute.
+        retry (RetrySettings): The retry settings.
+        retryable (callable): Function returning True when an exception is
+            worth retrying.
+    """
+
+    def __init__(
+        self,
+        rpm: int | None,
+        tpm: int | None,
+        retry: RetrySettings,
+        retryable: Callable[[Exception], bool],
+    ) -> None:
+        self.requests_bucket = None if rpm is None else TokenBucket(rpm)
+        self.tokens_bucket = None if tpm is None else TokenBucket(tpm)
+        self.retry = retry
+        self.retryable = retryable
+        self.counters = {"requests": 0, "retries": 0, "throttled": 0, "waited": 0.0}
+        self.lock = threading.Lock()
+
+    def _count(self, name: str, value: float = 1) -> None:
+        with self.lock:
+            self.counters[name] += value
+
+    def _wait(self, seconds: float) -> None:
+        if seconds > 0:
+            self._count("waited", seconds)
+            time.sleep(seconds)
+
+    async def _wait_async(self, seconds: float) -> None:
+        import asyncio
+
+        if seconds > 0:
+            self._count("waited", seconds)
+            await asyncio.sleep(seconds)
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        Reserve a request and its tokens and return the number of seconds to wait.
+        """
+        wait = 0.0
+        if self.requests_bucket is not None:
+            wait = max(wait, self.requests_bucket.reserve(1))
+        if self.tokens_bucket is not None:
+            wait = max(wait, self.tokens_bucket.reserve(tokens))
+        if wait > 0:
+            self._count("throttled")
+
+        return wait
+
+    def _throttle(self, tokens: int) -> None:
+        self._wait(self._reserve(tokens))
+
+    def _backoff(self, attempt: int, err: Exception) -> float:
+        """
+        Return the number of seconds to wait before retrying a failed request.
+
+        Raises:
+            Exception: If the `Retry-After` header requests a longer delay than
+                `max_retry_after`.
+        """
+        retry_after = get_retry_after(err)
+        if retry_after is not None:
+            if retry_after > self.retry.max_retry_after:
+                raise Exception(
+                    f"The backend asked to retry after {retry_after:g} seconds, "
+                    f"which exceeds max_retry_after ({self.retry.max_retry_after:g} seconds)."
+                ) from err
+            return retry_after
+
+        import random
+
+        # Full jitter spreads the retries of concurrent requests.
+        return random.uniform(
+            0, min(self.retry.max_backoff, self.retry.initial_backoff * 2**attempt)
+        )
+
+    def _within_budget(self) -> bool:
+        with self.lock:
+            requests = self.counters["requests"]
+            budget = self.retry.budget_min + self.retry.budget_ratio * requests
+            if self.counters["retries"] < budget:
+                self.counters["retries"] += 1
+                return True
+            return False
+
+    def call(self, send: Callable[[], T], tokens: int = 0) -> T:
+        """
+        Send a request within the rate limits, retrying it on transient errors.
+
+        Args:
+            send (callable): Function sending the request.
+            tokens (int): The number of input tokens of the request.
+
+        Returns:
+            The return value of `send`.
+
+        Raises:
+            Exception: The error of the last attempt.
+        """
+        self._count("requests")
+        attempt = 0
+        while True:
+            self._throttle(tokens)
+            try:
+                return send()
+            except Exception as err:
+                if attempt >= self.retry.max_retries or not self.retryable(err):
+                    raise
+                delay = self._backoff(attempt, err)
+                if not self._within_budget():
+                    raise
+                self._wait(delay)
+                ledger.add_retry()
+                attempt += 1
+
+    async def call_async(self, send: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        """
+        Send a request within the rate limits from a coroutine, retrying it on
+        transient errors without blocking the event loop.
+
+        Args:
+            send (callable): Function returning the awaitable sending the request.
+            tokens (int): The number of input tokens of the request.
+
+        Returns:
+            The result of the awaitable returned by `send`.
+
+        Raises:
+            Exception: The error of the last attempt.
+        """
+        self._count("requests")
+        attempt = 0
+        while True:
+            await self._wait_async(self._reserve(tokens))
+            try:
+                return await send()
+            except Exception as err:
+                if attempt >= self.retry.max_retries or not self.retryable(err):
+                    raise
+                delay = self._backoff(attempt, err)
+                if not self._within_budget():
+                    raise
+                await self._wait_async(delay)
+                ledger.add_retry()
+                attempt += 1
+
+
+def is_retryable(err: Exception) -> bool:
+    """
+    Determine whether a request failed due to a transient error.
+
+    Args:
+        err (Exception): The error raised by the SDK.
+
+    Returns:
+        bool: True for throttled requests, server errors and connection errors.
+    """
+    status_code = getattr(err, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRY_STATUS_CODES or status_code >= 500
+
+    return isinstance(err, (ConnectionError, TimeoutError, get_httpx().TransportError))
+
+
+def get_retry_after(err: Exception) -> float | None:
+    """
+    Return the delay requested by the `Retry-After` headers of an error response.
+
+    Args:
+        err (Exception): The error raised by the SDK.
+
+    Returns:
+        float | None: The number of seconds to wait or None when not provided.
+    """
+    headers = getattr(err, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(err, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    try:
+        return float(headers["retry-after-ms"]) / 1000
+    except (KeyError, ValueError):
+        pass
+
+    import email.utils
+
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(
+            0.0,
+            email.utils.parsedate_to_datetime(value).timestamp() - time.time(),
+        )
+    except (TypeError, ValueError):
+        return None
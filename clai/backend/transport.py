@@ -0,0 +1,170 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  transport.py
+#
+
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, NamedTuple
+
+if TYPE_CHECKING:
+    import weakref
+
+
+class TransportSettings(NamedTuple):
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    http2: bool = False
+    connect_timeout: float = 5.0
+    read_timeout: float = 600.0
+
+
+_http_clients: Dict[tuple, Any] = {}
+_lock = threading.Lock()
+
+
+def get_httpx() -> Any:
+    # Recent SDK releases are built on the httpx2 fork of httpx.
+    try:
+        import httpx
+    except ImportError:
+        import httpx2 as httpx
+
+    return httpx
+
+
+def get_transport_settings(transport: Dict[str, Any] | None) -> TransportSettings:
+    """
+    Validate the `transport` parameters of a backend instance.
+
+    Args:
+        transport (dict | None): The transport parameters.
+
+    Returns:
+        TransportSettings: The transport parameters completed with defaults.
+
+    Raises:
+        ValueError: If an unknown transport parameter is provided.
+    """
+    transport = transport or {}
+    unknown = set(transport) - set(TransportSettings._fields)
+    if unknown:
+        supported = ", ".join(TransportSettings._fields)
+        raise ValueError(
+            f"Unknown transport parameter `{sorted(unknown)[0]}`. Supported parameters are: {supported}"
+        )
+
+    return TransportSettings(**transport)
+
+
+def get_timeout(settings: TransportSettings) -> Any:
+    """
+    Return the httpx timeout for the transport settings.
+
+    Args:
+        settings (TransportSettings): The transport settings.
+
+    Returns:
+        httpx.Timeout: The timeout.
+    """
+    return get_httpx().Timeout(settings.read_timeout, connect=settings.connect_timeout)
+
+
+def create_http_client(
+    settings: TransportSettings, factory: Callable[..., Any] | None = None
+) -> Any:
+    """
+    Create an HTTP client with the connection pool and timeouts of the transport settings.
+
+    Args:
+        settings (TransportSettings): The transport settings.
+        factory (callable | None): The httpx client class to instantiate, such as
+            `httpx.AsyncClient` or the SDK specific default client. Defaults to
+            `httpx.Client`.
+
+    Returns:
+        httpx.Client | httpx.AsyncClient: The HTTP client.
+
+    Raises:
+        Exception: If HTTP/2 is enabled but the `h2` package is not installed.
+    """
+    httpx = get_httpx()
+    try:
+        return (factory or httpx.Client)(
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+            timeout=get_timeout(settings),
+            http2=settings.http2,
+            follow_redirects=True,
+        )
+    except ImportError as err:
+        raise Exception(
+            f"HTTP/2 requires the `h2` package, install it or disable `http2`: {err}"
+        )
+
+
+def get_http_client(
+    endpoint: str,
+    settings: TransportSettings,
+    factory: Callable[..., Any] | None = None,
+) -> Any:
+    """
+    Return the pooled HTTP client shared by all clients of an endpoint.
+
+    Clients talking to the same endpoint with the same transport settings share
+    a connection pool for the lifetime of the process, so repeated and
+    concurrent requests reuse established connections.
+
+    Args:
+        endpoint (str): The base URL of the API.
+        settings (TransportSettings): The transport settings.
+        factory (callable | None): The httpx client class to instantiate, such as
+            the SDK specific default client. Defaults to `httpx.Client`.
+
+    Returns:
+        httpx.Client: The shared HTTP client.
+
+    Raises:
+        Exception: If HTTP/2 is enabled but the `h2` package is not installed.
+    """
+    key = (endpoint, settings)
+    with _lock:
+        if key not in _http_clients:
+            _http_clients[key] = create_http_client(settings, factory)
+        return _http_clients[key]
+
+
+def get_loop_client(
+    clients: "weakref.WeakKeyDictionary", factory: Callable[[], Any]
+) -> Any:
+    """
+    Return the asynchronous client of the running event loop.
+
+    Asynchronous connection pools are bound to the event loop they are first
+    used on and can't be used once it is closed, for example by the next
+    `asyncio.run`. A client is therefore created per event loop and dropped
+    together with it.
+
+    Args:
+        clients (weakref.WeakKeyDictionary): The clients keyed by event loop.
+        factory (callable): Function creating the client of a new event loop.
+
+    Returns:
+        Any: The client of the running event loop.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    client = clients.get(loop)
+    if client is None:
+        client = clients.setdefault(loop, factory())
+
+    return client
@@ -0,0 +1,272 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  batch.py
+#
+
+import json
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, TextIO
+
+from clai.cache import make_key
+from clai.commands import run_command
+from clai.dedup import SingleFlight
+from clai.tools import BOOL_MODES, bounded_map
+
+COMMANDS = ("prompt", "bool", "structured")
+
+
+def read_requests(fh: TextIO) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily parse a JSONL stream of request specs, skipping blank lines.
+
+    Each spec is a JSON object with the following keys:
+
+    - `command` (optional): One of `prompt`, `bool` or `structured`. Defaults to `prompt`.
+    - `prompt` (optional): The prompt to execute.
+    - `input` (optional): A string or a list of lines used as stdin.
+    - `schema` (optional): Path to the JSON schema file used by `structured`.
+    - `bool_mode` (optional): One of `reason`, `answer` or `confidence` for
+      `bool`. Defaults to `reason`.
+    - `backend`/`instance` (optional): Override the backend instance.
+    - `id` (optional): Returned as is in the result.
+
+    Args:
+        fh (TextIO): The file handle to read from.
+
+    Yields:
+        dict: The parsed request spec.
+
+    Raises:
+        Exception: If a line is not a valid request spec.
+    """
+    for number, line in enumerate(fh, start=1):
+        if not line.strip():
+            continue
+        try:
+            spec = json.loads(line)
+        except json.JSONDecodeError as err:
+            raise Exception(f"Line {number} is not valid JSON: {err}")
+        if not isinstance(spec, dict):
+            raise Exception(f"Line {number} is not a JSON object.")
+        if spec.setdefault("command", "prompt") not in COMMANDS:
+            raise Exception(
+                f"Line {number} has unsupported command `{spec['command']}`."
+            )
+        if spec.get("bool_mode", "reason") not in BOOL_MODES:
+            raise Exception(
+                f"Line {number} has unsupported bool mode `{spec['bool_mode']}`."
+            )
+        yield spec
+
+
+class ClientRegistry:
+    """
+    Thread-safe registry holding a single client per backend instance.
+
+    Args:
+        factory (callable): Function creating a client for a `(backend, instance)` pair.
+    """
+
+    def __init__(self, factory: Callable[[str, str], Any]) -> None:
+        self.factory = factory
+        self.clients: Dict[tuple, Any] = {}
+        self.lock = threading.Lock()
+
+    def get(self, backend: str, instance: str) -> Any:
+        with self.lock:
+            if (backend, instance) not in self.clients:
+                self.clients[(backend, instance)] = self.factory(backend, instance)
+            return self.clients[(backend, instance)]
+
+
+def execute_request(
+    clients: ClientRegistry,
+    spec: Dict[str, Any],
+    backend: str,
+    instance: str,
+    dedup: SingleFlight | None = None,
+) -> Dict[str, Any]:
+    """
+    Execute a single request spec and convert the outcome into a result record.
+
+    Args:
+        clients (ClientRegistry): The client registry.
+        spec (dict): The request spec.
+        backend (str): The default backend.
+        instance (str): The default backend instance.
+        dedup (SingleFlight | None): Coalesces identical requests when provided.
+
+    Returns:
+        dict: The result record containing `exit_code`, `output` and `error`.
+    """
+    result = {"exit_code": 0, "output": None, "error": None}
+
+    stdin = spec.get("input") or []
+    if isinstance(stdin, str):
+        stdin = stdin.splitlines()
+    stdin_lines = [line.strip() for line in stdin]
+    backend = spec.get("backend", backend)
+    instance = spec.get("instance", instance)
+    command = spec.get("command", "prompt")
+    bool_mode = spec.get("bool_mode", "reason") if command == "bool" else "reason"
+
+    def execute() -> Dict[str, Any]:
+        try:
+            result["exit_code"], result["output"] = run_command(
+                client=clients.get(backend, instance),
+                command=command,
+                prompt=spec.get("prompt", ""),
+                stdin_lines=stdin_lines,
+                schema=spec.get("schema"),
+                bool_mode=bool_mode,
+            )
+        except SystemExit as err:
+            result["exit_code"] = err.code
+            result["error"] = "Command aborted."
+        except Exception as err:
+            result["exit_code"] = 1
+            result["error"] = f"Failed to execute command. Reason: {err}"
+
+        return result
+
+    if dedup is None:
+        result = execute()
+    else:
+        # Within a run, the instance, command, schema, prompt and stdin
+        # determine the request payload.
+        try:
+            key = make_key(
+                {"backend": backend, "instance": instance},
+                command if bool_mode == "reason" else f"{command}:{bool_mode}",
+                spec.get("prompt", ""),
+                stdin_lines,
+                spec.get("schema"),
+            )
+        except Exception:
+            key = None
+        result = execute() if key is None else dict(dedup.do(key, execute))
+
+    if "id" in spec:
+        result["id"] = spec["id"]
+
+    return result
+
+
+def run_batch(
+    requests: Iterable[Dict[str, Any]],
+    clients: ClientRegistry,
+    backend: str,
+    instance: str,
+    concurrency: int,
+    ordered: bool = True,
+    dedup: SingleFlight | None = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Execute request specs concurrently and yield their result records.
+
+    Args:
+        requests (iterable): The request specs.
+        clients (ClientRegistry): The client registry.
+        backend (str): The default backend.
+        instance (str): The default backend instance.
+        concurrency (int): Maximum number of requests in flight.
+        ordered (bool): Yield results in input order when True, otherwise in
+            completion order.
+        dedup (SingleFlight | None): Coalesces identical requests when provided.
+
+    Yields:
+        dict: The result record including the `index` of the request.
+    """
+    for index, result in bounded_map(
+        lambda spec: execute_request(clients, spec, backend, instance, dedup),
+        requests,
+        concurrency=concurrency,
+        ordered=ordered,
+    ):
+        yield {"index": index} | result
+
+
+def map_requests(
+    records: Iterable[List[str]],
+    command: str,
+    prompt: str,
+    schema: str | None,
+    bool_mode: str = "reason",
+) -> Iterator[Dict[str, Any]]:
+    """
+    Convert records into request specs executing the same command.
+
+    Args:
+        records (iterable): The records, each a list of lines used as stdin.
+        command (str): One of `prompt`, `bool` or `structured`.
+        prompt (str): The prompt executed for every record.
+        schema (str | None): Path to the JSON schema file for `structured`.
+        bool_mode (str): One of `reason`, `answer` or `confidence` for `bool`.
+
+    Returns:
+        iterator: The request specs.
+
+    Raises:
+        Exception: If `structured` is used without a schema or a bool mode is
+            used with another command.
+    """
+    if command == "structured" and not schema:
+        raise Exception("The `structured` command requires `--schema`.")
+    if command != "bool" and bool_mode != "reason":
+        raise Exception("`--no-reason` and `--confidence` require `--command bool`.")
+
+    return (
+        {
+            "command": command,
+            "prompt": prompt,
+            "input": record,
+            "schema": schema,
+            "bool_mode": bool_mode,
+        }
+        for record in records
+    )
+
+
+def run_map(
+    records: Iterable[List[str]],
+    clients: ClientRegistry,
+    command: str,
+    prompt: str,
+    schema: str | None,
+    backend: str,
+    instance: str,
+    concurrency: int,
+    dedup: SingleFlight | None = None,
+    bool_mode: str = "reason",
+) -> Iterator[Dict[str, Any]]:
+    """
+    Execute the same command for every record and yield the results in input order.
+
+    Args:
+        records (iterable): The records, each a list of lines used as stdin.
+        clients (ClientRegistry): The client registry.
+        command (str): One of `prompt`, `bool` or `structured`.
+        prompt (str): The prompt executed for every record.
+        schema (str | None): Path to the JSON schema file for `structured`.
+        backend (str): The backend.
+        instance (str): The backend instance.
+        concurrency (int): Maximum number of records in flight.
+        dedup (SingleFlight | None): Coalesces identical records when provided.
+        bool_mode (str): One of `reason`, `answer` or `confidence` for `bool`.
+
+    Yields:
+        dict: The result record including the `index` of the record.
+    """
+    return run_batch(
+        requests=map_requests(records, command, prompt, schema, bool_mode),
+        clients=clients,
+        backend=backend,
+        instance=instance,
+        concurrency=concurrency,
+        dedup=dedup,
+    )
@@ -0,0 +1,507 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  cache.py
+#
+
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+
+from clai import ledger
+from clai.schema import load_schema
+
+DEFAULT_PATH = "~/.cache/clai/responses.sqlite"
+DEFAULT_TTL = 86400
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+# The number of bytes of stdin held in memory before it is spooled to disk.
+SPOOL_SIZE = 1024 * 1024
+# The number of bytes of spooled lines read at once when replaying.
+SPOOL_READ_SIZE = 64 * 1024
+# The fraction of `max_size` the cache is reduced to when it is exceeded, so
+# eviction runs once per batch of inserts instead of on every insert.
+EVICTION_TARGET = 0.9
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed response cache stored in SQLite.
+
+    Entries expire `ttl` seconds after they were stored. The total size of the
+    stored responses is kept in the `counters` table. When it exceeds
+    `max_size` bytes, the entries not read within `ttl` and then the least
+    recently used entries are evicted until `EVICTION_TARGET` of `max_size` is
+    left.
+
+    Args:
+        path (str): Path of the SQLite database (tilde-expansion supported).
+        ttl (int): Number of seconds an entry remains valid.
+        max_size (int): Maximum total size in bytes of the stored responses.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        ttl: int = DEFAULT_TTL,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ) -> None:
+        import sqlite3
+
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(
+            self.path, timeout=10, check_same_thread=False, isolation_level=None
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, value TEXT, size INTEGER, created REAL, accessed REAL)"
+        )
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)"
+        )
+        # Caches created before the size was tracked are measured once.
+        self.db.execute(
+            "INSERT OR IGNORE INTO counters "
+            "SELECT 'size', COALESCE(SUM(size), 0) FROM entries"
+        )
+
+    def _count(self, name: str, value: int = 1) -> None:
+        self.db.execute(
+            "INSERT INTO counters VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, value),
+        )
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def _delete(self, condition: str, *args: Any) -> int:
+        """
+        Delete the entries matching `condition` and return the number of bytes freed.
+        """
+        freed = sum(
+            size
+            for (size,) in self.db.execute(
+                f"DELETE FROM entries WHERE {condition} RETURNING size", args
+            )
+        )
+        if freed:
+            self._count("size", -freed)
+
+        return freed
+
+    def _evict(self, now: float) -> None:
+        """
+        Evict expired and least recently used entries once `max_size` is exceeded.
+        """
+        size = self.db.execute(
+            "SELECT value FROM counters WHERE name = 'size'"
+        ).fetchone()[0]
+        if size <= self.max_size:
+            return
+
+        excess = size - self._delete("accessed < ?", now - self.ttl)
+        excess -= self.max_size * EVICTION_TARGET
+        keys = []
+        # The index on `accessed` yields the least recently used entries first,
+        # so only the evicted entries are read.
+        with contextlib.closing(
+            self.db.execute("SELECT key, size FROM entries ORDER BY accessed")
+        ) as entries:
+            for key, entry_size in entries:
+                if excess <= 0:
+                    break
+                keys.append(key)
+                excess -= entry_size
+        for key in keys:
+            self._delete("key = ?", key)
+
+    def get(self, key: str) -> Any | None:
+        """
+        Return the cached value for `key` or None when absent or expired.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Any | None: The cached value.
+        """
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] + self.ttl < now:
+                with self._transaction():
+                    self._delete("key = ? AND created < ?", key, now - self.ttl)
+                row = None
+
+            if row is None:
+                self.misses += 1
+                self._count("misses")
+                return None
+
+            self.db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            self._count("hits")
+
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store `value` under `key` and evict expired and least recently used
+        entries when the cache exceeds `max_size`.
+
+        Args:
+            key (str): The cache key.
+            value (Any): A JSON serializable value.
+        """
+        now = time.time()
+        data = json.dumps(value)
+        with self.lock:
+            with self._transaction():
+                self._delete("key = ?", key)
+                self.db.execute(
+                    "INSERT INTO entries VALUES (?, ?, ?, ?, ?)",
+                    (key, data, len(data), now, now),
+                )
+                self._count("size", len(data))
+                self._evict(now)
+
+    def counters(self) -> Dict[str, int]:
+        """
+        Return the persisted hit and miss counters across all runs.
+        """
+        with self.lock:
+            counters = dict(self.db.execute("SELECT name, value FROM counters"))
+
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0)}
+
+
+def get_response_cache(config: Dict[str, Any]) -> ResponseCache | None:
+    """
+    Create the response cache from the optional `cache` section of the config.
+
+    Args:
+        config (dict): Full configuration dictionary.
+
+    Returns:
+        ResponseCache | None: The cache or None when caching is not configured.
+    """
+    if not config.get("cache"):
+        return None
+
+    return ResponseCache(**config["cache"])
+
+
+def make_key(
+    namespace: Dict[str, Any],
+    command: str,
+    prompt: str,
+    stdin_lines: Iterable[str],
+    schema: str | None = None,
+) -> str:
+    """
+    Derive the content address of a request.
+
+    Args:
+        namespace (dict): The backend name and instance parameters.
+        command (str): One of `prompt`, `bool` or `structured`.
+        prompt (str): The prompt.
+        stdin_lines (iterable): The stdin lines.
+        schema (str | None): Path to the JSON schema file for `structured`.
+
+    Returns:
+        str: The hex digest identifying the request.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(namespace, sort_keys=True, default=str).encode())
+    digest.update(b"\0" + command.encode() + b"\0")
+    if schema is not None:
+        digest.update(load_schema(schema).content)
+    digest.update(b"\0" + prompt.encode())
+    for line in stdin_lines:
+        digest.update(b"\0" + line.encode())
+
+    return digest.hexdigest()
+
+
+class SpooledLines:
+    """
+    Spools lines to a temporary file while they are read, so they can be
+    replayed. The file is held in memory up to `max_size` bytes. Once spooled,
+    the lines can be replayed any number of times, also concurrently.
+
+    Args:
+        max_size (int): The number of bytes held in memory.
+    """
+
+    def __init__(self, max_size: int = SPOOL_SIZE) -> None:
+        import tempfile
+
+        self.fh = tempfile.SpooledTemporaryFile(
+            max_size=max_size, mode="w+", encoding="utf-8"
+        )
+        self.lock = threading.Lock()
+
+    def record(self, lines: Iterable[str]) -> Iterator[str]:
+        """
+        Yield the lines while spooling them.
+        """
+        for line in lines:
+            self.fh.write(json.dumps(line) + "\n")
+            yield line
+
+    def replay(self) -> Iterator[str]:
+        """
+        Yield the spooled lines.
+        """
+        position = 0
+        while True:
+            # Every replay keeps its own position in the shared file.
+            with self.lock:
+                self.fh.seek(position)
+                lines = []
+                size = 0
+                while size < SPOOL_READ_SIZE and (line := self.fh.readline()):
+                    lines.append(line)
+                    size += len(line)
+                position = self.fh.tell()
+            if not lines:
+                return
+            for line in lines:
+                yield json.loads(line)
+
+    def replayable(self, lines: Iterable[str]) -> Callable[[], Iterator[str]]:
+        """
+        Return a `stdin` function yielding the lines while spooling them on its
+        first call, and replaying them on later calls.
+
+        Args:
+            lines (iterable): The lines to spool.
+
+        Returns:
+            callable: The `stdin` function.
+        """
+        recording = self.record(lines)
+        calls = itertools.count()
+
+        def stdin() -> Iterator[str]:
+            if next(calls) == 0:
+                return recording
+            # Lines left unread by the first call are spooled before replaying.
+            for _ in recording:
+                pass
+            return self.replay()
+
+        return stdin
+
+    def close(self) -> None:
+        with self.lock:
+            self.fh.close()
+
+
+class CachedClient:
+    """
+    Backend client proxy answering repeated requests from the response cache.
+
+    The backend client is only created on the first cache miss so cache hits
+    never import the backend SDKs.
+
+    Args:
+        factory (callable): Function creating the backend client.
+        cache (ResponseCache): The response cache.
+        namespace (dict): The backend name and instance parameters included in
+            every cache key.
+        refresh (bool): Skip cache lookups but still store fresh responses.
+        debug (bool): Print the cache outcome to stderr.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        cache: ResponseCache,
+        namespace: Dict[str, Any],
+        refresh: bool = False,
+        debug: bool = False,
+    ) -> None:
+        self.factory = factory
+        self.cache = cache
+        self.namespace = namespace
+        self.refresh = refresh
+        self.debug = debug
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        with self._lock:
+            if self._client is None:
+                self._client = self.factory()
+            return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        # Attributes such as `max_tokens` or `chunk` come from the backend client.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _lookup(
+        self,
+        command: str,
+        prompt: str,
+        stdin_lines: Iterable[str],
+        schema: str | None = None,
+    ) -> Tuple[str, Any]:
+        key = make_key(self.namespace, command, prompt, stdin_lines, schema)
+
+        value = None if self.refresh else self.cache.get(key)
+        if value is not None:
+            ledger.mark_cache_hit()
+        if self.debug:
+            outcome = "refresh" if self.refresh else "miss" if value is None else "hit"
+            print(
+                f"Cache: {outcome} (hits={self.cache.hits}, misses={self.cache.misses})",
+                file=sys.stderr,
+            )
+
+        return key, value
+
+    def _cached(
+        self,
+        command: str,
+        prompt: str,
+        stdin: Callable[[], Iterable[str]],
+        call: Callable[[Callable[[], Iterable[str]]], Any],
+        schema: str | None = None,
+    ) -> Any:
+        # Stdin is hashed for the key while it is spooled, and replayed on a miss.
+        spool = SpooledLines()
+        try:
+            key, value = self._lookup(command, prompt, spool.record(stdin()), schema)
+            if value is not None:
+                return value
+
+            value = call(spool.replay)
+            self.cache.set(key, value)
+
+            return value
+        finally:
+            spool.close()
+
+    def prompt(self, prompt: str, stdin: Callable[[], Iterable[str]]) -> str:
+        return self._cached(
+            "prompt",
+            prompt,
+            stdin,
+            lambda stdin: self.client.prompt(prompt=prompt, stdin=stdin),
+        )
+
+    def prompt_stream(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> Iterator[str]:
+        spool = SpooledLines()
+        try:
+            key, value = self._lookup("prompt", prompt, spool.record(stdin()))
+            if value is not None:
+                yield value
+                return
+
+            chunks = []
+            for chunk in self.client.prompt_stream(prompt=prompt, stdin=spool.replay):
+                chunks.append(chunk)
+                yield chunk
+            self.cache.set(key, "".join(chunks))
+        finally:
+            spool.close()
+
+    def bool_prompt(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], **kwargs: Any
+    ) -> Tuple[int, str]:
+        # Answers without a reason are cached apart, keeping existing keys valid.
+        mode = kwargs.get("mode", "reason")
+
+        return tuple(
+            self._cached(
+                "bool" if mode == "reason" else f"bool:{mode}",
+                prompt,
+                stdin,
+                lambda stdin: self.client.bool_prompt(
+                    prompt=prompt, stdin=stdin, **kwargs
+                ),
+            )
+        )
+
+    def structured(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], schema: str
+    ) -> str:
+        def call(stdin: Callable[[], Iterable[str]]) -> str:
+            if not hasattr(self.client, "structured"):
+                raise NotImplementedError(
+                    "Structured prompt is not supported by this backend."
+                )
+            return self.client.structured(prompt=prompt, stdin=stdin, schema=schema)
+
+        return self._cached("structured", prompt, stdin, call, schema)
+
+    def structured_stream(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], schema: str
+    ) -> Iterator[str]:
+        spool = SpooledLines()
+        try:
+            key, value = self._lookup(
+                "structured:stream", prompt, spool.record(stdin()), schema
+            )
+            if value is not None:
+                spool.close()
+                return iter([value])
+
+            if not hasattr(self.client, "structured_stream"):
+                raise NotImplementedError(
+                    "Structured prompt is not supported by this backend."
+                )
+            stream = self.client.structured_stream(
+                prompt=prompt, stdin=spool.replay, schema=schema
+            )
+        except BaseException:
+            spool.close()
+            raise
+
+        def store() -> Iterator[str]:
+            try:
+                lines = []
+                for line in stream:
+                    lines.append(line)
+                    yield line
+                self.cache.set(key, "".join(lines))
+            finally:
+                spool.close()
+
+        return store()
@@ -0,0 +1,102 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  chunked.py
+#
+
+from typing import Any, Iterable, List, Tuple
+
+from clai.commands import NO_PROMPT
+from clai.prompts import REDUCE_PROMPT, STRUCTURED_REDUCE_PROMPT
+from clai.tools import bounded_map, cleanup
+
+# Tokens reserved for the separators and part headers added to the input.
+MARGIN_TOKENS = 64
+
+
+def _map(
+    client: Any,
+    command: str,
+    prompt: str,
+    chunks: Iterable[str],
+    schema: str | None,
+    concurrency: int,
+) -> List[str]:
+    def call(chunk: str) -> str:
+        if command == "structured":
+            return client.structured(
+                prompt=prompt, stdin=lambda: iter([chunk]), schema=schema
+            )
+        return client.prompt(prompt=prompt, stdin=lambda: iter([chunk]))
+
+    return [result for _, result in bounded_map(call, chunks, concurrency=concurrency)]
+
+
+def run_chunked(
+    client: Any,
+    command: str,
+    prompt: str,
+    stdin_lines: Iterable[str],
+    schema: str | None = None,
+    overlap: int = 200,
+    concurrency: int = 4,
+) -> Tuple[int, str]:
+    """
+    Execute a `prompt` or `structured` command on input larger than the context window.
+
+    The input is split on token boundaries into overlapping chunks which fit
+    within `max_tokens`, while it is read. Every chunk is processed concurrently
+    (map), with only the chunks in flight held in memory, after which
+    the partial answers are combined into one answer (reduce). When the partial
+    answers don't fit within `max_tokens` either, they are reduced in multiple
+    rounds.
+
+    Args:
+        client (Client): The backend client.
+        command (str): One of `prompt` or `structured`.
+        prompt (str): The prompt argument.
+        stdin_lines (iterable): The lines read from stdin.
+        schema (str | None): Path to the JSON schema file for `structured`.
+        overlap (int): The number of tokens shared by consecutive chunks.
+        concurrency (int): Maximum number of chunks processed simultaneously.
+
+    Returns:
+        tuple[int, str]: The exit code and the output to print.
+
+    Raises:
+        Exception: If `max_tokens` leaves no room for the input.
+    """
+    if not prompt:
+        return 1, NO_PROMPT
+
+    reduce_prompt = cleanup(
+        STRUCTURED_REDUCE_PROMPT if command == "structured" else REDUCE_PROMPT
+    )
+    size = client.max_tokens - MARGIN_TOKENS - client.count_tokens(client.system)
+    size -= client.count_tokens(reduce_prompt + prompt)
+    if size <= overlap:
+        raise Exception(
+            f"The maximum of {client.max_tokens} tokens leaves no room for chunks with an overlap of {overlap} tokens."
+        )
+
+    chunks = client.chunk_lines(stdin_lines, size=size, overlap=overlap)
+    partials = _map(client, command, prompt, chunks, schema, concurrency)
+    if client.debug:
+        print(f"Chunks: {len(partials)} of at most {size} tokens")
+
+    prompt = f"{reduce_prompt}\n{prompt}"
+    while len(partials) > 1:
+        parts = "\n\n".join(
+            f"Part {number}:\n{partial}"
+            for number, partial in enumerate(partials, start=1)
+        )
+        chunks = client.chunk(parts, size=size, overlap=0)
+        if len(chunks) >= len(partials):
+            raise Exception("The partial answers are too large to be combined.")
+        partials = _map(client, command, prompt, chunks, schema, concurrency)
+
+    return 0, partials[0]
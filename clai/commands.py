@@ -0,0 +1,97 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  commands.py
+#
+
+from typing import Any, Iterable, Tuple
+
+NO_PROMPT = "No prompt provided via argument or stdin."
+NO_STRUCTURED = "Structured prompt is not supported by this backend."
+
+
+def prepare_prompt_and_stdin(
+    prompt: str, stdin_lines: Iterable[str]
+) -> Tuple[str, Iterable[str]]:
+    """
+    Use stdin as the prompt when no prompt argument was provided.
+
+    Args:
+        prompt (str): The prompt argument.
+        stdin_lines (iterable): The lines read from stdin.
+
+    Returns:
+        tuple[str, iterable]: The prompt and remaining stdin lines.
+    """
+    if not prompt:
+        return "".join(stdin_lines).strip(), []
+
+    return prompt, stdin_lines
+
+
+def run_command(
+    client: Any,
+    command: str,
+    prompt: str,
+    stdin_lines: Iterable[str],
+    schema: str | None = None,
+    stream: bool = False,
+    bool_mode: str = "reason",
+) -> Tuple[int, Any]:
+    """
+    Execute a `prompt`, `bool` or `structured` command against a backend client.
+
+    Args:
+        client (Client): The backend client.
+        command (str): One of `prompt`, `bool` or `structured`.
+        prompt (str): The prompt argument.
+        stdin_lines (iterable): The lines read from stdin, consumed only once.
+        schema (str | None): Path to the JSON schema file for `structured`.
+        stream (bool): Return an iterator of response text deltas for `prompt`
+            or of NDJSON lines of the array elements for `structured`.
+        bool_mode (str): One of `reason`, `answer` or `confidence` for `bool`.
+
+    Returns:
+        tuple[int, Any]: The exit code and the output to print.
+    """
+    prompt, stdin_lines = prepare_prompt_and_stdin(prompt, stdin_lines)
+    if not prompt:
+        return 1, NO_PROMPT
+
+    match command:
+        case "prompt" if stream:
+            return 0, client.prompt_stream(
+                prompt=prompt, stdin=lambda: iter(stdin_lines)
+            )
+        case "prompt":
+            return 0, client.prompt(prompt=prompt, stdin=lambda: iter(stdin_lines))
+        case "bool" if bool_mode != "reason":
+            return client.bool_prompt(
+                prompt=prompt, stdin=lambda: iter(stdin_lines), mode=bool_mode
+            )
+        case "bool":
+            return client.bool_prompt(prompt=prompt, stdin=lambda: iter(stdin_lines))
+        case "structured" if stream:
+            if not hasattr(client, "structured_stream"):
+                return 2, NO_STRUCTURED
+            try:
+                return 0, client.structured_stream(
+                    prompt=prompt, stdin=lambda: iter(stdin_lines), schema=schema
+                )
+            except NotImplementedError:
+                return 2, NO_STRUCTURED
+        case "structured":
+            if not hasattr(client, "structured"):
+                return 2, NO_STRUCTURED
+            try:
+                return 0, client.structured(
+                    prompt=prompt, stdin=lambda: iter(stdin_lines), schema=schema
+                )
+            except NotImplementedError:
+                return 2, NO_STRUCTURED
+        case _:
+            raise Exception(f"Unknown command `{command}`.")
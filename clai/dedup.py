@@ -0,0 +1,107 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  dedup.py
+#
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+# The number of completed requests remembered for later duplicates.
+DEDUP_WINDOW = 4096
+
+
+class Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical requests of a run into a single call.
+
+    The first request for a key executes the call while identical requests
+    arriving in the meantime wait for its outcome. The outcomes of the last
+    `window` keys are kept, so later duplicates are answered without a call.
+
+    Args:
+        window (int): The number of completed keys to remember.
+    """
+
+    def __init__(self, window: int = DEDUP_WINDOW) -> None:
+        if window < 1:
+            raise ValueError("The dedup window must be positive.")
+        self.window = window
+        self.flights: OrderedDict[str, Flight] = OrderedDict()
+        self.counters = {"requests": 0, "deduplicated": 0}
+        self.lock = threading.Lock()
+
+    def do(self, key: str, call: Callable[[], T]) -> T:
+        """
+        Return the outcome of `call`, shared by all requests with the same key.
+
+        Args:
+            key (str): The identity of the request.
+            call (callable): Function executing the request.
+
+        Returns:
+            The return value of `call`.
+
+        Raises:
+            Exception: The error raised by `call`.
+        """
+        with self.lock:
+            self.counters["requests"] += 1
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+                if len(self.flights) > self.window:
+                    self.flights.popitem(last=False)
+            else:
+                self.flights.move_to_end(key)
+                self.counters["deduplicated"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = call()
+        except BaseException as err:
+            flight.error = err
+            raise
+        finally:
+            flight.done.set()
+
+        return flight.value
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Return the dedup counters and the fraction of requests which were deduplicated.
+
+        Returns:
+            dict: The number of requests, unique requests, deduplicated requests
+                and the dedup ratio.
+        """
+        with self.lock:
+            requests = self.counters["requests"]
+            deduplicated = self.counters["deduplicated"]
+
+        return {
+            "requests": requests,
+            "unique": requests - deduplicated,
+            "deduplicated": deduplicated,
+            "dedup_ratio": deduplicated / max(1, requests),
+        }
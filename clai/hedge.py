@@ -0,0 +1,252 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  hedge.py
+#
+
+import contextvars
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, TypeVar
+
+from clai.cache import SpooledLines
+
+T = TypeVar("T")
+
+# The number of seconds between checks whether the attempts are still running.
+WAIT_INTERVAL = 1.0
+
+
+class HedgedClient:
+    """
+    Backend client proxy sending a duplicate (hedged) request when the original
+    request hasn't completed within `hedge_after` seconds.
+
+    Whichever request succeeds first is returned. The duplicate request is sent
+    through the same client, so for an instance pool it is served by another
+    instance. Stdin is spooled before the first request, so both requests replay
+    it. The losing request is abandoned: its result is discarded and, when
+    streaming, its response stream is closed as soon as it is produced, which
+    closes its HTTP response. A blocking request still waiting for its response
+    can't be interrupted from another thread and runs to completion.
+
+    Args:
+        client (Client): The backend client or instance pool.
+        hedge_after (float): The number of seconds after which to hedge.
+    """
+
+    def __init__(self, client: Any, hedge_after: float) -> None:
+        if hedge_after <= 0:
+            raise ValueError("The hedge threshold must be positive.")
+        self.client = client
+        self.hedge_after = hedge_after
+        self.counters = {"requests": 0, "hedged": 0, "hedges_won": 0}
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        # Attributes such as `max_tokens` or `chunk` come from the backend client.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _count(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Return the hedge counters and the fraction of requests which were hedged.
+
+        Returns:
+            dict: The number of requests, hedged requests, hedges which completed
+                first and the hedge rate.
+        """
+        with self.lock:
+            return self.counters | {
+                "hedge_rate": self.counters["hedged"]
+                / max(1, self.counters["requests"])
+            }
+
+    def _spool(self, stdin: Callable[[], Iterable[str]]) -> SpooledLines:
+        """
+        Spool stdin before the first request, so it can be replayed to both.
+        """
+        spool = SpooledLines()
+        try:
+            for _ in spool.record(stdin()):
+                pass
+        except BaseException:
+            spool.close()
+            raise
+
+        return spool
+
+    def _race(
+        self,
+        call: Callable[[], T],
+        discard: Callable[[T], None] = lambda value: None,
+    ) -> T:
+        results: queue.Queue = queue.Queue()
+        state = {"decided": False}
+        lock = threading.Lock()
+        threads: List[threading.Thread] = []
+
+        def attempt(number: int) -> None:
+            # Backends abort with `SystemExit` on invalid responses, which is
+            # re-raised by the caller like any other error.
+            try:
+                outcome = (number, True, call())
+            except BaseException as err:
+                outcome = (number, False, err)
+            with lock:
+                if state["decided"]:
+                    if outcome[1]:
+                        discard(outcome[2])
+                    return
+                results.put(outcome)
+
+        def start(number: int) -> None:
+            # Usage recorded by the attempt is reported to the caller's context.
+            context = contextvars.copy_context()
+            thread = threading.Thread(
+                target=context.run, args=(attempt, number), daemon=True
+            )
+            threads.append(thread)
+            thread.start()
+
+        def wait() -> Tuple[int, bool, Any]:
+            # Fall back on the liveness of the attempts should one of them end
+            # without reporting an outcome.
+            while True:
+                try:
+                    return results.get(timeout=WAIT_INTERVAL)
+                except queue.Empty:
+                    if not any(thread.is_alive() for thread in threads):
+                        try:
+                            return results.get_nowait()
+                        except queue.Empty:
+                            raise Exception(
+                                "The hedged request ended without an outcome."
+                            )
+
+        self._count("requests")
+        start(0)
+        try:
+            outcomes = [results.get(timeout=self.hedge_after)]
+            attempts = 1
+        except queue.Empty:
+            self._count("hedged")
+            start(1)
+            outcomes = [wait()]
+            attempts = 2
+
+        # Wait for the hedge when the first completed request failed.
+        if not outcomes[0][1] and attempts == 2:
+            outcomes.append(wait())
+
+        with lock:
+            state["decided"] = True
+            while not results.empty():
+                _, succeeded, value = results.get()
+                if succeeded:
+                    discard(value)
+
+        for number, succeeded, value in outcomes:
+            if succeeded:
+                if number == 1:
+                    self._count("hedges_won")
+                return value
+        raise outcomes[0][2]
+
+    def prompt(self, prompt: str, stdin: Callable[[], Iterable[str]]) -> str:
+        spool = self._spool(stdin)
+        try:
+            return self._race(
+                lambda: self.client.prompt(prompt=prompt, stdin=spool.replay)
+            )
+        finally:
+            spool.close()
+
+    def prompt_stream(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> Iterator[str]:
+        spool = self._spool(stdin)
+
+        # Race for the first text delta.
+        def start() -> Tuple[List[str], Iterator[str]]:
+            stream = self.client.prompt_stream(prompt=prompt, stdin=spool.replay)
+            first = next(stream, None)
+            return [] if first is None else [first], stream
+
+        try:
+            first, stream = self._race(start, discard=lambda value: value[1].close())
+            yield from first
+            yield from stream
+        finally:
+            spool.close()
+
+    def bool_prompt(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], **kwargs: Any
+    ) -> Tuple[int, str]:
+        spool = self._spool(stdin)
+        try:
+            return self._race(
+                lambda: self.client.bool_prompt(
+                    prompt=prompt, stdin=spool.replay, **kwargs
+                )
+            )
+        finally:
+            spool.close()
+
+    def structured(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], schema: str
+    ) -> str:
+        if not hasattr(self.client, "structured"):
+            raise NotImplementedError(
+                "Structured prompt is not supported by this backend."
+            )
+        spool = self._spool(stdin)
+        try:
+            return self._race(
+                lambda: self.client.structured(
+                    prompt=prompt, stdin=spool.replay, schema=schema
+                )
+            )
+        finally:
+            spool.close()
+
+    def structured_stream(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], schema: str
+    ) -> Iterator[str]:
+        if not hasattr(self.client, "structured_stream"):
+            raise NotImplementedError(
+                "Structured prompt is not supported by this backend."
+            )
+        spool = self._spool(stdin)
+
+        # Race for the first element.
+        def start() -> Tuple[List[str], Iterator[str]]:
+            stream = self.client.structured_stream(
+                prompt=prompt, stdin=spool.replay, schema=schema
+            )
+            first = next(stream, None)
+            return [] if first is None else [first], stream
+
+        try:
+            first, stream = self._race(start, discard=lambda value: value[1].close())
+        except BaseException:
+            spool.close()
+            raise
+
+        def elements() -> Iterator[str]:
+            try:
+                yield from first
+                yield from stream
+            finally:
+                spool.close()
+
+        return elements()
@@ -0,0 +1,173 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  jsonstream.py
+#
+
+import json
+from typing import Any, Iterable, Iterator, List, Tuple
+
+WHITESPACE = " \t\r\n"
+
+
+class ArrayStream:
+    """
+    Incremental parser yielding the elements of an array of a JSON document as
+    soon as each element is complete.
+
+    Only the element being parsed is buffered, the rest of the document is
+    scanned and discarded.
+
+    Args:
+        path (tuple): The object keys leading to the array, empty for a
+            top-level array.
+    """
+
+    def __init__(self, path: Tuple[str, ...] = ()) -> None:
+        self.path = path
+        # The open containers as [bracket, current key, expecting a key].
+        self.stack: List[list] = []
+        self.in_string = False
+        self.escape = False
+        # The characters of the object key being read.
+        self.key: List[str] | None = None
+        # The characters of the element being read, its depth and whether it
+        # is a number or literal terminated by the next delimiter.
+        self.element: List[str] | None = None
+        self.element_depth = 0
+        self.scalar = False
+        self.found = False
+        self.started = False
+
+    def _in_array(self) -> bool:
+        if len(self.stack) != len(self.path) + 1 or self.stack[-1][0] != "[":
+            return False
+
+        return all(
+            bracket == "{" and key == name
+            for (bracket, key, _), name in zip(self.stack, self.path)
+        )
+
+    def _start_value(self, char: str) -> None:
+        self.started = True
+        if self.element is None and self._in_array():
+            self.element = [char]
+            self.element_depth = len(self.stack)
+            self.scalar = char not in '"{['
+
+    def _emit(self) -> Any:
+        text = "".join(self.element)
+        self.element = None
+        self.scalar = False
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as err:
+            raise Exception(f"The structured response is not valid JSON: {err}")
+
+    def feed(self, text: str) -> Iterator[Any]:
+        """
+        Parse the next part of the document.
+
+        Args:
+            text (str): The next part of the document.
+
+        Yields:
+            The elements of the array completed by this part.
+
+        Raises:
+            Exception: If an element is not valid JSON.
+        """
+        for char in text:
+            if self.in_string:
+                if self.element is not None:
+                    self.element.append(char)
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.key is not None:
+                        self.stack[-1][1] = json.loads(f'"{"".join(self.key)}"')
+                        self.key = None
+                        continue
+                    if self.element is not None and len(self.stack) == (
+                        self.element_depth
+                    ):
+                        yield self._emit()
+                if self.key is not None:
+                    self.key.append(char)
+                continue
+
+            if self.scalar and char in ",]}" + WHITESPACE:
+                yield self._emit()
+            elif self.element is not None:
+                self.element.append(char)
+
+            match char:
+                case '"':
+                    self.in_string = True
+                    if self.stack and self.stack[-1][0] == "{" and self.stack[-1][2]:
+                        self.key = []
+                    else:
+                        self._start_value(char)
+                case "{" | "[":
+                    self._start_value(char)
+                    self.stack.append([char, None, char == "{"])
+                    self.found = self.found or self._in_array()
+                case "}" | "]":
+                    if not self.stack:
+                        raise Exception("The structured response is not valid JSON.")
+                    self.stack.pop()
+                    if self.element is not None and len(self.stack) == (
+                        self.element_depth
+                    ):
+                        yield self._emit()
+                case ":":
+                    if self.stack:
+                        self.stack[-1][2] = False
+                case ",":
+                    if self.stack and self.stack[-1][0] == "{":
+                        self.stack[-1][2] = True
+                case _ if char in WHITESPACE:
+                    pass
+                case _:
+                    if not self.scalar:
+                        self._start_value(char)
+
+    def close(self) -> None:
+        """
+        Finish parsing the document.
+
+        Raises:
+            Exception: If the document or the array is incomplete.
+        """
+        if not self.started or self.stack or self.in_string:
+            raise Exception("The structured response ended before it was complete.")
+        if not self.found:
+            raise Exception("The structured response does not contain the array.")
+
+
+def iter_elements(chunks: Iterable[str], path: Tuple[str, ...] = ()) -> Iterator[Any]:
+    """
+    Yield the elements of an array of a JSON document received in parts.
+
+    Args:
+        chunks (iterable): The parts of the JSON document.
+        path (tuple): The object keys leading to the array, empty for a
+            top-level array.
+
+    Yields:
+        The elements of the array, as soon as each is complete.
+
+    Raises:
+        Exception: If the document is not valid or incomplete.
+    """
+    parser = ArrayStream(path)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    parser.close()
@@ -0,0 +1,482 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  ledger.py
+#
+
+import contextvars
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_PATH = "~/.cache/clai/ledger.sqlite"
+DEFAULT_RETENTION = 30 * 86400
+DEFAULT_MAX_ROWS = 1000000
+# The number of calls recorded by a process between two rotations.
+ROTATE_EVERY = 1000
+PERCENTILES = (50, 95, 99)
+TOKENS = ("input_tokens", "output_tokens", "cached_tokens")
+
+_END = object()
+
+
+class Call:
+    """
+    The token usage, retries, cache outcome and serving model of a command
+    call, collected while the call is executed.
+    """
+
+    def __init__(self) -> None:
+        self.usage: Dict[str, int] = {}
+        self.retries = 0
+        self.cache_hit = False
+        self.model: str | None = None
+        self.lock = threading.Lock()
+
+    def add_usage(self, usage: Dict[str, int]) -> None:
+        with self.lock:
+            for name, value in usage.items():
+                self.usage[name] = self.usage.get(name, 0) + value
+
+    def add_retry(self) -> None:
+        with self.lock:
+            self.retries += 1
+
+
+# The call being recorded in the current context.
+_call: contextvars.ContextVar[Call | None] = contextvars.ContextVar(
+    "clai_ledger_call", default=None
+)
+
+
+def active() -> bool:
+    """
+    Return True when a call is being recorded in the current context.
+    """
+    return _call.get() is not None
+
+
+def add_usage(usage: Dict[str, int]) -> None:
+    """
+    Add the token usage reported by the provider to the call being recorded.
+
+    Args:
+        usage (dict): The number of tokens by kind.
+    """
+    call = _call.get()
+    if call is not None:
+        call.add_usage(usage)
+
+
+def add_retry() -> None:
+    """
+    Count a retry of the call being recorded.
+    """
+    call = _call.get()
+    if call is not None:
+        call.add_retry()
+
+
+def set_model(model: str | None) -> None:
+    """
+    Record the model of the backend instance sending the request of the call
+    being recorded, which for a pool is the instance serving the call.
+
+    Args:
+        model (str | None): The model.
+    """
+    call = _call.get()
+    if call is not None:
+        call.model = model
+
+
+def mark_cache_hit() -> None:
+    """
+    Record that the call being recorded was answered from the response cache.
+    """
+    call = _call.get()
+    if call is not None:
+        call.cache_hit = True
+
+
+def percentile(values: List[float], rank: float) -> float | None:
+    """
+    Return the nearest-rank percentile of sorted values.
+
+    Args:
+        values (list): The sorted values.
+        rank (float): The percentile between 0 and 100.
+
+    Returns:
+        float | None: The percentile or None without values.
+    """
+    if not values:
+        return None
+
+    return values[max(0, math.ceil(rank / 100 * len(values)) - 1)]
+
+
+class Ledger:
+    """
+    Append-only usage ledger of command calls stored in SQLite.
+
+    The ledger is rotated by removing the calls older than `retention` seconds
+    and the oldest calls beyond `max_rows`, when opened and every
+    `ROTATE_EVERY` recorded calls. Concurrent processes, such as the daemon and
+    regular commands, can share a ledger.
+
+    Args:
+        path (str): Path of the SQLite database (tilde-expansion supported).
+        retention (int): Number of seconds calls are kept.
+        max_rows (int): Maximum number of calls kept.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        retention: int = DEFAULT_RETENTION,
+        max_rows: int = DEFAULT_MAX_ROWS,
+    ) -> None:
+        import sqlite3
+
+        if retention <= 0 or max_rows <= 0:
+            raise ValueError("The ledger retention and maximum rows must be positive.")
+        self.path = os.path.expanduser(path)
+        self.retention = retention
+        self.max_rows = max_rows
+        self.recorded = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(
+            self.path, timeout=10, check_same_thread=False, isolation_level=None
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS calls "
+            "(id INTEGER PRIMARY KEY, time REAL, backend TEXT, instance TEXT, "
+            "model TEXT, command TEXT, input_tokens INTEGER, output_tokens INTEGER, "
+            "cached_tokens INTEGER, latency REAL, retries INTEGER, cache_hit INTEGER, "
+            "error TEXT)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS calls_time ON calls (time)")
+        self.rotate()
+
+    def rotate(self) -> None:
+        """
+        Remove the calls beyond the retention period and the maximum number of rows.
+        """
+        with self.lock:
+            self.db.execute(
+                "DELETE FROM calls WHERE time < ?", (time.time() - self.retention,)
+            )
+            self.db.execute(
+                "DELETE FROM calls WHERE id <= (SELECT MAX(id) FROM calls) - ?",
+                (self.max_rows,),
+            )
+
+    def record(
+        self,
+        backend: str,
+        instance: str,
+        model: str | None,
+        command: str,
+        call: Call,
+        latency: float,
+        error: str | None = None,
+    ) -> None:
+        """
+        Append a call to the ledger.
+
+        Args:
+            backend (str): The backend.
+            instance (str): The backend instance.
+            model (str | None): The model of the instance.
+            command (str): One of `prompt`, `bool` or `structured`.
+            call (Call): The usage, retries and cache outcome of the call.
+            latency (float): The number of seconds the call took.
+            error (str | None): The error of a failed call.
+        """
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO calls (time, backend, instance, model, command, "
+                "input_tokens, output_tokens, cached_tokens, latency, retries, "
+                "cache_hit, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(),
+                    backend,
+                    instance,
+                    model,
+                    command,
+                    *(call.usage.get(kind, 0) for kind in TOKENS),
+                    latency,
+                    call.retries,
+                    int(call.cache_hit),
+                    error,
+                ),
+            )
+            self.recorded += 1
+            rotate = self.recorded % ROTATE_EVERY == 0
+
+        if rotate:
+            self.rotate()
+
+    def stats(
+        self,
+        window: float,
+        backend: str | None = None,
+        instance: str | None = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Report the latency, throughput and error rate per backend instance and
+        model.
+
+        Calls answered from the response cache are counted, but excluded from
+        the latency percentiles and the throughput.
+
+        Args:
+            window (float): The number of seconds before now to report on.
+            backend (str | None): Only report on this backend.
+            instance (str | None): Only report on this backend instance.
+
+        Returns:
+            list[dict]: The report of every backend instance and model with
+                calls in the window. Latencies are in seconds.
+        """
+        query = (
+            "SELECT backend, instance, model, latency, input_tokens, output_tokens, "
+            "cached_tokens, cache_hit, error FROM calls WHERE time >= ?"
+        )
+        parameters: List[Any] = [time.time() - window]
+        for name, value in (("backend", backend), ("instance", instance)):
+            if value is not None:
+                query += f" AND {name} = ?"
+                parameters.append(value)
+        query += " ORDER BY backend, instance, model, latency"
+
+        with self.lock:
+            rows = self.db.execute(query, parameters).fetchall()
+
+        reports: Dict[tuple, Dict[str, Any]] = {}
+        latencies: Dict[tuple, List[float]] = {}
+        for name, member, model, latency, *tokens, hit, error in rows:
+            key = (name, member, model)
+            report = reports.setdefault(
+                key,
+                {"backend": name, "instance": member, "model": model}
+                | dict.fromkeys(("calls", "errors", "cache_hits") + TOKENS, 0),
+            )
+            report["calls"] += 1
+            report["errors"] += error is not None
+            report["cache_hits"] += hit
+            for kind, count in zip(TOKENS, tokens):
+                report[kind] += count
+            if not hit:
+                latencies.setdefault(key, []).append(latency)
+
+        results = []
+        for key, report in reports.items():
+            values = latencies.get(key, [])
+            for rank in PERCENTILES:
+                report[f"p{rank}"] = percentile(values, rank)
+            duration = sum(values)
+            report["tokens_per_second"] = (
+                report["output_tokens"] / duration if duration > 0 else None
+            )
+            report["error_rate"] = report["errors"] / report["calls"]
+            results.append(report)
+
+        return results
+
+
+def get_ledger(config: Dict[str, Any]) -> Ledger | None:
+    """
+    Create the usage ledger from the optional `ledger` section of the config.
+
+    Args:
+        config (dict): Full configuration dictionary.
+
+    Returns:
+        Ledger | None: The ledger or None when it is not configured.
+    """
+    if not config.get("ledger"):
+        return None
+
+    return Ledger(**config["ledger"])
+
+
+def parse_window(window: str) -> float:
+    """
+    Parse a time window such as `90s`, `15m`, `24h` or `7d`.
+
+    Args:
+        window (str): The window, a number of seconds without unit.
+
+    Returns:
+        float: The number of seconds.
+
+    Raises:
+        ValueError: If the window is not valid.
+    """
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    unit = units.get(window[-1:], None)
+    try:
+        seconds = float(window[:-1] if unit else window) * (unit or 1)
+    except ValueError:
+        seconds = 0
+    if seconds <= 0:
+        raise ValueError(
+            f"Invalid window `{window}`, use a number followed by s, m, h or d."
+        )
+
+    return seconds
+
+
+class LedgerClient:
+    """
+    Backend client proxy recording every command call in the usage ledger.
+
+    The token usage, retries, cache outcome and the model of the backend
+    instance serving the call are collected from the wrapped clients while the
+    call is executed.
+
+    Args:
+        client (Client): The backend client.
+        ledger (Ledger): The usage ledger.
+        backend (str): The backend name.
+        instance (str): The backend instance name.
+        model (str | None): The model recorded for calls which are not served
+            by a backend instance, such as cache hits. Defaults to the instance
+            name, which for a pool is the pool name.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        ledger: Ledger,
+        backend: str,
+        instance: str,
+        model: str | None = None,
+    ) -> None:
+        self.client = client
+        self.ledger = ledger
+        self.backend = backend
+        self.instance = instance
+        self.model = model
+
+    def __getattr__(self, name: str) -> Any:
+        # Attributes such as `max_tokens` or `chunk` come from the backend client.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _context(self) -> tuple:
+        call = Call()
+        context = contextvars.copy_context()
+        context.run(_call.set, call)
+
+        return call, context
+
+    def _write(
+        self, command: str, call: Call, start: float, error: BaseException | None
+    ) -> None:
+        if isinstance(error, SystemExit):
+            message = f"Exited with code {error.code}."
+        else:
+            message = None if error is None else str(error) or type(error).__name__
+        self.ledger.record(
+            self.backend,
+            self.instance,
+            call.model or self.model or self.instance,
+            command,
+            call,
+            time.perf_counter() - start,
+            message,
+        )
+
+    def _record(self, command: str, send: Callable[[], T]) -> T:
+        call, context = self._context()
+        start = time.perf_counter()
+        error = None
+        try:
+            return context.run(send)
+        except (Exception, SystemExit) as err:
+            error = err
+            raise
+        finally:
+            self._write(command, call, start, error)
+
+    def _record_stream(
+        self, command: str, send: Callable[[], Iterator[str]]
+    ) -> Iterator[str]:
+        call, context = self._context()
+        start = time.perf_counter()
+        try:
+            stream = context.run(send)
+        except (Exception, SystemExit) as err:
+            self._write(command, call, start, err)
+            raise
+
+        def chunks() -> Iterator[str]:
+            error = None
+            try:
+                while True:
+                    chunk = context.run(next, stream, _END)
+                    if chunk is _END:
+                        return
+                    yield chunk
+            except (Exception, SystemExit) as err:
+                error = err
+                raise
+            finally:
+                self._write(command, call, start, error)
+
+        return chunks()
+
+    def prompt(self, prompt: str, stdin: Callable[[], Any]) -> str:
+        return self._record(
+            "prompt", lambda: self.client.prompt(prompt=prompt, stdin=stdin)
+        )
+
+    def prompt_stream(self, prompt: str, stdin: Callable[[], Any]) -> Iterator[str]:
+        return self._record_stream(
+            "prompt", lambda: self.client.prompt_stream(prompt=prompt, stdin=stdin)
+        )
+
+    def bool_prompt(self, prompt: str, stdin: Callable[[], Any], **kwargs: Any) -> Any:
+        return self._record(
+            "bool",
+            lambda: self.client.bool_prompt(prompt=prompt, stdin=stdin, **kwargs),
+        )
+
+    def structured(self, prompt: str, stdin: Callable[[], Any], schema: str) -> str:
+        def send() -> str:
+            if not hasattr(self.client, "structured"):
+                raise NotImplementedError(
+                    "Structured prompt is not supported by this backend."
+                )
+            return self.client.structured(prompt=prompt, stdin=stdin, schema=schema)
+
+        return self._record("structured", send)
+
+    def structured_stream(
+        self, prompt: str, stdin: Callable[[], Any], schema: str
+    ) -> Iterator[str]:
+        def send() -> Iterator[str]:
+            if not hasattr(self.client, "structured_stream"):
+                raise NotImplementedError(
+                    "Structured prompt is not supported by this backend."
+                )
+            return self.client.structured_stream(
+                prompt=prompt, stdin=stdin, schema=schema
+            )
+
+        return self._record_stream("structured", send)
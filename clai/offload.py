@@ -0,0 +1,316 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  offload.py
+#
+
+import json
+import sys
+import time
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+from clai.commands import NO_PROMPT, prepare_prompt_and_stdin
+
+# The maximum number of requests per batch of the OpenAI Batch API.
+BATCH_SIZE = 50_000
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+NOT_SUPPORTED = "Batch offload is not supported by this backend."
+
+
+class BatchJob(NamedTuple):
+    """
+    The status of a batch submitted to the Batch API of a provider.
+
+    Attributes:
+        id (str): The id of the batch.
+        status (str): The status of the batch, such as `in_progress` or `completed`.
+        total (int): The number of requests of the batch.
+        completed (int): The number of completed requests.
+        failed (int): The number of failed requests.
+        output_file_id (str | None): The id of the file holding the responses.
+        error_file_id (str | None): The id of the file holding the failed requests.
+    """
+
+    id: str
+    status: str
+    total: int
+    completed: int
+    failed: int
+    output_file_id: str | None
+    error_file_id: str | None
+
+
+class Pending(NamedTuple):
+    index: int
+    command: str
+    schema: str | None
+    bool_mode: str
+
+
+class Submission:
+    """
+    A batch being written, submitted and polled.
+
+    Args:
+        client (Client): The backend client of the batch requests.
+    """
+
+    def __init__(self, client: Any) -> None:
+        import tempfile
+
+        self.client = client
+        self.input_fh: IO[bytes] = tempfile.TemporaryFile()
+        self.requests: Dict[str, Pending] = {}
+        self.job: BatchJob | None = None
+
+    def add(self, pending: Pending, body: Dict[str, Any]) -> None:
+        custom_id = str(pending.index)
+        line = {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": self.client.batch_endpoint,
+            "body": body,
+        }
+        self.input_fh.write(json.dumps(line).encode() + b"\n")
+        self.requests[custom_id] = pending
+
+    def submit(self) -> None:
+        with self.input_fh:
+            self.job = self.client.get_batch(self.client.submit_batch(self.input_fh))
+
+    @property
+    def done(self) -> bool:
+        return self.job.status in TERMINAL_STATUSES
+
+
+def get_error_message(line: Dict[str, Any]) -> str:
+    """
+    Return the error message of a failed Batch API request.
+
+    Args:
+        line (dict): The line of the output or error file.
+
+    Returns:
+        str: The error message.
+    """
+    error = line.get("error") or {}
+    if error.get("message"):
+        return error["message"]
+
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    message = (body.get("error") or {}).get("message")
+
+    return f"{response.get('status_code')}: {message or 'Request failed.'}"
+
+
+def poll(
+    submissions: List[Submission], poll_interval: float, max_poll_interval: float
+) -> Iterator[Submission]:
+    """
+    Poll the batches until all of them reached a terminal status.
+
+    The interval between polls doubles up to `max_poll_interval`. Status
+    changes are reported on stderr.
+
+    Args:
+        submissions (list[Submission]): The submitted batches.
+        poll_interval (float): The number of seconds before the first poll.
+        max_poll_interval (float): The maximum number of seconds between polls.
+
+    Yields:
+        Submission: Every batch as soon as it reached a terminal status.
+    """
+
+    def report(job: BatchJob) -> None:
+        print(f"Batch: {json.dumps(job._asdict())}", file=sys.stderr, flush=True)
+
+    waiting = []
+    for submission in submissions:
+        report(submission.job)
+        if submission.done:
+            yield submission
+        else:
+            waiting.append(submission)
+
+    interval = poll_interval
+    while waiting:
+        time.sleep(interval)
+        interval = min(interval * 2, max_poll_interval)
+        running = []
+        for submission in waiting:
+            job = submission.client.get_batch(submission.job.id)
+            if job != submission.job:
+                report(job)
+            submission.job = job
+            if submission.done:
+                yield submission
+            else:
+                running.append(submission)
+        waiting = running
+
+
+def collect(submission: Submission) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Convert the responses of a finished batch into result records.
+
+    Args:
+        submission (Submission): The finished batch.
+
+    Yields:
+        tuple[int, dict]: The index and result record of every request.
+    """
+    client, job = submission.client, submission.job
+    remaining = dict(submission.requests)
+    for file_id in (job.output_file_id, job.error_file_id):
+        if file_id is None:
+            continue
+        for line in client.read_batch_file(file_id):
+            pending = remaining.pop(line["custom_id"], None)
+            if pending is None:
+                continue
+            result = {"exit_code": 0, "output": None, "error": None}
+            response = line.get("response") or {}
+            if line.get("error") or response.get("status_code") != 200:
+                result["exit_code"] = 1
+                result["error"] = (
+                    f"Failed to execute command. Reason: {get_error_message(line)}"
+                )
+                yield pending.index, result
+                continue
+            try:
+                result["exit_code"], result["output"] = client.batch_result(
+                    pending.command,
+                    response["body"],
+                    pending.schema,
+                    pending.bool_mode,
+                )
+            except SystemExit as err:
+                result["exit_code"] = err.code
+                result["error"] = "Command aborted."
+            except Exception as err:
+                result["exit_code"] = 1
+                result["error"] = f"Failed to execute command. Reason: {err}"
+            yield pending.index, result
+
+    for pending in remaining.values():
+        yield pending.index, {
+            "exit_code": 1,
+            "output": None,
+            "error": f"Failed to execute command. Reason: Batch `{job.id}` {job.status} without a response.",
+        }
+
+
+def run_offloaded(
+    requests: Iterable[Dict[str, Any]],
+    clients: Any,
+    backend: str,
+    instance: str,
+    batch_size: int = BATCH_SIZE,
+    poll_interval: float = 5.0,
+    max_poll_interval: float = 60.0,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Execute request specs through the Batch API of the provider and yield their
+    result records in input order.
+
+    The request bodies are the same as those sent by the backend clients. They
+    are written to a batch input file per backend instance and per
+    `batch_size` requests, which are submitted and polled until finished. A
+    result is yielded as soon as it and the results of all earlier requests are
+    available, only the results completed ahead of those are held.
+
+    Args:
+        requests (iterable): The request specs.
+        clients (ClientRegistry): The client registry.
+        backend (str): The default backend.
+        instance (str): The default backend instance.
+        batch_size (int): The maximum number of requests per batch.
+        poll_interval (float): The number of seconds before the first poll.
+        max_poll_interval (float): The maximum number of seconds between polls.
+
+    Yields:
+        dict: The result record including the `index` of the request.
+    """
+    # The results completed ahead of the result of an earlier request.
+    results: Dict[int, Dict[str, Any]] = {}
+    ids: Dict[int, Any] = {}
+    open_submissions: Dict[Tuple[str, str], Submission] = {}
+    submissions: List[Submission] = []
+    position = 0
+
+    def drain() -> Iterator[Dict[str, Any]]:
+        nonlocal position
+        while position in results:
+            result = results.pop(position)
+            if position in ids:
+                result["id"] = ids.pop(position)
+            yield {"index": position} | result
+            position += 1
+
+    for index, spec in enumerate(requests):
+        if "id" in spec:
+            ids[index] = spec["id"]
+        stdin = spec.get("input") or []
+        if isinstance(stdin, str):
+            stdin = stdin.splitlines()
+        prompt, stdin_lines = prepare_prompt_and_stdin(
+            spec.get("prompt", ""), [line.strip() for line in stdin]
+        )
+        if not prompt:
+            results[index] = {"exit_code": 1, "output": NO_PROMPT, "error": None}
+            yield from drain()
+            continue
+
+        key = (spec.get("backend", backend), spec.get("instance", instance))
+        command = spec.get("command", "prompt")
+        bool_mode = spec.get("bool_mode", "reason") if command == "bool" else "reason"
+        try:
+            client = clients.get(*key)
+            if not hasattr(client, "batch_request"):
+                raise Exception(NOT_SUPPORTED)
+            body = client.batch_request(
+                command,
+                prompt,
+                lambda: iter(stdin_lines),
+                spec.get("schema"),
+                bool_mode,
+            )
+        except SystemExit as err:
+            results[index] = {
+                "exit_code": err.code,
+                "output": None,
+                "error": "Command aborted.",
+            }
+            yield from drain()
+            continue
+        except Exception as err:
+            results[index] = {
+                "exit_code": 1,
+                "output": None,
+                "error": f"Failed to execute command. Reason: {err}",
+            }
+            yield from drain()
+            continue
+
+        submission = open_submissions.get(key)
+        if submission is None:
+            submission = open_submissions[key] = Submission(client)
+        submission.add(Pending(index, command, spec.get("schema"), bool_mode), body)
+        if len(submission.requests) >= batch_size:
+            submission.submit()
+            submissions.append(open_submissions.pop(key))
+
+    for submission in open_submissions.values():
+        submission.submit()
+        submissions.append(submission)
+
+    for submission in poll(submissions, poll_interval, max_poll_interval):
+        for index, result in collect(submission):
+            results[index] = result
+            yield from drain()
@@ -0,0 +1,295 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  pool.py
+#
+
+import itertools
+import threading
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Tuple,
+)
+
+from clai.cache import SpooledLines
+
+POOL_PREFIX = "pool:"
+STRATEGIES = ("round_robin", "least_outstanding")
+
+
+class Member(NamedTuple):
+    name: str
+    client: Any
+    weight: int
+
+
+def should_failover(client: Any, err: Exception) -> bool:
+    """
+    Determine whether a request failing on one instance may succeed on another.
+
+    Errors returned by the API (such as authentication errors or a missing
+    deployment) and transient errors are specific to the instance. Local errors,
+    such as input exceeding `max_tokens`, would fail on every instance.
+
+    Args:
+        client (Client): The backend client of the instance.
+        err (Exception): The error raised by the client.
+
+    Returns:
+        bool: True when the request should be sent to the next instance.
+    """
+    if isinstance(err, NotImplementedError):
+        return False
+
+    return getattr(err, "status_code", None) is not None or client.retryable(err)
+
+
+class InstancePool:
+    """
+    Backend client spreading requests over multiple instances of a backend.
+
+    The `round_robin` strategy distributes requests proportionally to the weights
+    of the instances using smooth weighted round-robin. The `least_outstanding`
+    strategy sends requests to the instance with the fewest requests in flight
+    relative to its weight. When a request fails on an instance, it fails over to
+    the next instance in order of preference. Stdin is spooled while the first
+    instance reads it and replayed to the next ones.
+
+    Args:
+        name (str): The name of the pool.
+        members (list[Member]): The instances of the pool.
+        strategy (str): One of `round_robin` or `least_outstanding`.
+        debug (bool): Print the instance serving every request and failovers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        members: List[Member],
+        strategy: str = "round_robin",
+        debug: bool = False,
+    ) -> None:
+        if not members:
+            raise ValueError(f"Pool `{name}` has no instances.")
+        if strategy not in STRATEGIES:
+            supported_strategies = ", ".join(STRATEGIES)
+            raise ValueError(f"Pool strategy must be one of: {supported_strategies}")
+        self.name = name
+        self.members = members
+        self.strategy = strategy
+        self.debug = debug
+        self.current = [0] * len(members)
+        self.outstanding = [0] * len(members)
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        # Attributes such as `max_tokens` or `chunk` come from the first instance.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.members[0].client, name)
+
+    def _order(self) -> List[int]:
+        """
+        Return the member indexes in order of preference for the next request.
+        """
+        with self.lock:
+            if self.strategy == "least_outstanding":
+                return sorted(
+                    range(len(self.members)),
+                    key=lambda i: self.outstanding[i] / self.members[i].weight,
+                )
+
+            total = 0
+            for i, member in enumerate(self.members):
+                self.current[i] += member.weight
+                total += member.weight
+            selected = max(range(len(self.members)), key=lambda i: self.current[i])
+            self.current[selected] -= total
+
+            return [selected] + [i for i in range(len(self.members)) if i != selected]
+
+    def _execute(
+        self,
+        stdin: Callable[[], Iterable[str]],
+        call: Callable[[Any, Callable[[], Iterator[str]]], Any],
+    ) -> Any:
+        """
+        Call the instances in order of preference until one succeeds.
+
+        `call` receives the client of the instance and the stdin function to
+        pass on. The spooled stdin is released once `call` returns, which for
+        streams is when their first delta arrived and the input was sent.
+        """
+        spool = SpooledLines()
+        stdin_lines = spool.replayable(stdin())
+        order = self._order()
+        try:
+            for position, i in enumerate(order):
+                member = self.members[i]
+                with self.lock:
+                    self.outstanding[i] += 1
+                try:
+                    if self.debug:
+                        print(f"Pool `{self.name}`: {member.name}")
+                    return call(member.client, stdin_lines)
+                except Exception as err:
+                    if position == len(order) - 1 or not should_failover(
+                        member.client, err
+                    ):
+                        raise
+                    if self.debug:
+                        print(f"Pool `{self.name}`: {member.name} failed: {err}")
+                finally:
+                    with self.lock:
+                        self.outstanding[i] -= 1
+        finally:
+            spool.close()
+
+    def prompt(self, prompt: str, stdin: Callable[[], Iterable[str]]) -> str:
+        return self._execute(
+            stdin, lambda client, stdin: client.prompt(prompt=prompt, stdin=stdin)
+        )
+
+    def prompt_stream(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> Iterator[str]:
+        # Fail over until the first text delta arrives.
+        def start(
+            client: Any, stdin: Callable[[], Iterator[str]]
+        ) -> Tuple[List[str], Iterator[str]]:
+            stream = client.prompt_stream(prompt=prompt, stdin=stdin)
+            first = next(stream, None)
+            return [] if first is None else [first], stream
+
+        first, stream = self._execute(stdin, start)
+        yield from first
+        yield from stream
+
+    def bool_prompt(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], **kwargs: Any
+    ) -> Tuple[int, str]:
+        return self._execute(
+            stdin,
+            lambda client, stdin: client.bool_prompt(
+                prompt=prompt, stdin=stdin, **kwargs
+            ),
+        )
+
+    def structured(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], schema: str
+    ) -> str:
+        def call(client: Any, stdin: Callable[[], Iterator[str]]) -> str:
+            if not hasattr(client, "structured"):
+                raise NotImplementedError(
+                    "Structured prompt is not supported by this backend."
+                )
+            return client.structured(prompt=prompt, stdin=stdin, schema=schema)
+
+        return self._execute(stdin, call)
+
+    def structured_stream(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], schema: str
+    ) -> Iterator[str]:
+        # Fail over until the first element arrives.
+        def start(
+            client: Any, stdin: Callable[[], Iterator[str]]
+        ) -> Tuple[List[str], Iterator[str]]:
+            if not hasattr(client, "structured_stream"):
+                raise NotImplementedError(
+                    "Structured prompt is not supported by this backend."
+                )
+            stream = client.structured_stream(prompt=prompt, stdin=stdin, schema=schema)
+            first = next(stream, None)
+            return [] if first is None else [first], stream
+
+        first, stream = self._execute(stdin, start)
+        return itertools.chain(first, stream)
+
+    async def _execute_async(
+        self,
+        stdin: Callable[[], Iterable[str]],
+        call: Callable[[Any, Callable[[], Iterator[str]]], Awaitable[Any]],
+    ) -> Any:
+        spool = SpooledLines()
+        stdin_lines = spool.replayable(stdin())
+        order = self._order()
+        try:
+            for position, i in enumerate(order):
+                member = self.members[i]
+                with self.lock:
+                    self.outstanding[i] += 1
+                try:
+                    if self.debug:
+                        print(f"Pool `{self.name}`: {member.name}")
+                    return await call(member.client, stdin_lines)
+                except Exception as err:
+                    if position == len(order) - 1 or not should_failover(
+                        member.client, err
+                    ):
+                        raise
+                    if self.debug:
+                        print(f"Pool `{self.name}`: {member.name} failed: {err}")
+                finally:
+                    with self.lock:
+                        self.outstanding[i] -= 1
+        finally:
+            spool.close()
+
+    async def prompt_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> str:
+        return await self._execute_async(
+            stdin, lambda client, stdin: client.prompt_async(prompt=prompt, stdin=stdin)
+        )
+
+    async def prompt_stream_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]]
+    ) -> AsyncIterator[str]:
+        # Fail over until the first text delta arrives.
+        async def start(
+            client: Any, stdin: Callable[[], Iterator[str]]
+        ) -> Tuple[List[str], AsyncIterator[str]]:
+            stream = client.prompt_stream_async(prompt=prompt, stdin=stdin)
+            first = await anext(stream, None)
+            return [] if first is None else [first], stream
+
+        first, stream = await self._execute_async(stdin, start)
+        for delta in first:
+            yield delta
+        async for delta in stream:
+            yield delta
+
+    async def bool_prompt_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], **kwargs: Any
+    ) -> Tuple[int, str]:
+        return await self._execute_async(
+            stdin,
+            lambda client, stdin: client.bool_prompt_async(
+                prompt=prompt, stdin=stdin, **kwargs
+            ),
+        )
+
+    async def structured_async(
+        self, prompt: str, stdin: Callable[[], Iterable[str]], schema: str
+    ) -> str:
+        async def call(client: Any, stdin: Callable[[], Iterator[str]]) -> str:
+            if not hasattr(client, "structured_async"):
+                raise NotImplementedError(
+                    "Structured prompt is not supported by this backend."
+                )
+            return await client.structured_async(
+                prompt=prompt, stdin=stdin, schema=schema
+            )
+
+        return await self._execute_async(stdin, call)
@@ -11,3 +11,24 @@ BOOL_PROMPT = """
     1. answer (type bool)  – A definitive 'True' or 'False' based on the given information.
     2. reason (type string)– A short and concise explanation justifying both the answer and whether the context was sufficient or not."
 """
+
+BOOL_ANSWER_PROMPT = """
+    Analyze the following statement or question without inferring missing
+    information and respond with a JSON object containing only the element
+    answer (type bool) – A definitive 'True' or 'False' based on the given information.
+"""
+
+REDUCE_PROMPT = """
+    The input was too large to process at once, so it was split into parts
+    which were each answered separately. Combine the partial answers below
+    into a single, coherent answer to the original request without mentioning
+    the parts. The original request was:
+"""
+
+STRUCTURED_REDUCE_PROMPT = """
+    The input was too large to process at once, so it was split into parts
+    which were each answered separately with a JSON document. Merge the
+    partial JSON documents below into a single JSON document conforming to the
+    schema, combining lists and deduplicating entries where appropriate. The
+    original request was:
+"""
@@ -0,0 +1,295 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  schema.py
+#
+
+import json
+import os
+import threading
+from functools import cache
+from typing import Any, Dict, NamedTuple, Tuple
+
+SCHEMA_CACHE_DIR = "~/.cache/clai/schemas"
+# The number of compiled validators kept by a process, such as the daemon.
+MAX_VALIDATORS = 64
+# The number of schemas whose meta-schema check is remembered across runs.
+MAX_CHECKED = 1024
+
+BOOL_SCHEMA = {
+    "$schema": "https://json-schema.org/draft/2020-12/schema",
+    "type": "object",
+    "properties": {
+        "reason": {"type": "string"},
+        "answer": {"type": "boolean"},
+    },
+    "required": ["reason", "answer"],
+    "additionalProperties": False,
+}
+
+BOOL_ANSWER_SCHEMA = {
+    "$schema": "https://json-schema.org/draft/2020-12/schema",
+    "type": "object",
+    "properties": {
+        "answer": {"type": "boolean"},
+    },
+    "required": ["answer"],
+    "additionalProperties": False,
+}
+
+
+class Schema(NamedTuple):
+    """
+    A JSON schema read from a file.
+
+    Attributes:
+        path (str): The absolute path of the schema file.
+        content (bytes): The content of the schema file.
+        digest (str): The SHA-256 digest of the content.
+        schema (dict): The parsed schema.
+    """
+
+    path: str
+    content: bytes
+    digest: str
+    schema: Dict[str, Any]
+
+
+# Schemas of this process by path with the modification time and size of the
+# file they were read from, and the least recently used validators last by
+# content digest.
+_schemas: Dict[str, Tuple[Tuple[int, int], Schema]] = {}
+_validators: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def load_schema(path: str) -> Schema:
+    """
+    Read a JSON schema file, which is only read again after it changed, replacing
+    the schema read before.
+
+    Args:
+        path (str): The path of the schema file.
+
+    Returns:
+        Schema: The schema.
+
+    Raises:
+        Exception: If the file is not valid JSON.
+    """
+    import hashlib
+
+    path = os.path.abspath(os.path.expanduser(path))
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _schemas.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with open(path, "rb") as schema_fh:
+        content = schema_fh.read()
+    try:
+        parsed = json.loads(content)
+    except json.JSONDecodeError as err:
+        raise Exception(f"The schema `{path}` is not valid JSON: {err}")
+    schema = Schema(path, content, hashlib.sha256(content).hexdigest(), parsed)
+    with _lock:
+        _schemas[path] = (version, schema)
+
+    return schema
+
+
+def get_checked_path(digest: str) -> str | None:
+    """
+    Return the path of the marker recording that a schema passed the meta-schema check.
+
+    The markers are stored in `CLAI_SCHEMA_CACHE`, which defaults to
+    `~/.cache/clai/schemas`. An empty `CLAI_SCHEMA_CACHE` disables them. Only
+    the `MAX_CHECKED` most recently written markers are kept.
+
+    Args:
+        digest (str): The digest of the schema content.
+
+    Returns:
+        str | None: The path of the marker or None when disabled.
+    """
+    directory = os.environ.get("CLAI_SCHEMA_CACHE", SCHEMA_CACHE_DIR)
+    if not directory:
+        return None
+
+    return os.path.join(os.path.expanduser(directory), digest)
+
+
+def _prune_checked(directory: str) -> None:
+    """
+    Remove the oldest meta-schema check markers beyond `MAX_CHECKED`.
+
+    Args:
+        directory (str): The directory holding the markers.
+    """
+    with os.scandir(directory) as entries:
+        markers = [entry for entry in entries if entry.is_file()]
+    if len(markers) <= MAX_CHECKED:
+        return
+
+    markers.sort(key=lambda entry: entry.stat().st_mtime_ns)
+    for entry in markers[: len(markers) - MAX_CHECKED]:
+        try:
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def get_validator(schema: Schema) -> Any:
+    """
+    Return the validator of a schema, compiled once per schema content while
+    it is one of the `MAX_VALIDATORS` most recently used.
+
+    The schema is checked against its meta-schema only the first time its
+    content is seen, also across runs.
+
+    Args:
+        schema (Schema): The schema.
+
+    Returns:
+        jsonschema.protocols.Validator: The validator.
+
+    Raises:
+        jsonschema.exceptions.SchemaError: If the schema is invalid.
+    """
+    with _lock:
+        validator = _validators.pop(schema.digest, None)
+        if validator is not None:
+            _validators[schema.digest] = validator
+            return validator
+
+    from jsonschema.validators import validator_for
+
+    cls = validator_for(schema.schema)
+    checked_path = get_checked_path(schema.digest)
+    if checked_path is None or not os.path.exists(checked_path):
+        cls.check_schema(schema.schema)
+        if checked_path is not None:
+            try:
+                os.makedirs(os.path.dirname(checked_path), mode=0o700, exist_ok=True)
+                open(checked_path, "w").close()
+                _prune_checked(os.path.dirname(checked_path))
+            except OSError:
+                pass
+
+    validator = cls(schema.schema)
+    with _lock:
+        _validators[schema.digest] = validator
+        while len(_validators) > MAX_VALIDATORS:
+            del _validators[next(iter(_validators))]
+
+    return validator
+
+
+def validate_structured_response(response: str, schema: Schema) -> None:
+    """
+    Validate a structured response against the schema it was requested with.
+
+    Args:
+        response (str): The raw JSON response.
+        schema (Schema): The schema.
+
+    Raises:
+        Exception: If the response is not valid JSON or doesn't conform to the schema.
+    """
+    from jsonschema.exceptions import best_match
+
+    try:
+        instance = json.loads(response)
+    except json.JSONDecodeError as err:
+        raise Exception(f"The structured response is not valid JSON: {err}")
+
+    error = best_match(get_validator(schema).iter_errors(instance))
+    if error is not None:
+        raise Exception(
+            f"The structured response does not conform to the schema: {error.message}"
+        )
+
+
+def _resolve(root: Dict[str, Any], node: Any) -> Dict[str, Any]:
+    # Follow local references such as `#/$defs/records`.
+    while isinstance(node, dict) and str(node.get("$ref", "")).startswith("#/"):
+        target = root
+        for part in node["$ref"][2:].split("/"):
+            target = target.get(part.replace("~1", "/").replace("~0", "~"), {})
+        node = target
+
+    return node if isinstance(node, dict) else {}
+
+
+def get_stream_items(schema: Schema) -> Tuple[Tuple[str, ...], Dict[str, Any]]:
+    """
+    Return the array of a schema whose elements are streamed and their schema.
+
+    The array is either the top level of the schema or the single property of
+    a top-level object, as providers require structured output to be an object.
+
+    Args:
+        schema (Schema): The schema.
+
+    Returns:
+        tuple[tuple, dict]: The object keys leading to the array and the
+            schema of its elements.
+
+    Raises:
+        Exception: If the schema has no such array.
+    """
+    root = schema.schema
+    node = _resolve(root, root)
+    if node.get("type") == "array":
+        return (), node.get("items", {})
+
+    properties = node.get("properties", {})
+    if len(properties) == 1:
+        ((name, value),) = properties.items()
+        value = _resolve(root, value)
+        if value.get("type") == "array":
+            return (name,), value.get("items", {})
+
+    raise Exception(
+        "Streaming structured output requires a schema whose top level is an array or an object with a single array property."
+    )
+
+
+def validate_structured_element(
+    element: Any, schema: Schema, items: Dict[str, Any], index: int
+) -> None:
+    """
+    Validate an element of a streamed structured response against the schema
+    of the array elements.
+
+    Args:
+        element (Any): The element.
+        schema (Schema): The schema of the response.
+        items (dict): The schema of the array elements.
+        index (int): The position of the element in the array.
+
+    Raises:
+        Exception: If the element doesn't conform to the schema.
+    """
+    from jsonschema.exceptions import best_match
+
+    error = best_match(get_validator(schema).descend(element, items))
+    if error is not None:
+        raise Exception(
+            f"Element {index} of the structured response does not conform to the schema: {error.message}"
+        )
+
+
+@cache
+def get_bool_validator(reason: bool = True) -> Any:
+    """
+    Return the validator of boolean responses, with or without a reason.
+    """
+    from jsonschema import Draft202012Validator
+
+    return Draft202012Validator(BOOL_SCHEMA if reason else BOOL_ANSWER_SCHEMA)
@@ -0,0 +1,429 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  server.py
+#
+
+import json
+import os
+import re
+import sys
+import threading
+from typing import Any, Dict, Iterable, Iterator, Mapping, NamedTuple, TextIO, Tuple
+
+from clai.batch import ClientRegistry
+from clai.cache import CachedClient, ResponseCache, get_response_cache
+from clai.chunked import run_chunked
+from clai.commands import run_command
+from clai.ledger import Ledger, LedgerClient, get_ledger
+from clai.tools import (
+    get_cache_namespace,
+    get_client,
+    get_config_variables,
+    read_config,
+)
+
+DEFAULT_SOCKET = "~/.cache/clai/daemon.sock"
+
+# The commands which can be forwarded to the daemon.
+COMMANDS = ("prompt", "bool", "structured")
+# The environment variables resolved by the daemon besides those referenced by
+# the config.
+FORWARDED_VARIABLES = ("CLAI_CONFIG_CACHE",)
+# The environment variable references of a config, matched on its raw content
+# so the client doesn't need to parse it.
+VARIABLE_REFERENCE = re.compile(r"\$\{\{(.*?)\}\}")
+
+
+class ConfigState(NamedTuple):
+    mtime: int
+    config: Dict[str, Any]
+    clients: ClientRegistry
+    cache: ResponseCache | None
+    ledger: Ledger | None = None
+    # The environment variables referenced by the backend instances.
+    variables: Tuple[str, ...] = ()
+
+
+class Daemon:
+    """
+    Executes forwarded commands using warm backend clients.
+
+    Configs are loaded once per path and reloaded, together with their clients,
+    when the file is modified. Forwarded commands carry the environment of the
+    client, against which the config cache and the environment variables
+    referenced by the config are resolved. Clients are shared by the commands
+    resolving the same values.
+    """
+
+    def __init__(self) -> None:
+        self.states: Dict[str, ConfigState] = {}
+        # The clients of environments resolving other values than the daemon's.
+        self.registries: Dict[Tuple[str, int, Tuple], ClientRegistry] = {}
+        self.lock = threading.Lock()
+
+    def state(self, path: str, environ: Mapping[str, str] | None = None) -> ConfigState:
+        mtime = os.stat(path).st_mtime_ns
+        with self.lock:
+            state = self.states.get(path)
+            if state is None or state.mtime != mtime:
+                config = read_config(path, environ)
+                self.registries = {
+                    key: clients
+                    for key, clients in self.registries.items()
+                    if key[0] != path
+                }
+                state = ConfigState(
+                    mtime=mtime,
+                    config=config,
+                    clients=ClientRegistry(
+                        lambda backend, instance: get_client(
+                            config=config,
+                            backend=backend,
+                            instance=instance,
+                            debug=False,
+                        )
+                    ),
+                    cache=get_response_cache(config),
+                    ledger=get_ledger(config),
+                    variables=get_config_variables(config),
+                )
+                self.states[path] = state
+            return state
+
+    def clients(
+        self, path: str, state: ConfigState, environ: Mapping[str, str]
+    ) -> ClientRegistry:
+        identity = tuple(environ.get(name) for name in state.variables)
+        if identity == tuple(os.environ.get(name) for name in state.variables):
+            return state.clients
+
+        key = (path, state.mtime, identity)
+        with self.lock:
+            if key not in self.registries:
+                self.registries[key] = ClientRegistry(
+                    lambda backend, instance: get_client(
+                        config=state.config,
+                        backend=backend,
+                        instance=instance,
+                        debug=False,
+                        environ=environ,
+                    )
+                )
+            return self.registries[key]
+
+    def client(self, request: Dict[str, Any]) -> Any:
+        # Requests of older clients don't carry their environment.
+        environ = request.get("environ", os.environ)
+        state = self.state(request["config"], environ)
+        backend, instance = request["backend"], request["instance"]
+        clients = self.clients(request["config"], state, environ)
+        client = backend_client = clients.get(backend, instance)
+        if state.cache is not None and not request.get("no_cache"):
+            client = CachedClient(
+                factory=lambda: backend_client,
+                cache=state.cache,
+                namespace=get_cache_namespace(state.config, backend, instance, environ),
+                refresh=request.get("refresh", False),
+            )
+        if state.ledger is None:
+            return client
+
+        return LedgerClient(
+            client,
+            ledger=state.ledger,
+            backend=backend,
+            instance=instance,
+            model=get_cache_namespace(state.config, backend, instance, environ).get(
+                "model"
+            ),
+        )
+
+    def execute(
+        self, request: Dict[str, Any], stdin_lines: Iterable[str]
+    ) -> Tuple[int, Any]:
+        client = self.client(request)
+        if request.get("chunked"):
+            return run_chunked(
+                client=client,
+                command=request["command"],
+                prompt=request["prompt"],
+                stdin_lines=stdin_lines,
+                schema=request.get("schema"),
+                overlap=request["overlap"],
+                concurrency=request["concurrency"],
+            )
+
+        return run_command(
+            client=client,
+            command=request["command"],
+            prompt=request["prompt"],
+            stdin_lines=stdin_lines,
+            schema=request.get("schema"),
+            stream=request.get("stream", False),
+            bool_mode=request.get("bool_mode", "reason"),
+        )
+
+    def handle(self, fh: TextIO) -> None:
+        """
+        Execute a single forwarded command read from and answered on `fh`.
+
+        The request consists of a JSON header line followed by the stdin lines,
+        each JSON encoded on a line of its own and terminated by `null`. The
+        response consists of zero or more `{"chunk": ...}` lines when streaming
+        followed by a final line containing the `exit_code` and either the
+        `output` or an `error`.
+
+        Args:
+            fh (TextIO): The connection.
+        """
+
+        def write(record: Dict[str, Any]) -> None:
+            fh.write(json.dumps(record) + "\n")
+            fh.flush()
+
+        request = json.loads(fh.readline())
+        stdin_lines = read_lines(fh)
+        try:
+            exit_code, output = self.execute(request, stdin_lines)
+            if isinstance(output, Iterator):
+                for chunk in output:
+                    write({"chunk": chunk})
+                output = None
+            result = {"exit_code": exit_code, "output": output}
+        except SystemExit as err:
+            result = {"exit_code": err.code, "output": None}
+        except Exception as err:
+            result = {"exit_code": 1, "error": str(err)}
+
+        # Drain the remaining input so the client never blocks on writing stdin.
+        for _ in stdin_lines:
+            pass
+        write(result)
+
+
+def read_lines(fh: TextIO) -> Iterator[str]:
+    for line in fh:
+        value = json.loads(line)
+        if value is None:
+            return
+        yield value
+
+
+def get_socket_path(path: str | None) -> str:
+    return os.path.expanduser(path or DEFAULT_SOCKET)
+
+
+def serve(
+    socket_path: str,
+    config_path: str | None = None,
+    backend: str | None = None,
+    instance: str | None = None,
+) -> None:
+    """
+    Serve forwarded commands on a Unix socket until interrupted.
+
+    Args:
+        socket_path (str): Path of the Unix socket.
+        config_path (str | None): Config to load up front.
+        backend (str | None): Backend of the client to create up front.
+        instance (str | None): Backend instance of the client to create up front.
+
+    Raises:
+        Exception: If a daemon is already serving on `socket_path`.
+    """
+    import signal
+
+    daemon = Daemon()
+    if config_path is not None:
+        config_path = os.path.abspath(os.path.expanduser(config_path))
+        state = daemon.state(config_path)
+        if backend is not None and instance is not None:
+            state.clients.get(backend, instance)
+
+    if connect(socket_path) is not None:
+        raise Exception(f"A daemon is already serving on `{socket_path}`.")
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    server = create_server(daemon, socket_path)
+
+    print(f"Serving on {socket_path}", file=sys.stderr, flush=True)
+    try:
+        with server:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.unlink(socket_path)
+
+
+def create_server(daemon: Daemon, socket_path: str) -> Any:
+    """
+    Create the server accepting connections for `daemon` on a Unix socket.
+
+    Args:
+        daemon (Daemon): The daemon executing the commands.
+        socket_path (str): Path of the Unix socket.
+
+    Returns:
+        socketserver.ThreadingUnixStreamServer: The server.
+    """
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            with self.connection.makefile("rw", encoding="utf-8") as fh:
+                daemon.handle(fh)
+
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+    # Only the current user may use the configured tokens.
+    umask = os.umask(0o177)
+    try:
+        return Server(socket_path, Handler)
+    finally:
+        os.umask(umask)
+
+
+def get_forwarded_environ(
+    config_path: str, environ: Mapping[str, str] | None = None
+) -> Dict[str, str]:
+    """
+    Return the part of the environment a forwarded command is resolved in by
+    the daemon: the variables referenced by the config and `FORWARDED_VARIABLES`.
+
+    Args:
+        config_path (str): Path of the config file.
+        environ (Mapping | None): The environment, defaults to `os.environ`.
+
+    Returns:
+        dict: The variables sent to the daemon.
+    """
+    environ = os.environ if environ is None else environ
+    names = set(FORWARDED_VARIABLES)
+    try:
+        with open(config_path, encoding="utf-8") as config_fh:
+            names.update(VARIABLE_REFERENCE.findall(config_fh.read()))
+    except OSError:
+        pass
+
+    return {name: environ[name] for name in sorted(names) if name in environ}
+
+
+class ForwardedStream:
+    """
+    Iterates over the text deltas of a command streamed by the daemon.
+
+    The exit code of the command is sent after the last delta, so it is only
+    available in `exit_code` once the stream is drained.
+
+    Args:
+        record (dict): The first record received.
+        records (iterator): The remaining records.
+    """
+
+    def __init__(self, record: Dict[str, Any], records: Iterator[Dict[str, Any]]):
+        self.record = record
+        self.records = records
+        self.exit_code: int | None = None
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        if self.record is None:
+            raise StopIteration
+        record, self.record = self.record, None
+        if "chunk" not in record:
+            if "error" in record:
+                raise Exception(record["error"])
+            self.exit_code = record["exit_code"]
+            raise StopIteration
+
+        self.record = next(self.records)
+        return record["chunk"]
+
+
+def connect(socket_path: str) -> Any:
+    """
+    Connect to the daemon.
+
+    Forwarded commands carry tokens, so sockets owned by other users are
+    ignored.
+
+    Args:
+        socket_path (str): Path of the Unix socket.
+
+    Returns:
+        socket.socket | None: The connection or None when no daemon of the
+            current user is serving.
+    """
+    try:
+        if os.stat(socket_path).st_uid != os.getuid():
+            return None
+    except OSError:
+        return None
+
+    import socket
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except OSError:
+        connection.close()
+        return None
+
+    return connection
+
+
+def forward(
+    socket_path: str, request: Dict[str, Any], stdin_lines: Iterable[str]
+) -> Tuple[int | None, Any] | None:
+    """
+    Execute a command on the daemon.
+
+    Args:
+        socket_path (str): Path of the Unix socket.
+        request (dict): The command, its arguments and the selected config,
+            backend and instance.
+        stdin_lines (iterable): The lines read from stdin.
+
+    Returns:
+        tuple[int | None, Any] | None: The exit code and the output to print.
+            When streaming, the output is a `ForwardedStream` holding the exit
+            code once drained, and the exit code is None. None when no daemon
+            is serving.
+    """
+    connection = connect(socket_path)
+    if connection is None:
+        return None
+
+    fh = connection.makefile("rw", encoding="utf-8")
+    fh.write(json.dumps(request) + "\n")
+    for line in stdin_lines:
+        fh.write(json.dumps(line) + "\n")
+    fh.write("null\n")
+    fh.flush()
+
+    def results() -> Iterator[Dict[str, Any]]:
+        with connection, fh:
+            for line in fh:
+                yield json.loads(line)
+        raise Exception("The daemon closed the connection.")
+
+    records = results()
+    record = next(records)
+    if "chunk" in record:
+        return None, ForwardedStream(record, records)
+
+    if "error" in record:
+        raise Exception(record["error"])
+    return record["exit_code"], record["output"]
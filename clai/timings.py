@@ -0,0 +1,204 @@
+# MIT License
+#
+# Copyright (c) 2025 Jelle Smet
+#
+# This software is released under the MIT License.
+# See the LICENSE file in the project root for more information.
+#
+#  timings.py
+#
+
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, NamedTuple
+
+# The phases in the order in which they are reported.
+PHASES = ("config", "imports", "tokenization", "network", "streaming", "parsing")
+
+
+class Span(NamedTuple):
+    name: str
+    start: float
+    end: float
+    thread: int
+
+
+class Timings:
+    """
+    Records the phases of an invocation, the time to first token and the token
+    usage reported by the provider.
+
+    Phases may be recorded concurrently from multiple threads, for instance by
+    `batch`, in which case the durations of a phase add up.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.first_token: float | None = None
+        self.usage: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            span = Span(name, start, time.perf_counter(), threading.get_ident())
+            with self.lock:
+                self.spans.append(span)
+
+    def mark_first_token(self) -> None:
+        with self.lock:
+            if self.first_token is None:
+                self.first_token = time.perf_counter()
+
+    def add_usage(self, usage: Dict[str, int]) -> None:
+        with self.lock:
+            for key, value in usage.items():
+                self.usage[key] = self.usage.get(key, 0) + value
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Return the duration of every phase in milliseconds.
+
+        The time to first token is measured from the start of the first request
+        and is only reported for streamed responses.
+
+        Returns:
+            dict: The total duration, the duration and count of every phase, the
+                time to first token and the provider reported token usage.
+        """
+        with self.lock:
+            phases: Dict[str, Dict[str, Any]] = {}
+            for span in sorted(self.spans, key=lambda span: PHASES.index(span.name)):
+                phase = phases.setdefault(span.name, {"ms": 0.0, "count": 0})
+                phase["ms"] += (span.end - span.start) * 1000
+                phase["count"] += 1
+
+            ttft = None
+            requests = [span.start for span in self.spans if span.name == "network"]
+            if self.first_token is not None and requests:
+                ttft = round((self.first_token - min(requests)) * 1000, 3)
+
+            return {
+                "total_ms": round((time.perf_counter() - self.start) * 1000, 3),
+                "phases": {
+                    name: {"ms": round(phase["ms"], 3), "count": phase["count"]}
+                    for name, phase in phases.items()
+                },
+                "ttft_ms": ttft,
+                "usage": dict(self.usage),
+            }
+
+    def trace(self) -> Dict[str, Any]:
+        """
+        Return the phases as a Chrome trace, viewable in `chrome://tracing` or Perfetto.
+
+        Returns:
+            dict: The trace in the Trace Event Format.
+        """
+        pid = os.getpid()
+        with self.lock:
+            events = [
+                {
+                    "name": span.name,
+                    "cat": "clai",
+                    "ph": "X",
+                    "ts": round((span.start - self.start) * 1_000_000, 1),
+                    "dur": round((span.end - span.start) * 1_000_000, 1),
+                    "pid": pid,
+                    "tid": span.thread,
+                }
+                for span in self.spans
+            ]
+            if self.first_token is not None:
+                events.append(
+                    {
+                        "name": "first token",
+                        "cat": "clai",
+                        "ph": "i",
+                        "s": "p",
+                        "ts": round((self.first_token - self.start) * 1_000_000, 1),
+                        "pid": pid,
+                        "tid": threading.get_ident(),
+                    }
+                )
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+# The timings of the current process, None unless enabled with `--timings`.
+TIMINGS: Timings | None = None
+
+
+def enable() -> Timings:
+    """
+    Start recording the timings of the current process.
+
+    Returns:
+        Timings: The timings of the process.
+    """
+    global TIMINGS
+    if TIMINGS is None:
+        TIMINGS = Timings()
+
+    return TIMINGS
+
+
+def enabled() -> bool:
+    """
+    Return True when the timings of the current process are recorded.
+    """
+    return TIMINGS is not None
+
+
+def phase(name: str) -> contextlib.AbstractContextManager:
+    """
+    Return a context manager recording the duration of a phase when enabled.
+
+    Args:
+        name (str): The name of the phase.
+
+    Returns:
+        The context manager.
+    """
+    if TIMINGS is None:
+        return contextlib.nullcontext()
+
+    return TIMINGS.phase(name)
+
+
+def mark_first_token() -> None:
+    """
+    Record the arrival of the first text delta of a streamed response.
+    """
+    if TIMINGS is not None:
+        TIMINGS.mark_first_token()
+
+
+def add_usage(usage: Dict[str, int]) -> None:
+    """
+    Add the token usage reported by the provider for a response.
+
+    Args:
+        usage (dict): The number of tokens by kind.
+    """
+    if TIMINGS is not None:
+        TIMINGS.add_usage(usage)
+
+
+def write_trace(path: str) -> None:
+    """
+    Write the Chrome trace of the recorded timings.
+
+    Args:
+        path (str): The path of the trace file.
+    """
+    if TIMINGS is not None:
+        with open(os.path.expanduser(path), "w") as trace_fh:
+            json.dump(TIMINGS.trace(), trace_fh)
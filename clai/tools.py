@@ -9,17 +9,46 @@
 #
 
 import argparse
+import importlib
 import json
+import marshal
 import os
 import sys
 import re
-from collections import namedtuple
+from collections import deque, namedtuple
+from functools import cache
 from textwrap import dedent
-from typing import Any, Dict, Iterator
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Tuple, TypeVar
 
-import yaml
+from clai import timings
 from clai.backend import SUPPORTED_BACKENDS
-from jsonschema import validate
+from clai.offload import BATCH_SIZE
+from clai.pool import POOL_PREFIX, InstancePool, Member
+from clai.schema import get_bool_validator
+
+# Backend instance parameters which don't affect the responses.
+NON_RESPONSE_PARAMETERS = (
+    "token",
+    "transport",
+    "rpm",
+    "tpm",
+    "retry",
+    "prompt_cache_key",
+)
+
+# The modes of the `bool` command: answer with a reason, answer only, or
+# answer only with a confidence derived from the token logprobs.
+BOOL_MODES = ("reason", "answer", "confidence")
+# Output token cap of answer only responses, the minimum OpenAI accepts.
+BOOL_MAX_OUTPUT_TOKENS = 16
+# The number of alternatives returned per token in the `confidence` mode.
+BOOL_TOP_LOGPROBS = 5
+
+CONFIG_CACHE_DIR = "~/.cache/clai/config"
+ENV_VAR_PATTERN = re.compile(r"^\$\{\{(.*)?\}\}$")
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 def cleanup(text: str) -> str:
@@ -35,54 +64,46 @@ def cleanup(text: str) -> str:
     return dedent(text).replace("\n", " ")
 
 
-def validate_bool_response(response: str) -> Dict[str, Any]:
+def validate_bool_response(response: str, reason: bool = True) -> Dict[str, Any]:
     """
     Parse and validate a JSON-formatted boolean response against the expected schema.
 
     Args:
         response (str): The raw JSON string returned by the model.
+        reason (bool): Whether the response contains a reason.
 
     Returns:
-        dict: The parsed JSON object containing 'reason' and 'answer'.
+        dict: The parsed JSON object containing 'answer' and, when requested, 'reason'.
 
     Exits:
         Exits the process with code 3 if validation fails.
     """
     try:
         json_response = json.loads(response)
-        validate(
-            json_response,
-            {
-                "$schema": "https://json-schema.org/draft/2020-12/schema",
-                "type": "object",
-                "properties": {
-                    "reason": {"type": "string"},
-                    "answer": {"type": "boolean"},
-                },
-                "required": ["reason", "answer"],
-                "additionalProperties": False,
-            },
-        )
+        get_bool_validator(reason).validate(json_response)
     except Exception as _:
         print(
-            "Invalid response format received. Does the model support structured output?"
+            "Invalid response format received. Does the model support structured output?",
+            file=sys.stderr,
         )
         sys.exit(3)
 
     return json_response
 
 
-def get_exit_code(response: str) -> int:
+def get_exit_code(response: str, reason: bool = True) -> int:
     """
     Determine the exit code based on the boolean answer field in the response.
 
     Args:
         response (str): The raw JSON string representing the structured response.
+        reason (bool): Whether the response contains a reason.
 
     Returns:
         int: Returns 0 if answer is True, 1 otherwise.
     """
-    json_response = validate_bool_response(response)
+    with timings.phase("parsing"):
+        json_response = validate_bool_response(response, reason)
 
     if json_response["answer"]:
         return 0
@@ -90,23 +111,219 @@ def get_exit_code(response: str) -> int:
         return 1
 
 
-def read_config(filename: str) -> dict[str, Any]:
+def get_confidence(logprobs: Iterable[Any], answer: bool) -> float:
+    """
+    Derive the confidence of a boolean answer from the logprobs of its token.
+
+    The first `true` or `false` token of the response carries the answer. The
+    confidence is the probability of the answer relative to the combined
+    probability of both answers among the alternatives of that token.
+
+    Args:
+        logprobs (iterable): The logprobs of the response tokens, each with a
+            `token`, `logprob` and `top_logprobs`.
+        answer (bool): The answer of the response.
+
+    Returns:
+        float: The confidence between 0 and 1.
+
+    Exits:
+        Exits the process with code 3 if the response contains no answer token.
+    """
+    import math
+
+    for logprob in logprobs or []:
+        if logprob.token.strip().lower() not in ("true", "false"):
+            continue
+
+        # The sampled token usually also is the first alternative.
+        alternatives = {logprob.token: logprob.logprob}
+        for alternative in logprob.top_logprobs or []:
+            alternatives.setdefault(alternative.token, alternative.logprob)
+
+        probabilities = {"true": 0.0, "false": 0.0}
+        for token, value in alternatives.items():
+            token = token.strip().lower()
+            if token in probabilities:
+                probabilities[token] += math.exp(value)
+
+        return round(
+            probabilities[str(answer).lower()] / sum(probabilities.values()), 4
+        )
+
+    print(
+        "The response contains no answer token to derive a confidence from.",
+        file=sys.stderr,
+    )
+    sys.exit(3)
+
+
+def get_bool_result(
+    response: str, mode: str = "reason", logprobs: Iterable[Any] | None = None
+) -> Tuple[int, str]:
+    """
+    Convert the response of a `bool` command into its exit code and output.
+
+    Args:
+        response (str): The raw JSON string returned by the model.
+        mode (str): One of `reason`, `answer` or `confidence`.
+        logprobs (iterable | None): The logprobs of the response tokens, used
+            by the `confidence` mode.
+
+    Returns:
+        tuple[int, str]: The exit code and the output. The `confidence` mode
+            outputs the answer and its confidence as JSON.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    if mode not in BOOL_MODES:
+        raise ValueError(f"Unknown bool mode `{mode}`.")
+
+    exit_code = get_exit_code(response, reason=mode == "reason")
+    if mode != "confidence":
+        return exit_code, response
+
+    with timings.phase("parsing"):
+        answer = exit_code == 0
+        output = {"answer": answer, "confidence": get_confidence(logprobs, answer)}
+
+    return exit_code, json.dumps(output)
+
+
+def get_config_cache_path(
+    path: str, environ: Mapping[str, str] | None = None
+) -> str | None:
+    """
+    Return the path of the compiled form of a config.
+
+    The compiled configs are stored in `CLAI_CONFIG_CACHE`, which defaults to
+    `~/.cache/clai/config`. An empty `CLAI_CONFIG_CACHE` disables the cache.
+
+    Args:
+        path (str): The absolute path of the config.
+        environ (Mapping | None): The environment, defaults to `os.environ`.
+
+    Returns:
+        str | None: The path of the compiled config or None when disabled.
+    """
+    import hashlib
+
+    environ = os.environ if environ is None else environ
+    directory = environ.get("CLAI_CONFIG_CACHE", CONFIG_CACHE_DIR)
+    if not directory:
+        return None
+    digest = hashlib.sha256(path.encode()).hexdigest()
+
+    return os.path.join(os.path.expanduser(directory), f"{digest}.marshal")
+
+
+def load_compiled_config(cache_path: str, key: Tuple[Any, ...]) -> Any:
+    """
+    Load a compiled config when it was compiled from the current config file.
+
+    Args:
+        cache_path (str): The path of the compiled config.
+        key (tuple): The path, modification time and size of the config file
+            and the Python version.
+
+    Returns:
+        The config or None when missing, stale or unreadable.
+    """
+    try:
+        with open(cache_path, "rb") as cache_fh:
+            cached_key, config = marshal.load(cache_fh)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    return config if cached_key == key else None
+
+
+def store_compiled_config(cache_path: str, key: Tuple[Any, ...], config: Any) -> None:
+    """
+    Atomically store the compiled form of a config, readable by the owner only.
+
+    Configs holding values which can't be marshalled, such as dates, are not
+    stored. Failing to store the compiled config is not an error.
+
+    Args:
+        cache_path (str): The path of the compiled config.
+        key (tuple): The path, modification time and size of the config file
+            and the Python version.
+        config (Any): The parsed config.
+    """
+    import tempfile
+
+    try:
+        data = marshal.dumps((key, config))
+    except ValueError:
+        return
+
+    directory = os.path.dirname(cache_path)
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory)
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as temp_fh:
+            temp_fh.write(data)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        os.unlink(temp_path)
+
+
+def read_config(
+    filename: str, environ: Mapping[str, str] | None = None
+) -> dict[str, Any]:
     """
     Load a YAML configuration file from the given path.
 
+    The parsed config is cached in a compiled form keyed on the path,
+    modification time and size of the file, so it is only parsed again after
+    it changed. YAML is parsed with the LibYAML based loader when available.
+    Environment variable references are kept as is and resolved by
+    `get_backend_instance_config` for the selected instance only.
+
     Args:
         filename (str): Path to the YAML config file (tilde-expansion supported).
+        environ (Mapping | None): The environment, defaults to `os.environ`.
 
     Returns:
         dict: Parsed configuration dictionary.
     """
+    path = os.path.abspath(os.path.expanduser(filename))
+    with open(path, "rb") as filename_fh:
+        stat = os.fstat(filename_fh.fileno())
+        key = (path, stat.st_mtime_ns, stat.st_size, sys.hexversion)
+        cache_path = get_config_cache_path(path, environ)
+        if cache_path is not None:
+            config = load_compiled_config(cache_path, key)
+            if config is not None:
+                return config
+
+        import yaml
+
+        config = yaml.load(
+            filename_fh, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        )
+
+    if cache_path is not None:
+        store_compiled_config(cache_path, key, config)
+
+    return config
 
-    with open(os.path.expanduser(filename)) as filename_fh:
-        return yaml.safe_load(filename_fh)
+
+@cache
+def get_backend_config_type(fields: Tuple[str, ...]) -> type:
+    return namedtuple("BackendConfig", fields)
 
 
 def get_backend_instance_config(
-    config: Dict[str, Any], backend: str, instance: str
+    config: Dict[str, Any],
+    backend: str,
+    instance: str,
+    environ: Mapping[str, str] | None = None,
 ) -> Any:
     """
     Extract and resolve a specific backend instance configuration.
@@ -115,6 +332,8 @@ def get_backend_instance_config(
         config (dict): Full configuration dictionary containing backend definitions.
         backend (str): Name of the backend to use.
         instance (str): Name of the backend instance to load.
+        environ (Mapping | None): The environment resolving the variable
+            references, defaults to `os.environ`.
 
     Returns:
         namedtuple: A BackendConfig namedtuple with the instance parameters.
@@ -123,11 +342,6 @@ def get_backend_instance_config(
         Exception: If the backend or instance is not defined, or referenced environment variables are missing.
     """
 
-    def backend_config_factory(data):
-        nt = namedtuple("BackendConfig", data.keys())
-
-        return nt(**data)
-
     if backend not in SUPPORTED_BACKENDS:
         supported_backends = ", ".join(SUPPORTED_BACKENDS)
         raise Exception(
@@ -142,17 +356,221 @@ def get_backend_instance_config(
             f"Backend `{backend}` has no instance configured named `{instance}.`"
         )
 
-    backend_config = config["backends"][backend][instance]
+    environ = os.environ if environ is None else environ
+    # The config is shared, so references are resolved on a copy.
+    backend_config = dict(config["backends"][backend][instance])
     for key, value in backend_config.items():
-        env_var = re.match(r"^\$\{\{(.*)?\}\}$", str(value))
+        if not isinstance(value, str):
+            continue
+        env_var = ENV_VAR_PATTERN.match(value)
         if env_var:
-            if env_var.groups()[0] in os.environ:
-                backend_config[key] = os.environ[env_var.groups()[0]]
+            if env_var.groups()[0] in environ:
+                backend_config[key] = environ[env_var.groups()[0]]
             else:
                 raise Exception(
                     f"Backend `{backend}` instance `{instance}` refers to a non-existing environment variable named `{env_var.groups()[0]}`."
                 )
-    return backend_config_factory(backend_config)
+
+    return get_backend_config_type(tuple(backend_config))(**backend_config)
+
+
+def get_config_variables(config: Dict[str, Any]) -> Tuple[str, ...]:
+    """
+    Return the names of the environment variables referenced by the backend
+    instances of a config.
+
+    Args:
+        config (dict): Full configuration dictionary containing backend definitions.
+
+    Returns:
+        tuple[str]: The sorted variable names.
+    """
+    names = set()
+    for instances in (config.get("backends") or {}).values():
+        for parameters in (instances or {}).values():
+            for value in (parameters or {}).values():
+                if isinstance(value, str) and (env_var := ENV_VAR_PATTERN.match(value)):
+                    names.add(env_var.groups()[0])
+
+    return tuple(sorted(names))
+
+
+def get_pool_config(
+    config: Dict[str, Any], backend: str, pool: str
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Extract a pool of backend instances from the `pools` section of the config.
+
+    Args:
+        config (dict): Full configuration dictionary containing pool definitions.
+        backend (str): Name of the backend to use.
+        pool (str): Name of the pool, with or without the `pool:` prefix.
+
+    Returns:
+        tuple[str, dict]: The strategy and the weight of every instance name.
+
+    Raises:
+        Exception: If the pool is not defined or refers to undefined instances.
+    """
+    pool = pool.removeprefix(POOL_PREFIX)
+    pools = (config.get("pools") or {}).get(backend) or {}
+    if pool not in pools:
+        raise Exception(f"Backend `{backend}` has no pool configured named `{pool}`.")
+
+    instances = pools[pool].get("instances") or []
+    if isinstance(instances, list):
+        instances = {instance: 1 for instance in instances}
+    for instance, weight in instances.items():
+        if instance not in config["backends"].get(backend, {}):
+            raise Exception(
+                f"Pool `{pool}` refers to a non-existing instance `{instance}` of backend `{backend}`."
+            )
+        if not isinstance(weight, int) or weight < 1:
+            raise Exception(
+                f"Pool `{pool}` instance `{instance}` must have a positive integer weight."
+            )
+
+    return pools[pool].get("strategy", "round_robin"), instances
+
+
+def get_client(
+    config: Dict[str, Any],
+    backend: str,
+    instance: str,
+    debug: bool,
+    environ: Mapping[str, str] | None = None,
+) -> Any:
+    """
+    Instantiate the backend client for the given backend instance.
+
+    Instances prefixed with `pool:` refer to a pool of instances defined in the
+    `pools` section of the config.
+
+    Args:
+        config (dict): Full configuration dictionary containing backend definitions.
+        backend (str): Name of the backend to use.
+        instance (str): Name of the backend instance or pool to load.
+        debug (bool): Enable debug output on the client.
+        environ (Mapping | None): The environment resolving the variable
+            references, defaults to `os.environ`.
+
+    Returns:
+        Client: The backend specific `Client` instance or an `InstancePool`.
+    """
+    if instance.startswith(POOL_PREFIX):
+        strategy, instances = get_pool_config(config, backend, instance)
+        return InstancePool(
+            name=instance.removeprefix(POOL_PREFIX),
+            members=[
+                Member(name, get_client(config, backend, name, debug, environ), weight)
+                for name, weight in instances.items()
+            ],
+            strategy=strategy,
+            debug=debug,
+        )
+
+    backend_config = get_backend_instance_config(
+        config=config, backend=backend, instance=instance, environ=environ
+    )
+    Client = getattr(importlib.import_module(f"clai.backend.{backend}"), "Client")
+
+    return Client(**backend_config._asdict() | {"debug": debug})
+
+
+def get_cache_namespace(
+    config: Dict[str, Any],
+    backend: str,
+    instance: str,
+    environ: Mapping[str, str] | None = None,
+) -> Dict[str, Any]:
+    """
+    Return the backend instance parameters which determine a backend response.
+
+    Args:
+        config (dict): Full configuration dictionary containing backend definitions.
+        backend (str): Name of the backend to use.
+        instance (str): Name of the backend instance to load.
+        environ (Mapping | None): The environment resolving the variable
+            references, defaults to `os.environ`.
+
+    Returns:
+        dict: The backend name and instance parameters, excluding the token,
+            transport, rate limit and retry settings. For pools, the parameters
+            of all instances of the pool.
+    """
+    if instance.startswith(POOL_PREFIX):
+        _, instances = get_pool_config(config, backend, instance)
+        return {
+            "backend": backend,
+            "pool": [
+                get_cache_namespace(config, backend, name, environ)
+                for name in sorted(instances)
+            ],
+        }
+
+    backend_config = get_backend_instance_config(
+        config=config, backend=backend, instance=instance, environ=environ
+    )
+
+    return {
+        key: value
+        for key, value in backend_config._asdict().items()
+        if key not in NON_RESPONSE_PARAMETERS
+    } | {"backend": backend}
+
+
+def bounded_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    concurrency: int,
+    ordered: bool = True,
+) -> Iterator[Tuple[int, R]]:
+    """
+    Apply `func` to every item using a thread pool with a bounded in-flight window.
+
+    Items are only pulled from `items` when there is room in the window, so
+    arbitrarily large (lazy) inputs are processed with flat memory usage.
+
+    Args:
+        func (callable): Function applied to each item.
+        items (iterable): The items to process.
+        concurrency (int): Maximum number of items processed simultaneously.
+        ordered (bool): Yield results in input order when True, otherwise in
+            completion order.
+
+    Yields:
+        tuple[int, Any]: The input index of the item and the result of `func`.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1.")
+
+    window = concurrency * 2
+    items = enumerate(items)
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+
+        def fill() -> None:
+            while len(pending) < window:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    return
+                pending.append((index, executor.submit(func, item)))
+
+        fill()
+        while pending:
+            if ordered:
+                index, future = pending.popleft()
+                yield index, future.result()
+            else:
+                wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+                for entry in [entry for entry in pending if entry[1].done()]:
+                    pending.remove(entry)
+                    yield entry[0], entry[1].result()
+            fill()
 
 
 def read_stdin() -> Iterator[str]:
@@ -160,10 +578,37 @@ def read_stdin() -> Iterator[str]:
     Yield stripped lines from standard input if available.
     """
     if not sys.stdin.isatty():
-        for item in sys.stdin.readlines():
+        for item in sys.stdin:
             yield item.lstrip().rstrip()
 
 
+def read_records(lines: Iterable[str], size: int) -> Iterator[list[str]]:
+    """
+    Lazily group non-empty lines into records of `size` lines.
+
+    Args:
+        lines (iterable): The lines to group.
+        size (int): The number of lines per record.
+
+    Yields:
+        list[str]: The lines of a record. The last record may be shorter.
+    """
+    if size < 1:
+        raise ValueError("Record size must be at least 1.")
+
+    record = []
+    for line in lines:
+        if not line:
+            continue
+        record.append(line)
+        if len(record) == size:
+            yield record
+            record = []
+
+    if record:
+        yield record
+
+
 def parse_arguments() -> argparse.Namespace:
     """
     Parse command-line arguments and return the populated namespace.
@@ -209,7 +654,7 @@ def parse_arguments() -> argparse.Namespace:
     main.add_argument(
         "--backend",
         type=str,
-        required=True,
+        required=False,
         action=EnvDefault,
         envvar="CLAI_BACKEND",
         help="The llm backend to select from `config`.",
@@ -217,7 +662,7 @@ def parse_arguments() -> argparse.Namespace:
     main.add_argument(
         "--instance",
         type=str,
-        required=True,
+        required=False,
         action=EnvDefault,
         envvar="CLAI_INSTANCE",
         help="The backend instance to select from `config`.",
@@ -228,6 +673,51 @@ def parse_arguments() -> argparse.Namespace:
         help="Prints the payload submitted to the backend API.",
     )
 
+    main.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the response cache configured in `config`.",
+    )
+    main.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached responses but store the fresh responses in the cache.",
+    )
+    main.add_argument(
+        "--hedge-after",
+        type=int,
+        metavar="MS",
+        help="Send a duplicate request when a request hasn't completed within MS milliseconds and use whichever completes first.",
+    )
+    main.add_argument(
+        "--socket",
+        type=str,
+        required=False,
+        action=EnvDefault,
+        envvar="CLAI_SOCKET",
+        help="The path of the `serve` daemon socket (default: ~/.cache/clai/daemon.sock).",
+    )
+    main.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Execute the command in-process even when the `serve` daemon is running.",
+    )
+    main.add_argument(
+        "--timings",
+        action="store_true",
+        default=os.environ.get("CLAI_TIMINGS", "") not in ("", "0"),
+        help="Write the duration of every phase, the time to first token and the token usage as JSON to stderr.",
+    )
+    main.add_argument(
+        "--timings-trace",
+        type=str,
+        required=False,
+        action=EnvDefault,
+        envvar="CLAI_TIMINGS_TRACE",
+        metavar="FILE",
+        help="Write the timings as a Chrome trace to FILE. Implies `--timings`.",
+    )
+
     subparsers = main.add_subparsers(dest="command", required=True)
 
     # vanilla prompt
@@ -242,6 +732,11 @@ def parse_arguments() -> argparse.Namespace:
         default="",
         help="The LLM prompt to execute.",
     )
+    parser_prompt.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write the response to stdout while it is being generated.",
+    )
 
     # bool prompt
     bool_prompt = subparsers.add_parser(
@@ -274,5 +769,165 @@ def parse_arguments() -> argparse.Namespace:
         required=True,
         help="Path to the JSON schema file to use for the structured response.",
     )
+    structured_prompt.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write every element of the array of the response as an NDJSON line as soon as it is complete.",
+    )
+
+    for parser in (parser_prompt, structured_prompt):
+        parser.add_argument(
+            "--chunked",
+            action="store_true",
+            help="Split stdin exceeding `max_tokens` into chunks, process them concurrently and combine the answers.",
+        )
+        parser.add_argument(
+            "--overlap",
+            type=int,
+            default=200,
+            help="The number of tokens shared by consecutive chunks when `--chunked` is used.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="The maximum number of chunks in flight when `--chunked` is used.",
+        )
+
+    # map prompt over stdin records
+    map_prompt = subparsers.add_parser(
+        "map",
+        help="Execute the same prompt once per stdin line (or record of lines) concurrently and return NDJSON results.",
+    )
+    map_prompt.add_argument(
+        "prompt",
+        type=str,
+        help="The LLM prompt to execute for every record.",
+    )
+    map_prompt.add_argument(
+        "--command",
+        dest="map_command",
+        type=str,
+        choices=("prompt", "bool", "structured"),
+        default="prompt",
+        help="The command to execute for every record.",
+    )
+    map_prompt.add_argument(
+        "--schema",
+        type=str,
+        help="Path to the JSON schema file when `--command structured` is used.",
+    )
+    map_prompt.add_argument(
+        "--lines",
+        type=int,
+        default=1,
+        help="The number of stdin lines per record.",
+    )
+    map_prompt.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="The maximum number of records in flight.",
+    )
+
+    # batch of prompts
+    batch_prompt = subparsers.add_parser(
+        "batch",
+        help="Execute a JSONL file of prompt, bool and structured requests concurrently and return NDJSON results.",
+    )
+    batch_prompt.add_argument(
+        "requests",
+        type=str,
+        nargs="?",
+        default="-",
+        help="Path to the JSONL file containing the requests. Reads stdin when omitted or `-`.",
+    )
+    batch_prompt.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="The maximum number of requests in flight.",
+    )
+    batch_prompt.add_argument(
+        "--unordered",
+        action="store_true",
+        help="Write results in completion order instead of input order.",
+    )
+
+    for parser in (bool_prompt, map_prompt):
+        bool_mode = parser.add_mutually_exclusive_group()
+        bool_mode.add_argument(
+            "--no-reason",
+            dest="bool_mode",
+            action="store_const",
+            const="answer",
+            default="reason",
+            help="Only ask for the answer of `bool`, with a tight output token cap, when only the exit code matters.",
+        )
+        bool_mode.add_argument(
+            "--confidence",
+            dest="bool_mode",
+            action="store_const",
+            const="confidence",
+            help="Only ask for the answer of `bool` and output it with a confidence derived from the token logprobs.",
+        )
+
+    for parser in (map_prompt, batch_prompt):
+        parser.add_argument(
+            "--dedup",
+            action="store_true",
+            help="Send identical requests only once and share their result, reporting the dedup ratio on stderr.",
+        )
+        parser.add_argument(
+            "--offload",
+            action="store_true",
+            help="Submit the requests to the asynchronous Batch API of the provider instead of sending them one by one.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help=f"The maximum number of requests per submitted batch when `--offload` is used (default: {BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="The number of seconds before polling a submitted batch, doubling after every poll.",
+        )
+        parser.add_argument(
+            "--max-poll-interval",
+            type=float,
+            default=60.0,
+            help="The maximum number of seconds between polls of a submitted batch.",
+        )
+
+    # serve daemon
+    subparsers.add_parser(
+        "serve",
+        help="Run a daemon keeping backend clients warm for subsequent commands.",
+    )
+
+    # usage ledger report
+    stats = subparsers.add_parser(
+        "stats",
+        help="Report the latency, throughput and error rate per backend instance from the usage ledger.",
+    )
+    stats.add_argument(
+        "--window",
+        type=str,
+        default="24h",
+        help="The time window to report on, in seconds or suffixed with s, m, h or d (default: 24h).",
+    )
 
-    return main.parse_args()
+    args = main.parse_args()
+    if args.command not in ("serve", "stats"):
+        missing = [
+            f"--{name}"
+            for name in ("backend", "instance")
+            if getattr(args, name) is None
+        ]
+        if missing:
+            main.error(f"the following arguments are required: {', '.join(missing)}")
+
+    return args
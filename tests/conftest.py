@@ -1,8 +1,16 @@
 import sys
 from pathlib import Path
 
+import pytest
 
 ROOT = Path(__file__).resolve().parent.parent
 
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path_factory, monkeypatch):
+    """Keep compiled configs and schema markers out of the user's cache directory."""
+    monkeypatch.setenv("CLAI_CONFIG_CACHE", str(tmp_path_factory.mktemp("config")))
+    monkeypatch.setenv("CLAI_SCHEMA_CACHE", str(tmp_path_factory.mktemp("schemas")))
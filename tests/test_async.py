@@ -0,0 +1,95 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from benchmarks.mock_server import MockAPI
+from clai.backend.mistral import Client as MistralClient
+from clai.backend.openai import Client as OpenAIClient
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"name": {"type": "string"}},
+    "required": ["name"],
+    "additionalProperties": False,
+}
+
+
+@pytest.fixture
+def api():
+    with MockAPI(latency=0.2) as api:
+        yield api
+
+
+def clients(api):
+    arguments = {
+        "token": "token",
+        "max_tokens": 10000,
+        "system": "sys",
+        "debug": False,
+        "token_counting": "approximate",
+    }
+    return (
+        OpenAIClient(model="gpt-5.4", base_url=f"{api.url}/v1", **arguments),
+        MistralClient(model="mistral-small-latest", server_url=api.url, **arguments),
+    )
+
+
+def test_concurrent_requests_share_one_event_loop(api):
+    openai, mistral = clients(api)
+    stdin = lambda: iter(["input"])
+
+    async def run():
+        return await asyncio.gather(
+            *[openai.prompt_async(prompt="p", stdin=stdin) for _ in range(25)],
+            *[mistral.prompt_async(prompt="p", stdin=stdin) for _ in range(25)],
+        )
+
+    start = time.perf_counter()
+    responses = asyncio.run(run())
+
+    assert responses == ["hello"] * 50
+    # The requests are in flight at the same time rather than one after another.
+    assert time.perf_counter() - start < 0.2 * 50 / 4
+
+
+def test_async_commands_match_sync_commands(api, tmp_path):
+    openai, mistral = clients(api)
+    schema = tmp_path / "schema.json"
+    schema.write_text(json.dumps(SCHEMA))
+    stdin = lambda: iter(["input"])
+
+    async def stream(client):
+        return "".join(
+            [delta async for delta in client.prompt_stream_async("p", stdin)]
+        )
+
+    async def run():
+        return (
+            await openai.bool_prompt_async(prompt="p", stdin=stdin),
+            await mistral.bool_prompt_async(prompt="p", stdin=stdin),
+            await openai.structured_async(prompt="p", stdin=stdin, schema=str(schema)),
+            await stream(openai),
+            await stream(mistral),
+        )
+
+    openai_bool, mistral_bool, structured, openai_text, mistral_text = asyncio.run(
+        run()
+    )
+
+    assert openai_bool == openai.bool_prompt(prompt="p", stdin=stdin)
+    assert mistral_bool == mistral.bool_prompt(prompt="p", stdin=stdin)
+    assert json.loads(structured) == {"name": "mock"}
+    assert openai_text == mistral_text == "hello"
+
+    with pytest.raises(NotImplementedError):
+        asyncio.run(mistral.structured_async(prompt="p", stdin=stdin, schema="s"))
+
+
+def test_clients_can_be_used_by_consecutive_event_loops(api):
+    stdin = lambda: iter(["input"])
+
+    for client in clients(api):
+        for _ in range(2):
+            assert asyncio.run(client.prompt_async(prompt="p", stdin=stdin)) == "hello"
@@ -0,0 +1,147 @@
+import io
+import json
+import threading
+import time
+
+import pytest
+
+from clai.batch import ClientRegistry, read_requests, run_batch, run_map
+from clai.tools import bounded_map, read_records
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    def prompt(self, prompt, stdin):
+        self.calls += 1
+        time.sleep(0.01 if prompt == "slow" else 0)
+        return f"{prompt}:{'|'.join(stdin())}"
+
+    def bool_prompt(self, prompt, stdin):
+        self.calls += 1
+        answer = prompt == "yes"
+        return (0 if answer else 1), json.dumps({"answer": answer, "reason": "x"})
+
+
+def test_bounded_map_preserves_order():
+    results = list(
+        bounded_map(lambda i: time.sleep((5 - i) / 1000) or i * 2, range(5), 3)
+    )
+
+    assert results == [(i, i * 2) for i in range(5)]
+
+
+def test_bounded_map_unordered_yields_everything():
+    results = list(bounded_map(lambda i: i, range(20), 4, ordered=False))
+
+    assert sorted(results) == [(i, i) for i in range(20)]
+
+
+def test_bounded_map_limits_in_flight_items():
+    consumed = []
+
+    def items():
+        for i in range(100):
+            consumed.append(i)
+            yield i
+
+    results = bounded_map(lambda i: i, items(), 2)
+    next(results)
+
+    assert len(consumed) <= 5
+
+
+def test_read_requests_defaults_and_validation():
+    fh = io.StringIO('{"prompt": "a"}\n\n{"command": "bool", "prompt": "b"}\n')
+
+    assert [spec["command"] for spec in read_requests(fh)] == ["prompt", "bool"]
+
+    with pytest.raises(Exception, match="unsupported command"):
+        list(read_requests(io.StringIO('{"command": "nope"}\n')))
+
+
+def test_run_batch_shares_one_client_per_instance():
+    created = []
+    lock = threading.Lock()
+
+    def factory(backend, instance):
+        with lock:
+            created.append((backend, instance))
+        return FakeClient()
+
+    requests = [
+        {"command": "prompt", "prompt": "slow", "input": "a\nb", "id": "x"},
+        {"command": "bool", "prompt": "yes"},
+        {"command": "bool", "prompt": "no"},
+        {"command": "structured", "prompt": "s"},
+        {"command": "prompt", "prompt": "", "instance": "other"},
+    ]
+    results = list(
+        run_batch(requests, ClientRegistry(factory), "openai", "default", concurrency=3)
+    )
+
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert results[0]["output"] == "slow:a|b"
+    assert results[0]["id"] == "x"
+    assert [result["exit_code"] for result in results] == [0, 0, 1, 2, 1]
+    assert sorted(created) == [("openai", "default"), ("openai", "other")]
+
+
+def test_run_batch_reports_errors_per_item():
+    class Broken(FakeClient):
+        def prompt(self, prompt, stdin):
+            raise Exception("boom")
+
+    results = list(
+        run_batch(
+            [{"prompt": "a"}],
+            ClientRegistry(lambda backend, instance: Broken()),
+            "openai",
+            "default",
+            concurrency=1,
+        )
+    )
+
+    assert results[0]["exit_code"] == 1
+    assert results[0]["error"] == "Failed to execute command. Reason: boom"
+
+
+def test_read_records_groups_non_empty_lines():
+    records = list(read_records(iter(["a", "", "b", "c", "d", "e"]), 2))
+
+    assert records == [["a", "b"], ["c", "d"], ["e"]]
+
+
+def test_run_map_applies_prompt_to_every_record_lazily():
+    consumed = []
+
+    def lines():
+        for i in range(1000):
+            consumed.append(i)
+            yield f"line {i}"
+
+    results = run_map(
+        records=read_records(lines(), 1),
+        clients=ClientRegistry(lambda backend, instance: FakeClient()),
+        command="prompt",
+        prompt="p",
+        schema=None,
+        backend="openai",
+        instance="default",
+        concurrency=2,
+    )
+
+    assert next(results) == {
+        "index": 0,
+        "exit_code": 0,
+        "output": "p:line 0",
+        "error": None,
+    }
+    assert len(consumed) <= 6
+    assert [result["output"] for result in results][-1] == "p:line 999"
+
+
+def test_run_map_structured_requires_schema():
+    with pytest.raises(Exception, match="requires `--schema`"):
+        run_map([], None, "structured", "p", None, "openai", "default", 1)
@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from benchmarks.mock_server import MockAPI, sample
+from benchmarks.run import Suite, compare
+from clai.backend.mistral import Client as MistralClient
+from clai.backend.openai import Client as OpenAIClient
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "count": {"type": "integer", "minimum": 1},
+        "tags": {"type": "array", "items": {"enum": ["a", "b"]}, "minItems": 2},
+    },
+    "required": ["name", "count", "tags"],
+    "additionalProperties": False,
+}
+BOOL_RESPONSE = json.dumps({"answer": True, "reason": "mock"})
+
+
+@pytest.fixture
+def api():
+    with MockAPI(text="hello world", chunks=3) as api:
+        yield api
+
+
+def test_sample_conforms_to_schema():
+    assert sample(SCHEMA) == {"name": "mock", "count": 1, "tags": ["a", "a"]}
+
+
+def test_openai_client_against_mock_api(api, tmp_path):
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text(json.dumps(SCHEMA))
+    client = OpenAIClient(
+        token="token",
+        model="gpt-5.4",
+        max_tokens=10000,
+        system="sys",
+        debug=False,
+        token_counting="approximate",
+        base_url=f"{api.url}/v1",
+    )
+    stdin = lambda: iter(["input"])
+
+    assert client.prompt(prompt="p", stdin=stdin) == "hello world"
+    assert "".join(client.prompt_stream(prompt="p", stdin=stdin)) == "hello world"
+    assert client.bool_prompt(prompt="p", stdin=stdin) == (0, BOOL_RESPONSE)
+    assert json.loads(
+        client.structured(prompt="p", stdin=stdin, schema=str(schema_path))
+    ) == sample(SCHEMA)
+
+    structured_request = api.requests[-1]
+    assert structured_request["path"] == "/v1/responses"
+    assert structured_request["text"]["format"]["type"] == "json_schema"
+    assert structured_request["text"]["format"]["schema"] == SCHEMA
+
+
+def test_mistral_client_against_mock_api(api):
+    client = MistralClient(
+        token="token",
+        model="mistral-small-latest",
+        max_tokens=10000,
+        system="sys",
+        debug=False,
+        token_counting="approximate",
+        server_url=api.url,
+    )
+    stdin = lambda: iter(["input"])
+
+    assert client.prompt(prompt="p", stdin=stdin) == "hello world"
+    assert "".join(client.prompt_stream(prompt="p", stdin=stdin)) == "hello world"
+    assert client.bool_prompt(prompt="p", stdin=stdin) == (0, BOOL_RESPONSE)
+    assert {request["path"] for request in api.requests} == {"/v1/chat/completions"}
+
+
+def test_overhead_benchmark_produces_results():
+    results = Suite(iterations=2).run(["overhead"])
+
+    assert {result["backend"] for result in results["results"]} == {
+        "openai",
+        "mistral",
+    }
+    for result in results["results"]:
+        assert result["benchmark"] == "overhead"
+        assert result["unit"] == "ms"
+        assert result["samples"] == 2
+        assert result["min"] <= result["value"] <= result["max"]
+    json.dumps(results)
+
+
+def test_compare_reports_regressions():
+    def run(value, throughput):
+        return {
+            "results": [
+                {
+                    "benchmark": "cold_start",
+                    "backend": "openai",
+                    "command": "prompt",
+                    "value": value,
+                    "unit": "ms",
+                },
+                {
+                    "benchmark": "batch",
+                    "backend": "openai",
+                    "command": "prompt",
+                    "value": throughput,
+                    "unit": "requests/s",
+                },
+            ]
+        }
+
+    assert compare(run(100, 50), run(105, 48), threshold=0.1) == []
+
+    regressions = compare(run(100, 50), run(150, 40), threshold=0.1)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("cold_start/openai/prompt: 100 -> 150 ms")
+    assert regressions[1].startswith("batch/openai/prompt: 50 -> 40 requests/s")
@@ -0,0 +1,199 @@
+import io
+import json
+import math
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import clai
+from benchmarks.mock_server import MockAPI
+from clai.backend.mistral import Client as MistralClient
+from clai.backend.openai import Client as OpenAIClient
+from clai.batch import ClientRegistry, read_requests, run_batch
+from clai.cache import CachedClient, ResponseCache
+from clai.offload import run_offloaded
+from clai.tools import BOOL_MAX_OUTPUT_TOKENS, get_confidence
+
+
+@pytest.fixture
+def api():
+    with MockAPI() as api:
+        yield api
+
+
+def openai_client(api, **kwargs):
+    return OpenAIClient(
+        token="token",
+        model="gpt-5.4",
+        max_tokens=10000,
+        system="sys",
+        debug=False,
+        token_counting="approximate",
+        base_url=f"{api.url}/v1",
+        **kwargs,
+    )
+
+
+def mistral_client(api):
+    return MistralClient(
+        token="token",
+        model="mistral-small-latest",
+        max_tokens=10000,
+        system="sys",
+        debug=False,
+        token_counting="approximate",
+        server_url=api.url,
+    )
+
+
+def logprob(token, value, alternatives=()):
+    return SimpleNamespace(
+        token=token,
+        logprob=value,
+        top_logprobs=[SimpleNamespace(token=t, logprob=v) for t, v in alternatives],
+    )
+
+
+def test_answer_mode_drops_the_reason_and_caps_the_output(api):
+    stdin = lambda: iter(["input"])
+
+    assert openai_client(api).bool_prompt("p", stdin, mode="answer") == (
+        0,
+        '{"answer": true}',
+    )
+    assert mistral_client(api).bool_prompt("p", stdin, mode="answer") == (
+        0,
+        '{"answer": true}',
+    )
+
+    openai_request, mistral_request = api.requests
+    assert openai_request["max_output_tokens"] == BOOL_MAX_OUTPUT_TOKENS
+    assert openai_request["text"]["format"]["schema"]["required"] == ["answer"]
+    assert "include" not in openai_request
+    assert mistral_request["max_tokens"] == BOOL_MAX_OUTPUT_TOKENS
+    assert "logprobs" not in mistral_request
+
+    # Reasoning tokens count against the cap, so it is not applied.
+    openai_client(api, reasoning="low").bool_prompt("p", stdin, mode="answer")
+    assert "max_output_tokens" not in api.requests[-1]
+
+
+def test_confidence_mode_derives_the_confidence_from_logprobs(api):
+    api.confidence = 0.75
+    stdin = lambda: iter(["input"])
+
+    for client in (openai_client(api), mistral_client(api)):
+        exit_code, output = client.bool_prompt("p", stdin, mode="confidence")
+        assert exit_code == 0
+        assert json.loads(output) == {"answer": True, "confidence": 0.75}
+
+    openai_request, mistral_request = api.requests
+    assert openai_request["include"] == ["message.output_text.logprobs"]
+    assert openai_request["top_logprobs"] > 1
+    assert mistral_request["logprobs"] is True
+
+
+def test_get_confidence():
+    logprobs = [
+        logprob('{"', 0.0),
+        logprob("answer", 0.0),
+        logprob('":', 0.0),
+        logprob(
+            " false",
+            math.log(0.6),
+            [(" false", math.log(0.6)), ("false", math.log(0.1)), (" true", -1)],
+        ),
+        logprob("}", 0.0),
+    ]
+
+    assert get_confidence(logprobs, False) == round(0.7 / (0.7 + math.exp(-1)), 4)
+    assert get_confidence(logprobs, True) == round(
+        math.exp(-1) / (0.7 + math.exp(-1)), 4
+    )
+
+    with pytest.raises(SystemExit) as err:
+        get_confidence(logprobs[:3], True)
+    assert err.value.code == 3
+
+
+def test_bool_modes_are_cached_apart(tmp_path):
+    calls = []
+
+    class Client:
+        def bool_prompt(self, prompt, stdin, mode="reason"):
+            calls.append(mode)
+            return 0, mode
+
+    client = CachedClient(
+        factory=Client,
+        cache=ResponseCache(path=str(tmp_path / "cache.sqlite")),
+        namespace={"backend": "openai"},
+    )
+    stdin = lambda: iter(["a"])
+
+    for _ in range(2):
+        assert client.bool_prompt("p", stdin) == (0, "reason")
+        assert client.bool_prompt("p", stdin, mode="answer") == (0, "answer")
+
+    assert calls == ["reason", "answer"]
+
+
+def test_batch_specs_select_the_bool_mode(api):
+    clients = ClientRegistry(lambda backend, instance: openai_client(api))
+    specs = [
+        {"command": "bool", "prompt": "a", "bool_mode": "answer"},
+        {"command": "bool", "prompt": "b", "bool_mode": "confidence"},
+    ]
+
+    outputs = [
+        result["output"]
+        for result in run_batch(specs, clients, "openai", "default", concurrency=2)
+    ]
+    offloaded = [
+        result["output"]
+        for result in run_offloaded(
+            specs,
+            clients,
+            backend="openai",
+            instance="default",
+            poll_interval=0.001,
+            max_poll_interval=0.01,
+        )
+    ]
+
+    expected = ['{"answer": true}', '{"answer": true, "confidence": 0.9}']
+    assert outputs == offloaded == expected
+
+    with pytest.raises(Exception, match="unsupported bool mode `fast`"):
+        list(read_requests(io.StringIO('{"command": "bool", "bool_mode": "fast"}\n')))
+
+
+def test_cli_flags_select_the_bool_mode(monkeypatch, tmp_path, capsys):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"backends": {"openai": {"default": {}}}}))
+    base = ["clai", "--config", str(config), "--backend", "openai"]
+    base += ["--instance", "default", "--no-daemon", "--no-cache"]
+    modes = []
+
+    class Client:
+        def bool_prompt(self, prompt, stdin, mode="reason"):
+            modes.append(mode)
+            return 1, '{"answer": false}'
+
+    monkeypatch.setenv("CLAI_CONFIG_CACHE", "")
+    monkeypatch.setattr(clai, "get_client", lambda **kwargs: Client())
+    monkeypatch.setattr(clai, "read_stdin", lambda: ["input"])
+
+    for flag in ("--no-reason", "--confidence"):
+        monkeypatch.setattr(sys, "argv", base + ["bool", "p", flag])
+        with pytest.raises(SystemExit) as err:
+            clai.main()
+        assert err.value.code == 1
+
+    assert modes == ["answer", "confidence"]
+
+    monkeypatch.setattr(sys, "argv", base + ["map", "p", "--no-reason"])
+    with pytest.raises(SystemExit):
+        clai.main()
+    assert "require `--command bool`" in capsys.readouterr().out
@@ -0,0 +1,193 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from clai.cache import CachedClient, ResponseCache, SpooledLines, make_key
+from clai.tools import get_cache_namespace
+
+NAMESPACE = {"backend": "openai", "model": "gpt-5.4"}
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    def prompt(self, prompt, stdin):
+        self.calls += 1
+        return f"{prompt}:{'|'.join(stdin())}"
+
+    def bool_prompt(self, prompt, stdin):
+        self.calls += 1
+        return 0, '{"answer":true,"reason":"x"}'
+
+
+def test_response_cache_roundtrip_and_counters(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+
+    assert cache.get("a") is None
+    cache.set("a", [0, "yes"])
+
+    assert cache.get("a") == [0, "yes"]
+    assert cache.counters() == {"hits": 1, "misses": 1}
+    assert ResponseCache(path=str(tmp_path / "cache.sqlite")).get("a") == [0, "yes"]
+
+
+def test_response_cache_expires_entries(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), ttl=0)
+    cache.set("a", "value")
+    time.sleep(0.01)
+
+    assert cache.get("a") is None
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), max_size=30)
+    cache.set("a", "x" * 10)
+    cache.set("b", "x" * 10)
+    cache.get("a")
+    cache.set("c", "x" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_response_cache_tracks_its_size_and_evicts_in_batches(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path=path, max_size=120)
+    for key in "abcdefghij":
+        cache.set(key, "x" * 10)
+    cache.set("a", "x" * 4)
+
+    size = lambda cache: cache.db.execute(
+        "SELECT value FROM counters WHERE name = 'size'"
+    ).fetchone()[0]
+    assert size(cache) == 114
+
+    # Exceeding the limit evicts down to EVICTION_TARGET of max_size at once.
+    statements = []
+    cache.db.set_trace_callback(statements.append)
+    cache.set("k", "x" * 10)
+    assert size(cache) == 102
+    cache.set("l", "x" * 10)
+    assert size(cache) == 114
+    assert sum("ORDER BY accessed" in statement for statement in statements) == 1
+    assert cache.get("b") is None and cache.get("c") is None
+    assert cache.get("a") is not None
+
+    assert size(ResponseCache(path=path, max_size=120)) == 114
+
+
+def test_make_key_depends_on_all_request_parts(tmp_path):
+    schema = tmp_path / "schema.json"
+    schema.write_text("{}")
+    key = make_key(NAMESPACE, "prompt", "p", ["a", "b"])
+
+    assert key == make_key(NAMESPACE, "prompt", "p", ["a", "b"])
+    assert key != make_key(NAMESPACE, "bool", "p", ["a", "b"])
+    assert key != make_key(NAMESPACE, "prompt", "p", ["ab"])
+    assert key != make_key(NAMESPACE | {"temperature": 0.5}, "prompt", "p", ["a", "b"])
+    assert key != make_key(NAMESPACE, "prompt", "p", ["a", "b"], str(schema))
+
+
+def test_cached_client_only_creates_client_on_miss(tmp_path):
+    created = []
+
+    def factory():
+        created.append(FakeClient())
+        return created[-1]
+
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    client = CachedClient(factory=factory, cache=cache, namespace=NAMESPACE)
+    assert client.bool_prompt("p", lambda: iter(["a"])) == (
+        0,
+        '{"answer":true,"reason":"x"}',
+    )
+
+    client = CachedClient(factory=factory, cache=cache, namespace=NAMESPACE)
+    assert client.bool_prompt("p", lambda: iter(["a"])) == (
+        0,
+        '{"answer":true,"reason":"x"}',
+    )
+    assert len(created) == 1
+
+    client = CachedClient(
+        factory=factory, cache=cache, namespace=NAMESPACE, refresh=True
+    )
+    client.bool_prompt("p", lambda: iter(["a"]))
+    assert len(created) == 2
+
+
+def test_cached_client_spools_stdin_and_replays_it_on_a_miss(tmp_path):
+    lines = ["a", "multi\nline", "é" * 10]
+    spool = SpooledLines(max_size=8)
+    assert list(spool.record(iter(lines))) == lines
+    assert spool.fh._rolled
+    assert list(spool.replay()) == list(spool.replay()) == lines
+    spool.close()
+
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    client = CachedClient(factory=FakeClient, cache=cache, namespace=NAMESPACE)
+
+    assert client.prompt("p", lambda: iter(lines)) == "p:" + "|".join(lines)
+    assert cache.get(make_key(NAMESPACE, "prompt", "p", lines)) == (
+        "p:" + "|".join(lines)
+    )
+
+
+def test_cached_client_rejects_unsupported_structured(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    client = CachedClient(factory=FakeClient, cache=cache, namespace=NAMESPACE)
+
+    with pytest.raises(NotImplementedError):
+        client.structured("p", lambda: iter([]), schema=None)
+
+
+def test_cache_hit_does_not_import_backend_sdk(tmp_path):
+    config = {
+        "cache": {"path": str(tmp_path / "cache.sqlite")},
+        "backends": {
+            "openai": {
+                "default": {
+                    "token": "token",
+                    "max_tokens": 100,
+                    "model": "gpt-5.4",
+                    "system": "You are a helpful assistant.",
+                }
+            }
+        },
+    }
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(config))
+    key = make_key(get_cache_namespace(config, "openai", "default"), "prompt", "hi", [])
+    ResponseCache(path=str(tmp_path / "cache.sqlite")).set(key, "cached hello")
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, clai; sys.argv = sys.argv[1:]\n"
+            "try:\n    clai.main()\n"
+            "finally:\n    print('openai' in sys.modules, file=sys.stderr)",
+            "clai",
+            "--config",
+            str(config_path),
+            "--backend",
+            "openai",
+            "--instance",
+            "default",
+            "prompt",
+            "hi",
+        ],
+        capture_output=True,
+        text=True,
+        stdin=subprocess.DEVNULL,
+        env=os.environ | {"PYTHONPATH": os.getcwd()},
+    )
+
+    assert result.stdout.strip() == "cached hello"
+    assert result.stderr.strip() == "False"
@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+import clai.backend
+from clai.backend import BaseBackend
+from clai.backend.mistral import tools as mistral_tools
+from clai.backend.openai import Client as OpenAIClient
+from clai.chunked import run_chunked
+
+
+class FakeClient:
+    def __init__(self, max_tokens):
+        self.client = OpenAIClient(
+            token="token",
+            model="gpt-5.4",
+            max_tokens=max_tokens,
+            system="sys",
+            debug=False,
+            token_counting="approximate",
+        )
+        self.max_tokens = max_tokens
+        self.system = "sys"
+        self.debug = False
+        self.calls = []
+
+    def count_tokens(self, data):
+        return self.client.count_tokens(data)
+
+    def chunk(self, data, size, overlap=0):
+        return self.client.chunk(data, size=size, overlap=overlap)
+
+    def chunk_lines(self, lines, size, overlap=0):
+        return self.client.chunk_lines(lines, size=size, overlap=overlap)
+
+    def prompt(self, prompt, stdin):
+        stdin = "".join(stdin())
+        self.calls.append((prompt, stdin))
+        if prompt.startswith("sum"):
+            return str(sum(int(n) for n in stdin.split() if n.isdigit()))
+        return "total"
+
+    def structured(self, prompt, stdin, schema):
+        stdin = "".join(stdin())
+        self.calls.append((prompt, stdin))
+        return json.dumps({"chars": len(stdin)})
+
+
+def test_approximate_split_overlaps_chunks():
+    vtl = mistral_tools.ValidateTokenLength(
+        model="m", max_tokens=10, token_counting="approximate"
+    )
+
+    assert vtl.split("abcdefghij", size=4, overlap=1) == ["abcd", "defg", "ghij"]
+    assert vtl.split("", size=4) == [""]
+    with pytest.raises(ValueError, match="overlap"):
+        vtl.split("abc", size=2, overlap=2)
+
+
+def test_exact_split_cuts_on_token_boundaries():
+    vtl = mistral_tools.ValidateTokenLength(model="m", max_tokens=1000)
+    data = " ".join(f"word{i}" for i in range(50))
+
+    chunks = vtl.split(data, size=20, overlap=5)
+
+    # Re-tokenizing a chunk cut mid-word may cost one extra token.
+    assert all(vtl.count(chunk) <= 21 for chunk in chunks)
+    assert chunks[0].split()[0] == "word0"
+    assert chunks[-1].split()[-1] == "word49"
+
+
+@pytest.mark.parametrize("token_counting", ["exact", "approximate"])
+def test_lines_are_split_a_window_at_a_time(monkeypatch, token_counting):
+    monkeypatch.setattr(clai.backend, "TOKEN_BATCH_SIZE", 50)
+    vtl = mistral_tools.ValidateTokenLength(
+        model="m", max_tokens=1000, token_counting=token_counting
+    )
+    lines = [f"line {i} of the input" for i in range(40)]
+    read = []
+
+    def stdin():
+        for line in lines:
+            read.append(line)
+            yield line
+
+    chunks = vtl.split_lines(stdin(), size=30, overlap=5)
+    first = next(chunks)
+
+    # Only the first windows are read to produce the first chunk.
+    assert len(read) < len(lines) / 2
+    chunks = [first, *chunks]
+    assert all(vtl.count(chunk) <= 31 for chunk in chunks)
+    assert chunks[0].startswith("line 0 ")
+    assert chunks[-1].endswith("line 39 of the input")
+    if token_counting == "approximate":
+        assert chunks == vtl.split("\n".join(lines), size=30, overlap=5)
+
+
+def test_base_backend_without_tokenizer_cannot_chunk():
+    backend = BaseBackend(token="t", model="m", max_tokens=10, debug=False)
+
+    with pytest.raises(NotImplementedError):
+        backend.chunk("data", size=4)
+
+
+def test_run_chunked_maps_chunks_and_reduces_answers():
+    client = FakeClient(max_tokens=400)
+    lines = [f"{n:>3}" for n in range(1, 101)]
+
+    exit_code, output = run_chunked(
+        client, "prompt", "sum", lines, overlap=0, concurrency=2
+    )
+
+    assert exit_code == 0
+    assert output == "total"
+    map_calls = [call for call in client.calls if call[0] == "sum"]
+    assert len(map_calls) > 1
+    assert "".join(stdin for _, stdin in map_calls) == "\n".join(lines)
+    reduce_prompt, reduce_stdin = client.calls[-1]
+    assert reduce_prompt.endswith("sum")
+    assert "Part 1:" in reduce_stdin
+
+
+def test_run_chunked_single_chunk_skips_reduce():
+    client = FakeClient(max_tokens=1000)
+
+    assert run_chunked(client, "structured", "count", ["abc"], schema="s.json") == (
+        0,
+        '{"chars": 3}',
+    )
+    assert len(client.calls) == 1
+
+
+def test_run_chunked_rejects_overlap_exceeding_budget():
+    client = FakeClient(max_tokens=300)
+
+    with pytest.raises(Exception, match="no room"):
+        run_chunked(client, "prompt", "sum", ["1"], overlap=300)
+
+
+def test_run_chunked_requires_prompt():
+    assert run_chunked(FakeClient(max_tokens=1000), "prompt", "", ["a"])[0] == 1
@@ -0,0 +1,84 @@
+import os
+import sys
+
+import pytest
+
+from clai.tools import get_backend_instance_config, get_config_cache_path, read_config
+
+CONFIG = """
+backends:
+  openai:
+    default:
+      token: ${{CLAI_TEST_TOKEN}}
+      model: gpt-5.4
+      max_tokens: 1000
+      system: sys
+    other:
+      token: ${{CLAI_TEST_MISSING}}
+      model: gpt-5.4
+      max_tokens: 1000
+      system: sys
+"""
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAI_CONFIG_CACHE", str(tmp_path / "cache"))
+    path = tmp_path / "config.yaml"
+    path.write_text(CONFIG)
+    return path
+
+
+def test_config_is_compiled_and_reused(config_path, monkeypatch):
+    config = read_config(str(config_path))
+    cache_path = get_config_cache_path(str(config_path))
+
+    assert os.stat(cache_path).st_mode & 0o777 == 0o600
+
+    # A cached config is loaded without parsing YAML.
+    monkeypatch.setitem(sys.modules, "yaml", None)
+    assert read_config(str(config_path)) == config
+
+
+def test_changed_config_is_parsed_again(config_path):
+    read_config(str(config_path))
+    config_path.write_text(CONFIG.replace("max_tokens: 1000", "max_tokens: 2000"))
+    os.utime(config_path, ns=(0, 0))
+
+    config = read_config(str(config_path))
+
+    assert config["backends"]["openai"]["default"]["max_tokens"] == 2000
+
+
+def test_corrupt_compiled_config_is_ignored(config_path):
+    expected = read_config(str(config_path))
+    with open(get_config_cache_path(str(config_path)), "wb") as cache_fh:
+        cache_fh.write(b"garbage")
+
+    assert read_config(str(config_path)) == expected
+
+
+def test_config_cache_can_be_disabled(config_path, tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAI_CONFIG_CACHE", "")
+
+    assert get_config_cache_path(str(config_path)) is None
+    assert read_config(str(config_path))["backends"]["openai"]["default"]
+    assert not (tmp_path / "cache").exists()
+
+
+def test_environment_variables_are_resolved_for_selected_instance(
+    config_path, monkeypatch
+):
+    monkeypatch.setenv("CLAI_TEST_TOKEN", "secret")
+    config = read_config(str(config_path))
+
+    # The unresolvable reference of `other` doesn't matter for `default`.
+    instance = get_backend_instance_config(config, "openai", "default")
+
+    assert instance.token == "secret"
+    assert config["backends"]["openai"]["default"]["token"] == "${{CLAI_TEST_TOKEN}}"
+    assert type(instance) is type(
+        get_backend_instance_config(config, "openai", "default")
+    )
+    with pytest.raises(Exception, match="CLAI_TEST_MISSING"):
+        get_backend_instance_config(config, "openai", "other")
@@ -0,0 +1,131 @@
+import json
+import sys
+import threading
+
+import pytest
+
+import clai
+from clai.batch import ClientRegistry, run_batch
+from clai.dedup import SingleFlight
+
+
+def test_concurrent_duplicates_share_one_call():
+    dedup = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(dedup.do("k", call)))
+    leader.start()
+    started.wait()
+    followers = [
+        threading.Thread(target=lambda: results.append(dedup.do("k", call)))
+        for _ in range(3)
+    ]
+    for follower in followers:
+        follower.start()
+    while dedup.counters["deduplicated"] < 3:
+        pass
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    assert dedup.summary() == {
+        "requests": 4,
+        "unique": 1,
+        "deduplicated": 3,
+        "dedup_ratio": 0.75,
+    }
+
+
+def test_errors_are_shared_and_old_keys_forgotten():
+    dedup = SingleFlight(window=1)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        dedup.do("a", fail)
+    with pytest.raises(ValueError):
+        dedup.do("a", lambda: "ok")
+
+    dedup.do("b", lambda: "b")
+    assert dedup.do("a", lambda: "ok") == "ok"
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def prompt(self, prompt, stdin):
+        with self.lock:
+            self.calls += 1
+        return f"{prompt}:{'|'.join(stdin())}"
+
+
+def test_run_batch_fans_results_out_to_duplicates():
+    client = FakeClient()
+    clients = ClientRegistry(lambda backend, instance: client)
+    requests = [
+        {"prompt": "p", "input": "a", "id": 1},
+        {"prompt": "p", "input": " a ", "id": 2},
+        {"prompt": "p", "input": "b"},
+        {"prompt": "p", "input": "a", "instance": "other"},
+    ]
+
+    results = list(
+        run_batch(requests, clients, "openai", "default", 2, dedup=SingleFlight())
+    )
+
+    assert [result["output"] for result in results] == ["p:a", "p:a", "p:b", "p:a"]
+    assert [result.get("id") for result in results] == [1, 2, None, None]
+    assert client.calls == 3
+
+
+def test_map_dedup_is_reported_on_stderr(monkeypatch, capsys, tmp_path):
+    client = FakeClient()
+    config = tmp_path / "config.yaml"
+    config.write_text(json.dumps({"backends": {"openai": {"default": {}}}}))
+    monkeypatch.setenv("CLAI_CONFIG_CACHE", "")
+    monkeypatch.setattr(clai, "get_client", lambda **kwargs: client)
+    monkeypatch.setattr(clai, "read_stdin", lambda: iter(["x\n", "y\n", "x\n", "x\n"]))
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "clai",
+            "--config",
+            str(config),
+            "--backend",
+            "openai",
+            "--instance",
+            "default",
+            "map",
+            "p",
+            "--dedup",
+            "--concurrency",
+            "1",
+        ],
+    )
+
+    with pytest.raises(SystemExit) as err:
+        clai.main()
+
+    assert err.value.code == 0
+    captured = capsys.readouterr()
+    outputs = [json.loads(line)["output"] for line in captured.out.splitlines()]
+    assert outputs == ["p:x", "p:y", "p:x", "p:x"]
+    assert client.calls == 2
+    label, _, summary = captured.err.strip().partition(" ")
+    assert label == "Dedup:"
+    assert json.loads(summary)["dedup_ratio"] == 0.5
@@ -0,0 +1,141 @@
+import sys
+import threading
+
+import pytest
+
+from clai.hedge import HedgedClient
+from clai.pool import InstancePool, Member
+
+
+class SlowFirstClient:
+    """Answers the first request after `delay` and later requests immediately."""
+
+    def __init__(self, delay=1.0, first_error=None, error=None):
+        self.delay = delay
+        self.first_error = first_error
+        self.error = error
+        self.calls = 0
+        self.closed = []
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+
+    def _number(self):
+        with self.lock:
+            self.calls += 1
+            return self.calls
+
+    def prompt(self, prompt, stdin):
+        number = self._number()
+        if number == 1:
+            self.release.wait(self.delay)
+            if self.first_error is not None:
+                raise self.first_error
+        elif self.error is not None:
+            raise self.error
+        return f"{number}:{'|'.join(stdin())}"
+
+    def prompt_stream(self, prompt, stdin):
+        number = self._number()
+        if number == 1:
+            self.release.wait(self.delay)
+        try:
+            yield str(number)
+            yield "|".join(stdin())
+        finally:
+            self.closed.append(number)
+
+
+def test_fast_request_is_not_hedged():
+    client = HedgedClient(SlowFirstClient(delay=0), hedge_after=1)
+
+    assert client.prompt("p", lambda: iter(["a"])) == "1:a"
+    assert client.summary() == {
+        "requests": 1,
+        "hedged": 0,
+        "hedges_won": 0,
+        "hedge_rate": 0.0,
+    }
+
+
+def test_slow_request_is_hedged_and_hedge_wins():
+    backend = SlowFirstClient()
+    client = HedgedClient(backend, hedge_after=0.01)
+
+    # Stdin is read once and replayed to both requests.
+    lines = iter(["a", "b"])
+    assert client.prompt("p", lambda: lines) == "2:a|b"
+    assert client.summary()["hedges_won"] == 1
+    assert client.summary()["hedge_rate"] == 1.0
+    backend.release.set()
+
+
+def test_failed_request_waits_for_hedge():
+    class SlowHedge(SlowFirstClient):
+        def prompt(self, prompt, stdin):
+            if self.calls == 1:
+                threading.Event().wait(0.1)
+            return super().prompt(prompt, stdin)
+
+    backend = SlowHedge(delay=0.05, first_error=ConnectionError("reset"))
+    client = HedgedClient(backend, hedge_after=0.01)
+
+    assert client.prompt("p", lambda: iter([])) == "2:"
+    assert client.summary()["hedges_won"] == 1
+
+
+def test_both_requests_failing_raises_first_error():
+    backend = SlowFirstClient(
+        delay=0.05, first_error=ConnectionError("first"), error=TimeoutError("hedge")
+    )
+    client = HedgedClient(backend, hedge_after=0.01)
+
+    with pytest.raises((ConnectionError, TimeoutError)):
+        client.prompt("p", lambda: iter([]))
+
+
+def test_aborting_requests_raise_system_exit():
+    class AbortingClient(SlowFirstClient):
+        def bool_prompt(self, prompt, stdin, **kwargs):
+            number = self._number()
+            if number == 1:
+                self.release.wait(self.delay)
+            print("Invalid response.")
+            sys.exit(3)
+
+    for delay in (0, 0.05):
+        client = HedgedClient(AbortingClient(delay=delay), hedge_after=0.01)
+
+        with pytest.raises(SystemExit) as err:
+            client.bool_prompt("p", lambda: iter([]))
+        assert err.value.code == 3
+
+
+def test_losing_stream_is_closed():
+    backend = SlowFirstClient(delay=0.2)
+    client = HedgedClient(backend, hedge_after=0.01)
+
+    assert list(client.prompt_stream("p", lambda: iter(["a"]))) == ["2", "a"]
+    backend.release.set()
+    for _ in range(100):
+        if 1 in backend.closed:
+            break
+        threading.Event().wait(0.01)
+
+    assert sorted(backend.closed) == [1, 2]
+
+
+def test_hedge_on_pool_is_served_by_another_instance():
+    slow, fast = SlowFirstClient(), SlowFirstClient(delay=0)
+    pool = InstancePool(
+        name="eu", members=[Member("slow", slow, 1), Member("fast", fast, 1)]
+    )
+    client = HedgedClient(pool, hedge_after=0.01)
+
+    assert client.prompt("p", lambda: iter([])) == "1:"
+    assert (slow.calls, fast.calls) == (1, 1)
+    slow.release.set()
+
+
+def test_hedge_threshold_must_be_positive():
+    with pytest.raises(ValueError):
+        HedgedClient(SlowFirstClient(), hedge_after=0)
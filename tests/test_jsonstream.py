@@ -0,0 +1,206 @@
+import json
+import random
+import sys
+
+import pytest
+
+import clai
+from benchmarks.mock_server import MockAPI
+from clai.backend.openai import Client as OpenAIClient
+from clai.cache import CachedClient, ResponseCache
+from clai.jsonstream import ArrayStream, iter_elements
+from clai.schema import Schema, get_stream_items
+
+RECORDS = {
+    "$defs": {
+        "records": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"name": {"type": "string"}},
+                "required": ["name"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "type": "object",
+    "properties": {"records": {"$ref": "#/$defs/records"}},
+    "required": ["records"],
+    "additionalProperties": False,
+}
+
+
+def schema(content):
+    return Schema("schema.json", b"", "digest", content)
+
+
+def openai_client(api):
+    return OpenAIClient(
+        token="token",
+        model="gpt-5.4",
+        max_tokens=10000,
+        system="sys",
+        debug=False,
+        token_counting="approximate",
+        base_url=f"{api.url}/v1",
+    )
+
+
+def test_elements_are_yielded_as_soon_as_they_are_complete():
+    parser = ArrayStream(("records",))
+
+    assert list(parser.feed('{"records": [{"name": "a"}, {"na')) == [{"name": "a"}]
+    assert list(parser.feed('me": "]}\\""}, 1')) == [{"name": ']}"'}]
+    assert list(parser.feed("2")) == []
+    assert list(parser.feed("]}")) == [12]
+    parser.close()
+
+
+def test_random_chunking_matches_the_document():
+    documents = [
+        ([1, -2.5e3, True, None, 'a\\"]', {"x": [1, {"y": "]"}]}, []], ()),
+        ({"meta": {"records": [0]}, "records": [{"a": "b"}, "c"]}, ("records",)),
+        ({"records": []}, ("records",)),
+    ]
+
+    for document, path in documents:
+        text = json.dumps(document, indent=random.choice([None, 2]))
+        expected = document[path[0]] if path else document
+        for _ in range(20):
+            cuts = sorted(random.sample(range(1, len(text)), min(5, len(text) - 1)))
+            chunks = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+            assert list(iter_elements(chunks, path)) == expected
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ('{"records": [{"a": 1}', "ended before it was complete"),
+        ('{"other": []}', "does not contain the array"),
+        ('{"records": [{"a": 1]}', "not valid JSON"),
+    ],
+)
+def test_incomplete_or_invalid_documents_raise(text, message):
+    with pytest.raises(Exception, match=message):
+        list(iter_elements([text], ("records",)))
+
+
+def test_get_stream_items():
+    items = {"type": "integer"}
+
+    assert get_stream_items(schema({"type": "array", "items": items})) == ((), items)
+    assert get_stream_items(schema(RECORDS)) == (
+        ("records",),
+        RECORDS["$defs"]["records"]["items"],
+    )
+    with pytest.raises(Exception, match="single array property"):
+        get_stream_items(schema({"type": "object", "properties": {"a": items}}))
+
+
+def test_structured_stream_yields_validated_ndjson(tmp_path):
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text(json.dumps(RECORDS))
+    records = [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+    stdin = lambda: iter(["input"])
+
+    with MockAPI(chunks=12) as api:
+        client = openai_client(api)
+        api.answer = lambda *args, **kwargs: json.dumps({"records": records})
+
+        stream = client.structured_stream("p", stdin, str(schema_path))
+        assert [json.loads(line) for line in stream] == records
+        assert api.requests[0]["stream"] is True
+
+        api.answer = lambda *args, **kwargs: json.dumps(
+            {"records": [{"name": "a"}, {"title": "b"}]}
+        )
+        stream = client.structured_stream("p", stdin, str(schema_path))
+        assert json.loads(next(stream)) == {"name": "a"}
+        with pytest.raises(Exception, match="Element 1 of the structured response"):
+            next(stream)
+
+        # The schema is checked before a request is sent.
+        schema_path.write_text(json.dumps({"type": "object", "properties": {}}))
+        with pytest.raises(Exception, match="single array property"):
+            client.structured_stream("p", stdin, str(schema_path))
+        assert len(api.requests) == 2
+
+
+def test_structured_stream_is_cached(tmp_path):
+    calls = []
+
+    class Client:
+        def structured_stream(self, prompt, stdin, schema):
+            calls.append(prompt)
+            return iter(['{"name": "a"}\n', '{"name": "b"}\n'])
+
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text(json.dumps(RECORDS))
+    client = CachedClient(
+        factory=Client,
+        cache=ResponseCache(path=str(tmp_path / "cache.sqlite")),
+        namespace={"backend": "openai"},
+    )
+    stdin = lambda: iter(["a"])
+
+    first = "".join(client.structured_stream("p", stdin, str(schema_path)))
+    second = "".join(client.structured_stream("p", stdin, str(schema_path)))
+
+    assert first == second == '{"name": "a"}\n{"name": "b"}\n'
+    assert calls == ["p"]
+
+
+def test_structured_stream_cache_hit_does_not_build_the_backend(tmp_path):
+    built = []
+
+    class Client:
+        def structured_stream(self, prompt, stdin, schema):
+            return iter(['{"name": "a"}\n'])
+
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text(json.dumps(RECORDS))
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    stdin = lambda: iter(["a"])
+
+    def client():
+        return CachedClient(
+            factory=lambda: built.append(True) or Client(),
+            cache=cache,
+            namespace={"backend": "openai"},
+        )
+
+    assert "".join(client().structured_stream("p", stdin, str(schema_path)))
+    assert built == [True]
+
+    hit = client()
+    assert "".join(hit.structured_stream("p", stdin, str(schema_path))) == (
+        '{"name": "a"}\n'
+    )
+    assert built == [True]
+
+
+def test_cli_writes_ndjson_lines(monkeypatch, tmp_path, capsys):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"backends": {"openai": {"default": {}}}}))
+
+    class Client:
+        def structured_stream(self, prompt, stdin, schema):
+            yield '{"name": "a"}\n'
+            yield '{"name": "b"}\n'
+
+    monkeypatch.setenv("CLAI_CONFIG_CACHE", "")
+    monkeypatch.setattr(clai, "get_client", lambda **kwargs: Client())
+    monkeypatch.setattr(clai, "read_stdin", lambda: ["input"])
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["clai", "--config", str(config), "--backend", "openai"]
+        + ["--instance", "default", "--no-daemon", "--no-cache"]
+        + ["structured", "p", "--schema", "schema.json", "--stream"],
+    )
+
+    with pytest.raises(SystemExit) as err:
+        clai.main()
+
+    assert err.value.code == 0
+    assert capsys.readouterr().out == '{"name": "a"}\n{"name": "b"}\n'
@@ -0,0 +1,210 @@
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import clai
+from benchmarks.mock_server import MockAPI
+from clai.backend.openai import Client as OpenAIClient
+from clai.cache import CachedClient, ResponseCache
+from clai.ledger import Call, Ledger, LedgerClient, parse_window
+from clai.pool import InstancePool, Member
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={})
+
+
+def openai_client(api, model="gpt-5.4"):
+    return OpenAIClient(
+        token="token",
+        model=model,
+        max_tokens=10000,
+        system="sys",
+        debug=False,
+        token_counting="approximate",
+        base_url=f"{api.url}/v1",
+    )
+
+
+def rows(ledger):
+    return ledger.db.execute(
+        "SELECT command, input_tokens, output_tokens, retries, cache_hit, error "
+        "FROM calls ORDER BY id"
+    ).fetchall()
+
+
+def test_stats_report_percentiles_throughput_and_error_rate(tmp_path):
+    ledger = Ledger(path=str(tmp_path / "ledger.sqlite"))
+    call = Call()
+    call.add_usage({"input_tokens": 10, "output_tokens": 20})
+    for latency in range(1, 101):
+        ledger.record("openai", "default", "gpt-5.4", "prompt", call, latency / 100)
+    ledger.record("openai", "default", "gpt-5.4", "prompt", Call(), 0.005, "Timeout.")
+    hit = Call()
+    hit.cache_hit = True
+    ledger.record("openai", "default", "gpt-5.4", "prompt", hit, 0.0)
+    ledger.record("mistral", "small", None, "bool", call, 1.0)
+
+    reports = {report["backend"]: report for report in ledger.stats(window=60)}
+
+    report = reports["openai"]
+    assert (report["calls"], report["errors"], report["cache_hits"]) == (102, 1, 1)
+    assert report["error_rate"] == 1 / 102
+    assert (report["p50"], report["p95"], report["p99"]) == (0.5, 0.95, 0.99)
+    assert report["output_tokens"] == 2000
+    assert report["tokens_per_second"] == pytest.approx(2000 / 50.505)
+    assert reports["mistral"]["tokens_per_second"] == 20.0
+    assert [r["backend"] for r in ledger.stats(60, instance="small")] == ["mistral"]
+
+
+def test_rotation_drops_expired_calls_and_caps_the_rows(tmp_path):
+    path = str(tmp_path / "ledger.sqlite")
+    ledger = Ledger(path=path, max_rows=3)
+    for _ in range(5):
+        ledger.record("openai", "default", None, "prompt", Call(), 0.1)
+    ledger.db.execute("UPDATE calls SET time = time - 3600 WHERE id = 1")
+
+    ledger = Ledger(path=path, retention=60, max_rows=3)
+
+    assert [row[0] for row in ledger.db.execute("SELECT id FROM calls")] == [3, 4, 5]
+    assert parse_window("90") == 90 and parse_window("7d") == 7 * 86400
+    with pytest.raises(ValueError, match="Invalid window"):
+        parse_window("soon")
+
+
+def test_ledger_client_records_usage_and_cache_hits(tmp_path):
+    ledger = Ledger(path=str(tmp_path / "ledger.sqlite"))
+    stdin = lambda: iter(["input"])
+
+    with MockAPI(chunks=3) as api:
+        backend = openai_client(api)
+        client = LedgerClient(
+            CachedClient(
+                factory=lambda: backend,
+                cache=ResponseCache(path=str(tmp_path / "cache.sqlite")),
+                namespace={"backend": "openai"},
+            ),
+            ledger=ledger,
+            backend="openai",
+            instance="default",
+            model="gpt-5.4",
+        )
+
+        client.prompt("p", stdin)
+        client.prompt("p", stdin)
+        assert "".join(client.prompt_stream("q", stdin))
+        assert client.bool_prompt("b", stdin, mode="answer")[0] == 0
+
+    recorded = rows(ledger)
+    assert [row[0] for row in recorded] == ["prompt"] * 3 + ["bool"]
+    assert recorded[0][1] > 0 and recorded[0][2] > 0
+    assert recorded[1][1:5] == (0, 0, 0, 1)
+    assert recorded[2][2] > 0
+    assert recorded[3][5] is None
+
+
+def test_pooled_calls_record_the_model_of_the_serving_instance(tmp_path):
+    ledger = Ledger(path=str(tmp_path / "ledger.sqlite"))
+    stdin = lambda: iter(["input"])
+
+    with MockAPI() as api:
+        pool = InstancePool(
+            name="eu",
+            members=[
+                Member("west", openai_client(api, "gpt-5.4"), 1),
+                Member("north", openai_client(api, "gpt-5.4-mini"), 1),
+            ],
+        )
+        client = LedgerClient(
+            CachedClient(
+                factory=lambda: pool,
+                cache=ResponseCache(path=str(tmp_path / "cache.sqlite")),
+                namespace={"backend": "openai", "pool": []},
+            ),
+            ledger=ledger,
+            backend="openai",
+            instance="pool:eu",
+        )
+        for prompt in ("a", "b", "a"):
+            client.prompt(prompt, stdin)
+
+    models = [row[0] for row in ledger.db.execute("SELECT model FROM calls")]
+    assert sorted(models[:2]) == ["gpt-5.4", "gpt-5.4-mini"]
+    assert models[2] == "pool:eu"
+    assert sorted(report["model"] for report in ledger.stats(60)) == [
+        "gpt-5.4",
+        "gpt-5.4-mini",
+        "pool:eu",
+    ]
+
+
+def test_retries_and_errors_are_recorded(tmp_path):
+    ledger = Ledger(path=str(tmp_path / "ledger.sqlite"))
+    errors = [StatusError(503), StatusError(429), StatusError(400)]
+
+    def create(**request):
+        if errors:
+            raise errors.pop(0)
+        return SimpleNamespace(output=[])
+
+    backend = OpenAIClient(
+        token="token",
+        model="gpt-5.4",
+        max_tokens=100,
+        system="sys",
+        debug=False,
+        token_counting="approximate",
+        retry={"initial_backoff": 0, "max_backoff": 0},
+    )
+    backend.client = SimpleNamespace(responses=SimpleNamespace(create=create))
+    client = LedgerClient(backend, ledger=ledger, backend="openai", instance="default")
+
+    with pytest.raises(StatusError):
+        client.prompt("p", lambda: iter([]))
+    client.prompt("p", lambda: iter([]))
+
+    assert [row[3:] for row in rows(ledger)] == [(2, 0, "status 400"), (0, 0, None)]
+
+
+def test_cli_stats_writes_a_report_per_instance(monkeypatch, tmp_path, capsys):
+    path = str(tmp_path / "ledger.sqlite")
+    config = tmp_path / "config.json"
+    config.write_text(
+        json.dumps({"backends": {"openai": {"default": {}}}, "ledger": {"path": path}})
+    )
+
+    class Client:
+        def prompt(self, prompt, stdin):
+            time.sleep(0.01)
+            return "answer"
+
+    monkeypatch.setenv("CLAI_CONFIG_CACHE", "")
+    monkeypatch.setattr(clai, "get_client", lambda **kwargs: Client())
+    monkeypatch.setattr(clai, "read_stdin", lambda: ["input"])
+    base = ["clai", "--config", str(config)]
+    for argv in (
+        base
+        + ["--backend", "openai", "--instance", "default", "--no-daemon"]
+        + ["--no-cache", "prompt", "p"],
+        base + ["stats", "--window", "1h"],
+    ):
+        monkeypatch.setattr(sys, "argv", argv)
+        with pytest.raises(SystemExit) as err:
+            clai.main()
+        assert err.value.code == 0
+
+    output = capsys.readouterr().out.splitlines()
+    assert output[0] == "answer"
+    report = json.loads(output[1])
+    assert (report["backend"], report["instance"], report["calls"]) == (
+        "openai",
+        "default",
+        1,
+    )
+    assert report["p50"] >= 0.01
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+
+INPUT_SIZE = 32 * 1024 * 1024
+
+# Building the request may hold the input at most twice: once as joined
+# blocks and once as the final payload.
+MAX_PEAK_RSS_RATIO = 2.5
+
+PROBE = """
+import resource
+from types import SimpleNamespace
+
+from clai.backend.openai import Client
+from clai.commands import run_command
+from clai.tools import read_stdin
+
+sizes = []
+
+
+class Responses:
+    def create(self, **request):
+        sizes.append(len(request["input"]))
+        return SimpleNamespace(output=[])
+
+
+client = Client(
+    token="token",
+    model="gpt-5.4",
+    max_tokens=10**12,
+    system="sys",
+    debug=False,
+    token_counting="approximate",
+)
+client.client = SimpleNamespace(responses=Responses())
+
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+run_command(client, "prompt", "prompt", read_stdin())
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print((after - before) * 1024, sizes[0])
+"""
+
+
+def test_prompt_with_large_stdin_has_bounded_peak_rss(tmp_path):
+    line = "2024-01-01T00:00:00Z INFO worker-3 request handled in 12 ms".ljust(99, ".")
+    input_path = tmp_path / "input.txt"
+    with open(input_path, "w") as input_fh:
+        for _ in range(INPUT_SIZE // 100):
+            input_fh.write(line + "\n")
+
+    with open(input_path) as input_fh:
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            stdin=input_fh,
+            capture_output=True,
+            text=True,
+            env=os.environ | {"PYTHONPATH": os.getcwd()},
+        )
+    peak_rss, payload_size = map(int, result.stdout.split())
+
+    assert payload_size == len("prompt\n") + (INPUT_SIZE // 100) * 100 - 1
+    assert peak_rss < MAX_PEAK_RSS_RATIO * INPUT_SIZE
@@ -0,0 +1,260 @@
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import clai
+from benchmarks.mock_server import MockAPI
+from clai import offload
+from clai.backend.openai import Client as OpenAIClient
+from clai.batch import ClientRegistry
+from clai.commands import NO_PROMPT
+from clai.offload import run_offloaded
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"label": {"enum": ["spam", "ham"]}},
+    "required": ["label"],
+    "additionalProperties": False,
+}
+
+
+@pytest.fixture
+def api():
+    with MockAPI() as api:
+        yield api
+
+
+def openai_client(api):
+    return OpenAIClient(
+        token="token",
+        model="gpt-5.4",
+        max_tokens=10000,
+        system="sys",
+        debug=False,
+        token_counting="approximate",
+        base_url=f"{api.url}/v1",
+    )
+
+
+def run(requests, clients, **kwargs):
+    return list(
+        run_offloaded(
+            requests,
+            clients,
+            backend="openai",
+            instance="default",
+            poll_interval=0.001,
+            max_poll_interval=0.01,
+            **kwargs,
+        )
+    )
+
+
+def test_results_are_returned_in_input_order(api, tmp_path):
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text(json.dumps(SCHEMA))
+    client = openai_client(api)
+    api.failing_requests = {"2"}
+
+    results = run(
+        [
+            {"prompt": "a", "id": "first"},
+            {"command": "bool", "prompt": "b"},
+            {"prompt": "c"},
+            {"prompt": ""},
+            {"command": "structured", "prompt": "d", "schema": str(schema_path)},
+        ],
+        ClientRegistry(lambda backend, instance: client),
+        batch_size=2,
+    )
+
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert results[0] == {
+        "index": 0,
+        "exit_code": 0,
+        "output": "hello",
+        "error": None,
+        "id": "first",
+    }
+    assert results[1]["exit_code"] == 0
+    assert json.loads(results[1]["output"])["answer"] is True
+    assert results[2]["exit_code"] == 1
+    assert "Mock failure" in results[2]["error"]
+    assert results[3]["output"] == "No prompt provided via argument or stdin."
+    assert json.loads(results[4]["output"]) == {"label": "spam"}
+    assert len(api.batches) == 2
+
+    # The batch input holds the same request bodies as synchronous requests.
+    batch = next(iter(api.batches.values()))
+    lines = [
+        json.loads(line) for line in api.files[batch["input_file_id"]].splitlines()
+    ]
+    assert lines[0]["url"] == "/v1/responses"
+    assert lines[0]["body"]["input"] == "a"
+    assert lines[1]["body"]["text"]["format"]["name"] == "true_false"
+
+
+def test_invalid_structured_response_fails_request(api, tmp_path):
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text(json.dumps(SCHEMA))
+    client = openai_client(api)
+    api.answer = lambda response_format: json.dumps({"label": "other"})
+
+    (result,) = run(
+        [{"command": "structured", "prompt": "d", "schema": str(schema_path)}],
+        ClientRegistry(lambda backend, instance: client),
+    )
+
+    assert result["exit_code"] == 1
+    assert "does not conform to the schema" in result["error"]
+
+
+def test_unsupported_backend_fails_requests():
+    clients = ClientRegistry(lambda backend, instance: SimpleNamespace())
+
+    (result,) = run([{"prompt": "a"}], clients)
+
+    assert result["error"].endswith(offload.NOT_SUPPORTED)
+
+
+def test_polls_back_off_until_terminal_status(monkeypatch, capsys):
+    statuses = iter(["in_progress", "in_progress", "in_progress", "expired"])
+    sleeps = []
+
+    class Client:
+        batch_endpoint = "/v1/responses"
+
+        def batch_request(self, command, prompt, stdin, schema=None, bool_mode=None):
+            return {"input": prompt}
+
+        def submit_batch(self, input_fh):
+            input_fh.seek(0)
+            assert len(input_fh.read().splitlines()) == 2
+            return "batch_1"
+
+        def get_batch(self, batch_id):
+            return offload.BatchJob(batch_id, next(statuses), 2, 0, 0, None, None)
+
+    monkeypatch.setattr(offload.time, "sleep", sleeps.append)
+    client = Client()
+
+    results = list(
+        run_offloaded(
+            [{"prompt": "a"}, {"prompt": "b"}],
+            ClientRegistry(lambda backend, instance: client),
+            backend="openai",
+            instance="default",
+            poll_interval=1,
+            max_poll_interval=3,
+        )
+    )
+
+    assert sleeps == [1, 2, 3]
+    assert all("batch_1` expired" in result["error"] for result in results)
+    reports = capsys.readouterr().err.splitlines()
+    assert [json.loads(line.removeprefix("Batch: "))["status"] for line in reports] == [
+        "in_progress",
+        "expired",
+    ]
+
+
+def test_results_are_yielded_before_later_batches_finish(monkeypatch):
+    class Client:
+        batch_endpoint = "/v1/responses"
+
+        def __init__(self):
+            self.batches = {}
+            self.released = False
+
+        def batch_request(self, command, prompt, stdin, schema=None, bool_mode=None):
+            return {"input": prompt}
+
+        def submit_batch(self, input_fh):
+            input_fh.seek(0)
+            batch_id = f"batch_{len(self.batches) + 1}"
+            self.batches[batch_id] = [json.loads(line) for line in input_fh]
+            return batch_id
+
+        def get_batch(self, batch_id):
+            done = batch_id == "batch_1" or self.released
+            status = "completed" if done else "in_progress"
+            output = batch_id if done else None
+            return offload.BatchJob(batch_id, status, 1, int(done), 0, output, None)
+
+        def read_batch_file(self, file_id):
+            for line in self.batches[file_id]:
+                body = {"output": line["body"]["input"]}
+                yield {
+                    "custom_id": line["custom_id"],
+                    "response": {"status_code": 200, "body": body},
+                }
+
+        def batch_result(self, command, body, schema, bool_mode):
+            return 0, body["output"]
+
+    monkeypatch.setattr(offload.time, "sleep", lambda seconds: None)
+    client = Client()
+    results = run_offloaded(
+        [{"prompt": "a"}, {"prompt": ""}, {"prompt": "b"}],
+        ClientRegistry(lambda backend, instance: client),
+        backend="openai",
+        instance="default",
+        batch_size=1,
+    )
+
+    assert [next(results)["output"] for _ in range(2)] == ["a", NO_PROMPT]
+    assert not client.released
+    client.released = True
+    assert [result["output"] for result in results] == ["b"]
+
+
+def test_map_offload_from_cli(api, monkeypatch, capsys, tmp_path):
+    config = tmp_path / "config.yaml"
+    config.write_text(
+        json.dumps(
+            {
+                "backends": {
+                    "openai": {
+                        "default": {
+                            "token": "token",
+                            "model": "gpt-5.4",
+                            "max_tokens": 10000,
+                            "system": "sys",
+                            "token_counting": "approximate",
+                            "base_url": f"{api.url}/v1",
+                        }
+                    }
+                }
+            }
+        )
+    )
+    monkeypatch.setenv("CLAI_CONFIG_CACHE", "")
+    monkeypatch.setattr(clai, "read_stdin", lambda: iter(["one\n", "two\n"]))
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "clai",
+            "--config",
+            str(config),
+            "--backend",
+            "openai",
+            "--instance",
+            "default",
+            "map",
+            "Classify",
+            "--offload",
+            "--poll-interval",
+            "0.001",
+        ],
+    )
+
+    with pytest.raises(SystemExit) as err:
+        clai.main()
+
+    assert err.value.code == 0
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [result["output"] for result in results] == ["hello", "hello"]
+    assert len(api.batches) == 1
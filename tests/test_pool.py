@@ -0,0 +1,215 @@
+import threading
+
+import pytest
+
+from clai.pool import InstancePool, Member
+from clai.tools import get_cache_namespace, get_client, get_pool_config
+
+
+class StatusError(Exception):
+    status_code = 503
+
+
+class FakeClient:
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+        self.max_tokens = 100
+        self.calls = 0
+
+    def retryable(self, err):
+        return isinstance(err, ConnectionError)
+
+    def prompt(self, prompt, stdin):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return f"{self.name}:{'|'.join(stdin())}"
+
+    def prompt_stream(self, prompt, stdin):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        yield from [self.name, "|".join(stdin())]
+
+
+def pool(*clients, weights=None, strategy="round_robin"):
+    weights = weights or [1] * len(clients)
+    return InstancePool(
+        name="eu",
+        members=[
+            Member(client.name, client, weight)
+            for client, weight in zip(clients, weights)
+        ],
+        strategy=strategy,
+    )
+
+
+def test_weighted_round_robin_spreads_requests_smoothly():
+    instances = pool(FakeClient("a"), FakeClient("b"), weights=[2, 1])
+
+    served = [instances.prompt("p", lambda: iter([])) for _ in range(6)]
+
+    assert served == ["a:", "b:", "a:", "a:", "b:", "a:"]
+
+
+def test_least_outstanding_prefers_idle_instance():
+    release = threading.Event()
+
+    class Slow(FakeClient):
+        def prompt(self, prompt, stdin):
+            release.wait()
+            return super().prompt(prompt, stdin)
+
+    instances = pool(Slow("a"), FakeClient("b"), strategy="least_outstanding")
+    thread = threading.Thread(target=instances.prompt, args=("p", lambda: iter([])))
+    thread.start()
+    while instances.outstanding[0] == 0:
+        pass
+
+    assert instances.prompt("p", lambda: iter([])) == "b:"
+    release.set()
+    thread.join()
+
+
+def test_failover_replays_stdin_on_next_instance():
+    failing = FakeClient("a", error=StatusError("unavailable"))
+    instances = pool(failing, FakeClient("b"))
+
+    assert instances.prompt("p", lambda: iter(["x", "y"])) == "b:x|y"
+    assert failing.calls == 1
+
+    instances = pool(failing, FakeClient("b"))
+    assert list(instances.prompt_stream("p", lambda: iter(["x"]))) == ["b", "x"]
+    assert failing.calls == 2
+
+
+def test_failover_replays_stdin_read_partially_by_the_failed_instance():
+    class PartialReader(FakeClient):
+        def prompt(self, prompt, stdin):
+            next(iter(stdin()))
+            raise StatusError("unavailable")
+
+    lines = [str(i) * 10 for i in range(10)]
+    consumed = []
+
+    def stdin():
+        for line in lines:
+            consumed.append(line)
+            yield line
+
+    instances = pool(PartialReader("a"), FakeClient("b"))
+
+    assert instances.prompt("p", stdin) == "b:" + "|".join(lines)
+    assert consumed == lines
+
+
+def test_structured_stream_fails_over_until_the_first_element():
+    class Structured(FakeClient):
+        def structured_stream(self, prompt, stdin, schema):
+            return self.prompt_stream(prompt, stdin)
+
+    failing = Structured("a", error=StatusError("unavailable"))
+    instances = pool(failing, Structured("b"))
+
+    stream = instances.structured_stream("p", lambda: iter(["x"]), "schema.json")
+    assert failing.calls == 1
+    assert list(stream) == ["b", "x"]
+
+    with pytest.raises(NotImplementedError):
+        pool(FakeClient("c")).structured_stream("p", lambda: iter([]), "schema.json")
+
+
+def test_async_failover_replays_stdin_on_next_instance():
+    import asyncio
+
+    class AsyncClient(FakeClient):
+        async def prompt_async(self, prompt, stdin):
+            return self.prompt(prompt, stdin)
+
+        async def prompt_stream_async(self, prompt, stdin):
+            for delta in self.prompt_stream(prompt, stdin):
+                yield delta
+
+    async def stream(instances):
+        return [delta async for delta in instances.prompt_stream_async("p", stdin)]
+
+    failing = AsyncClient("a", error=StatusError("unavailable"))
+    stdin = lambda: iter(["x", "y"])
+
+    instances = pool(failing, AsyncClient("b"))
+    assert asyncio.run(instances.prompt_async("p", stdin)) == "b:x|y"
+    instances = pool(failing, AsyncClient("b"))
+    assert asyncio.run(stream(instances)) == ["b", "x|y"]
+    assert failing.calls == 2
+
+
+def test_no_failover_on_local_errors_or_last_instance():
+    instances = pool(FakeClient("a", error=ValueError("too long")), FakeClient("b"))
+    with pytest.raises(ValueError):
+        instances.prompt("p", lambda: iter([]))
+
+    instances = pool(
+        FakeClient("a", error=ConnectionError("down")),
+        FakeClient("b", error=ConnectionError("down")),
+    )
+    with pytest.raises(ConnectionError):
+        instances.prompt("p", lambda: iter([]))
+
+
+def test_pool_delegates_attributes_to_first_instance():
+    assert pool(FakeClient("a")).max_tokens == 100
+
+    with pytest.raises(ValueError, match="strategy"):
+        pool(FakeClient("a"), strategy="random")
+
+
+CONFIG = {
+    "backends": {
+        "mistral": {
+            name: {
+                "token": "token",
+                "max_tokens": 100,
+                "model": "mistral-small-latest",
+                "system": "sys",
+            }
+            for name in ("westeurope", "francecentral")
+        }
+    },
+    "pools": {
+        "mistral": {
+            "eu": {
+                "strategy": "least_outstanding",
+                "instances": {"westeurope": 2, "francecentral": 1},
+            },
+            "all": {"instances": ["westeurope", "francecentral"]},
+            "broken": {"instances": ["northeurope"]},
+        }
+    },
+}
+
+
+def test_get_pool_config_validates_instances():
+    assert get_pool_config(CONFIG, "mistral", "pool:all") == (
+        "round_robin",
+        {"westeurope": 1, "francecentral": 1},
+    )
+    with pytest.raises(Exception, match="non-existing instance `northeurope`"):
+        get_pool_config(CONFIG, "mistral", "broken")
+    with pytest.raises(Exception, match="no pool configured named `us`"):
+        get_pool_config(CONFIG, "mistral", "us")
+
+
+def test_get_client_builds_pool_from_config():
+    client = get_client(CONFIG, "mistral", "pool:eu", debug=False)
+
+    assert isinstance(client, InstancePool)
+    assert client.strategy == "least_outstanding"
+    assert [(member.name, member.weight) for member in client.members] == [
+        ("westeurope", 2),
+        ("francecentral", 1),
+    ]
+    assert get_cache_namespace(CONFIG, "mistral", "pool:eu")["pool"] == [
+        get_cache_namespace(CONFIG, "mistral", "francecentral"),
+        get_cache_namespace(CONFIG, "mistral", "westeurope"),
+    ]
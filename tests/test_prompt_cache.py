@@ -0,0 +1,96 @@
+import pytest
+
+from benchmarks.mock_server import MockAPI
+from clai import timings
+from clai.backend.mistral import Client as MistralClient
+from clai.backend.openai import Client as OpenAIClient
+
+
+@pytest.fixture
+def api():
+    with MockAPI() as api:
+        yield api
+
+
+def openai_client(api, **kwargs):
+    return OpenAIClient(
+        token="token",
+        model="gpt-5.4",
+        max_tokens=10000,
+        system="You are a strict reviewer.",
+        token_counting="approximate",
+        base_url=f"{api.url}/v1",
+        **{"debug": False} | kwargs,
+    )
+
+
+def mistral_client(api, **kwargs):
+    return MistralClient(
+        token="token",
+        model="mistral-small-latest",
+        max_tokens=10000,
+        system="You are a strict reviewer.",
+        debug=False,
+        token_counting="approximate",
+        server_url=api.url,
+        **kwargs,
+    )
+
+
+def test_static_prefix_comes_first_and_shares_a_key(api):
+    client = openai_client(api)
+
+    first, _, _ = client._command_request("bool", "p1", lambda: iter(["a"]))
+    second, _, _ = client._command_request("bool", "p2", lambda: iter(["b"]))
+    plain, _, _ = client._command_request("prompt", "p1", lambda: iter(["a"]))
+
+    assert list(first)[-1] == "input"
+    assert first["instructions"] == second["instructions"]
+    assert first["prompt_cache_key"] == second["prompt_cache_key"]
+    assert first["prompt_cache_key"] != plain["prompt_cache_key"]
+
+
+def test_prompt_cache_key_can_be_configured(api):
+    fixed = openai_client(api, prompt_cache_key="reviews")
+    disabled = openai_client(api, prompt_cache_key=False)
+
+    request, _, _ = fixed._command_request("prompt", "p", lambda: iter([]))
+    assert request["prompt_cache_key"] == "reviews"
+    request, _, _ = disabled._command_request("prompt", "p", lambda: iter([]))
+    assert "prompt_cache_key" not in request
+
+
+def test_mistral_requests_share_a_prompt_cache_key(api):
+    client = mistral_client(api)
+    fixed = mistral_client(api, prompt_cache_key="reviews")
+
+    first, _ = client._bool_request("p1", lambda: iter(["a"]), "reason")
+    second, _ = client._bool_request("p2", lambda: iter(["b"]), "reason")
+    plain, _ = client._build_request(client.system, "p1", lambda: iter(["a"]))
+
+    assert first["prompt_cache_key"] == second["prompt_cache_key"]
+    assert first["prompt_cache_key"] != plain["prompt_cache_key"]
+    request, _ = fixed._build_request(fixed.system, "p", lambda: iter([]))
+    assert request["prompt_cache_key"] == "reviews"
+
+    client.prompt("p", lambda: iter(["a"]))
+    assert api.requests[-1]["prompt_cache_key"] == plain["prompt_cache_key"]
+
+
+def test_cached_tokens_are_reported(api, monkeypatch, capsys):
+    recorder = timings.Timings()
+    monkeypatch.setattr(timings, "TIMINGS", recorder)
+    stdin = lambda: iter(["input"])
+    mistral = mistral_client(api)
+
+    for _ in range(2):
+        openai_client(api).bool_prompt(prompt="p", stdin=stdin)
+        mistral.bool_prompt(prompt="p", stdin=stdin)
+
+    assert api.requests[0]["prompt_cache_key"]
+    assert recorder.summary()["usage"]["cached_tokens"] > 0
+
+    # Debug output reports the usage, also without `--timings`.
+    monkeypatch.setattr(timings, "TIMINGS", None)
+    openai_client(api, debug=True).prompt(prompt="p", stdin=stdin)
+    assert "'cached_tokens': " in capsys.readouterr().out
@@ -0,0 +1,206 @@
+from types import SimpleNamespace
+
+import pytest
+
+from clai.backend import ratelimit
+from clai.backend.openai import Client as OpenAIClient
+from clai.backend.ratelimit import (
+    RateLimiter,
+    RetrySettings,
+    TokenBucket,
+    get_retry_after,
+    get_retry_settings,
+    is_retryable,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=0.0, sleeps=[])
+
+    def sleep(seconds):
+        clock.sleeps.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: clock.now)
+    monkeypatch.setattr(ratelimit.time, "sleep", sleep)
+
+    return clock
+
+
+def limiter(**kwargs):
+    return RateLimiter(
+        rpm=kwargs.pop("rpm", None),
+        tpm=kwargs.pop("tpm", None),
+        retry=RetrySettings(**kwargs),
+        retryable=is_retryable,
+    )
+
+
+def failing(*errors, result="ok"):
+    errors = list(errors)
+
+    def send():
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    return send
+
+
+def test_token_bucket_reserves_and_refills(clock):
+    bucket = TokenBucket(60)
+
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(30) == 30
+    clock.now += 30
+    assert bucket.reserve(1) == pytest.approx(1)
+
+
+def test_token_bucket_caps_requests_exceeding_capacity(clock):
+    bucket = TokenBucket(10)
+
+    assert bucket.reserve(1000) == 0
+    assert bucket.reserve(10) == 60
+
+
+def test_limiter_throttles_on_rpm_and_tpm(clock):
+    rate_limiter = limiter(rpm=2, tpm=100)
+
+    for _ in range(3):
+        rate_limiter.call(lambda: None, tokens=40)
+
+    # The request bucket (30s) is further behind than the token bucket (12s).
+    assert clock.sleeps == [pytest.approx(30)]
+    assert rate_limiter.counters["throttled"] == 1
+
+
+def test_retry_honors_retry_after(clock):
+    rate_limiter = limiter()
+    send = failing(
+        StatusError(429, {"retry-after": "2"}),
+        StatusError(503, {"retry-after-ms": "250"}),
+    )
+
+    assert rate_limiter.call(send) == "ok"
+    assert clock.sleeps == [2, 0.25]
+    assert rate_limiter.counters["retries"] == 2
+
+
+def test_retry_after_is_not_capped_by_max_backoff(clock):
+    rate_limiter = limiter(max_backoff=1, max_retry_after=60)
+
+    assert rate_limiter.call(failing(StatusError(429, {"retry-after": "45"}))) == "ok"
+    assert clock.sleeps == [45]
+
+    with pytest.raises(Exception, match="retry after 120 seconds") as err:
+        rate_limiter.call(failing(StatusError(429, {"retry-after": "120"})))
+    assert isinstance(err.value.__cause__, StatusError)
+    assert clock.sleeps == [45]
+
+
+def test_retry_uses_jittered_exponential_backoff(clock):
+    rate_limiter = limiter(initial_backoff=1, max_backoff=3)
+
+    rate_limiter.call(failing(*[ConnectionError()] * 3))
+
+    assert len(clock.sleeps) == 3
+    assert all(0 <= sleep <= bound for sleep, bound in zip(clock.sleeps, [1, 2, 3]))
+
+
+def test_retry_gives_up_after_max_retries_and_on_client_errors(clock):
+    with pytest.raises(StatusError, match="500"):
+        limiter(max_retries=1).call(failing(StatusError(500), StatusError(500)))
+
+    with pytest.raises(StatusError, match="400"):
+        limiter().call(failing(StatusError(400)))
+    assert len(clock.sleeps) == 1
+
+
+def test_retry_budget_limits_retries(clock):
+    rate_limiter = limiter(budget_min=1, budget_ratio=0)
+
+    rate_limiter.call(failing(StatusError(429)))
+    with pytest.raises(StatusError):
+        rate_limiter.call(failing(StatusError(429)))
+
+    assert rate_limiter.counters["retries"] == 1
+
+
+def test_async_calls_retry_without_blocking(clock, monkeypatch):
+    import asyncio
+
+    async def sleep(seconds):
+        clock.sleeps.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    errors = [StatusError(429, {"retry-after": "2"})]
+
+    async def send():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert asyncio.run(limiter().call_async(send)) == "ok"
+    assert clock.sleeps == [2]
+
+    rate_limiter = limiter(rpm=1)
+    asyncio.run(rate_limiter.call_async(send))
+    asyncio.run(rate_limiter.call_async(send))
+    assert clock.sleeps == [2, pytest.approx(60)]
+    assert rate_limiter.counters["throttled"] == 1
+
+
+def test_get_retry_after_parses_http_dates():
+    assert get_retry_after(StatusError(429, {"retry-after": "soon"})) is None
+    assert get_retry_after(ConnectionError()) is None
+    assert (
+        get_retry_after(
+            StatusError(429, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        )
+        == 0
+    )
+
+
+def test_retry_settings_reject_unknown_parameters():
+    with pytest.raises(ValueError, match="Unknown retry parameter `attempts`"):
+        get_retry_settings({"attempts": 3})
+
+
+def test_openai_client_retries_throttled_requests(clock):
+    calls = []
+
+    def create(**request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise StatusError(429, {"retry-after": "1"})
+        return SimpleNamespace(output=[])
+
+    client = OpenAIClient(
+        token="token",
+        model="gpt-5.4",
+        max_tokens=100,
+        system="sys",
+        debug=False,
+        token_counting="approximate",
+        tpm=1000,
+    )
+    client.client = SimpleNamespace(responses=SimpleNamespace(create=create))
+
+    client.prompt("hi", lambda: iter([]))
+
+    assert len(calls) == 2
+    assert client.limiter.counters == {
+        "requests": 1,
+        "retries": 1,
+        "throttled": 0,
+        "waited": 1,
+    }
@@ -0,0 +1,138 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.mock_server import MockAPI
+from clai import schema as schema_module
+from clai.backend.openai import Client as OpenAIClient
+from clai.schema import get_validator, load_schema, validate_structured_response
+from clai.tools import validate_bool_response
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"name": {"type": "string"}},
+    "required": ["name"],
+    "additionalProperties": False,
+}
+
+
+@pytest.fixture
+def schema_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAI_SCHEMA_CACHE", str(tmp_path / "schemas"))
+    monkeypatch.setattr(schema_module, "_schemas", {})
+    monkeypatch.setattr(schema_module, "_validators", {})
+    path = tmp_path / "schema.json"
+    path.write_text(json.dumps(SCHEMA))
+    return path
+
+
+def test_schema_is_read_again_only_after_change(schema_path):
+    schema = load_schema(str(schema_path))
+
+    assert load_schema(str(schema_path)) is schema
+
+    schema_path.write_text(json.dumps(SCHEMA | {"required": []}))
+    os.utime(schema_path, ns=(0, 0))
+    changed = load_schema(str(schema_path))
+
+    assert changed.schema["required"] == []
+    assert changed.digest != schema.digest
+
+
+def test_edited_schemas_replace_their_cache_entries(schema_path, monkeypatch):
+    monkeypatch.setattr(schema_module, "MAX_VALIDATORS", 2)
+    validators = []
+    for required in ([], ["name"], [], ["name"]):
+        schema_path.write_text(json.dumps(SCHEMA | {"required": required}))
+        os.utime(schema_path, ns=(len(validators), len(validators)))
+        validators.append(get_validator(load_schema(str(schema_path))))
+
+    assert len(schema_module._schemas) == 1
+    assert list(schema_module._validators.values()) == validators[:2]
+    assert validators[2] is validators[0]
+
+    for required in (["a"], ["b"]):
+        schema_path.write_text(json.dumps(SCHEMA | {"required": required}))
+        os.utime(schema_path, ns=(len(validators), len(validators)))
+        validators.append(get_validator(load_schema(str(schema_path))))
+
+    assert len(schema_module._validators) == 2
+
+
+def test_schema_is_checked_once_across_runs(schema_path, monkeypatch):
+    schema = load_schema(str(schema_path))
+    validator = get_validator(schema)
+
+    assert get_validator(schema) is validator
+
+    # A new process finds the marker of the checked schema.
+    monkeypatch.setattr(schema_module, "_validators", {})
+    monkeypatch.setattr(
+        type(validator),
+        "check_schema",
+        classmethod(lambda cls, schema: pytest.fail("schema checked again")),
+    )
+    get_validator(schema)
+
+
+def test_oldest_check_markers_are_pruned(schema_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(schema_module, "MAX_CHECKED", 2)
+    for index, required in enumerate(([], ["name"], ["a"])):
+        schema_path.write_text(json.dumps(SCHEMA | {"required": required}))
+        os.utime(schema_path, ns=(index, index))
+        digest = load_schema(str(schema_path)).digest
+        get_validator(load_schema(str(schema_path)))
+        os.utime(tmp_path / "schemas" / digest, ns=(index, index))
+
+    assert len(os.listdir(tmp_path / "schemas")) == 2
+    assert digest in os.listdir(tmp_path / "schemas")
+
+
+def test_invalid_schema_is_rejected(schema_path):
+    from jsonschema.exceptions import SchemaError
+
+    schema_path.write_text(json.dumps({"type": "nonsense"}))
+
+    with pytest.raises(SchemaError):
+        get_validator(load_schema(str(schema_path)))
+
+
+def test_structured_responses_are_validated(schema_path):
+    schema = load_schema(str(schema_path))
+
+    validate_structured_response('{"name": "clai"}', schema)
+    with pytest.raises(Exception, match="does not conform to the schema"):
+        validate_structured_response('{"name": 1}', schema)
+    with pytest.raises(Exception, match="not valid JSON"):
+        validate_structured_response("{", schema)
+
+
+def test_bool_responses_are_validated():
+    assert validate_bool_response('{"answer": true, "reason": "r"}')["answer"]
+
+    with pytest.raises(SystemExit) as err:
+        validate_bool_response('{"answer": "yes", "reason": "r"}')
+    assert err.value.code == 3
+
+
+def test_openai_structured_validates_response(schema_path):
+    with MockAPI() as api:
+        client = OpenAIClient(
+            token="token",
+            model="gpt-5.4",
+            max_tokens=10000,
+            system="sys",
+            debug=False,
+            token_counting="approximate",
+            base_url=f"{api.url}/v1",
+        )
+        stdin = lambda: iter(["input"])
+
+        assert json.loads(
+            client.structured(prompt="p", stdin=stdin, schema=str(schema_path))
+        ) == {"name": "mock"}
+
+        api.answer = lambda response_format: json.dumps({"other": True})
+        with pytest.raises(Exception, match="does not conform to the schema"):
+            client.structured(prompt="p", stdin=stdin, schema=str(schema_path))
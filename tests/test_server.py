@@ -0,0 +1,205 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from clai.batch import ClientRegistry
+from clai import server
+from clai.server import (
+    ConfigState,
+    Daemon,
+    create_server,
+    forward,
+    get_forwarded_environ,
+)
+from clai.tools import get_backend_instance_config
+
+
+class FakeClient:
+    def prompt(self, prompt, stdin):
+        return f"{prompt}:{'|'.join(stdin())}"
+
+    def prompt_stream(self, prompt, stdin):
+        yield from [prompt, "|".join(stdin())]
+        if prompt == "exit":
+            raise SystemExit(4)
+
+    def bool_prompt(self, prompt, stdin):
+        if prompt == "fail":
+            raise Exception("backend unavailable")
+        return 1, '{"answer":false,"reason":"x"}'
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    config_path = str(tmp_path / "config.yaml")
+    with open(config_path, "w") as config_fh:
+        config_fh.write("backends: {}\n")
+
+    daemon = Daemon()
+    created = []
+
+    def factory(backend, instance):
+        created.append((backend, instance))
+        return FakeClient()
+
+    daemon.states[config_path] = ConfigState(
+        mtime=os.stat(config_path).st_mtime_ns,
+        config={},
+        clients=ClientRegistry(factory),
+        cache=None,
+    )
+    socket_path = str(tmp_path / "daemon.sock")
+    server = create_server(daemon, socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield socket_path, config_path, created
+
+    server.shutdown()
+    server.server_close()
+
+
+def request(config_path, command="prompt", prompt="hi", **kwargs):
+    return {
+        "config": config_path,
+        "backend": "openai",
+        "instance": "default",
+        "command": command,
+        "prompt": prompt,
+    } | kwargs
+
+
+def test_config_is_resolved_in_the_environment_of_the_client(monkeypatch, tmp_path):
+    config_path = str(tmp_path / "config.yaml")
+    with open(config_path, "w") as config_fh:
+        config_fh.write(
+            "backends: {openai: {default: {token: '${{CLAI_TEST_TOKEN}}'}}}\n"
+        )
+    monkeypatch.setenv("CLAI_TEST_TOKEN", "daemon")
+    monkeypatch.setenv("CLAI_CONFIG_CACHE", "")
+    monkeypatch.setattr(
+        server,
+        "get_client",
+        lambda config, backend, instance, debug, environ=None: (
+            get_backend_instance_config(config, backend, instance, environ).token
+        ),
+    )
+    daemon = Daemon()
+    cache_dir = tmp_path / "config-cache"
+
+    def token(environ):
+        return daemon.client(request(config_path, environ=environ))
+
+    caller = {"CLAI_TEST_TOKEN": "caller", "CLAI_CONFIG_CACHE": str(cache_dir)}
+    assert token(caller) == "caller"
+    assert token({"CLAI_TEST_TOKEN": "daemon"}) == "daemon"
+    assert token(caller | {"OTHER": "x"}) == "caller"
+    assert len(daemon.registries) == 1
+    assert len(os.listdir(cache_dir)) == 1
+    with pytest.raises(Exception, match="CLAI_TEST_TOKEN"):
+        token({})
+
+
+def test_forward_without_daemon_returns_none(tmp_path):
+    assert forward(str(tmp_path / "missing.sock"), {}, []) is None
+
+
+def test_forward_reuses_warm_client(daemon):
+    socket_path, config_path, created = daemon
+
+    assert forward(socket_path, request(config_path), ["a", "b"]) == (0, "hi:a|b")
+    assert forward(socket_path, request(config_path), []) == (0, "hi:")
+    assert created == [("openai", "default")]
+    assert os.stat(socket_path).st_mode & 0o777 == 0o600
+
+
+def test_forward_streams_chunks(daemon):
+    socket_path, config_path, _ = daemon
+
+    exit_code, chunks = forward(
+        socket_path, request(config_path, stream=True), ["a", "b"]
+    )
+
+    assert exit_code is None
+    assert list(chunks) == ["hi", "a|b"]
+    assert chunks.exit_code == 0
+
+    _, chunks = forward(
+        socket_path, request(config_path, prompt="exit", stream=True), []
+    )
+    assert list(chunks) == ["exit", ""]
+    assert chunks.exit_code == 4
+
+
+def test_forward_only_to_sockets_of_the_current_user(daemon, monkeypatch):
+    socket_path, config_path, _ = daemon
+    monkeypatch.setattr(server.os, "getuid", lambda: os.stat(socket_path).st_uid + 1)
+
+    assert forward(socket_path, request(config_path), []) is None
+
+
+def test_only_the_referenced_variables_are_forwarded(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "backends: {openai: {default: {token: '${{OPENAI_TOKEN}}', model: m}}}\n"
+    )
+    environ = {"OPENAI_TOKEN": "t", "CLAI_CONFIG_CACHE": "c", "AWS_SECRET": "s"}
+
+    assert get_forwarded_environ(str(config_path), environ) == {
+        "CLAI_CONFIG_CACHE": "c",
+        "OPENAI_TOKEN": "t",
+    }
+
+
+def test_forward_returns_exit_code_and_raises_errors(daemon):
+    socket_path, config_path, _ = daemon
+
+    assert forward(socket_path, request(config_path, command="bool"), []) == (
+        1,
+        '{"answer":false,"reason":"x"}',
+    )
+    with pytest.raises(Exception, match="backend unavailable"):
+        forward(socket_path, request(config_path, command="bool", prompt="fail"), [])
+
+
+def test_forward_drains_unread_stdin_on_error(daemon):
+    socket_path, config_path, _ = daemon
+    lines = ("x" * 100 for _ in range(100_000))
+
+    with pytest.raises(Exception, match="Unknown command"):
+        forward(socket_path, request(config_path, command="unknown"), lines)
+
+
+def test_cli_forwards_to_daemon(daemon):
+    socket_path, config_path, _ = daemon
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, clai; sys.argv = sys.argv[1:]\n"
+            "try:\n    clai.main()\n"
+            "finally:\n    print('yaml' in sys.modules, file=sys.stderr)",
+            "clai",
+            "--config",
+            config_path,
+            "--backend",
+            "openai",
+            "--instance",
+            "default",
+            "--socket",
+            socket_path,
+            "prompt",
+            "hi",
+        ],
+        capture_output=True,
+        text=True,
+        input="a\nb\n",
+        env=os.environ | {"PYTHONPATH": os.getcwd()},
+    )
+
+    assert result.stdout.strip() == "hi:a|b"
+    assert result.stderr.strip() == "False"
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+# Cumulative `python -X importtime` budget for `import clai` in microseconds.
+IMPORT_TIME_BUDGET_US = 100_000
+
+HEAVY_MODULES = (
+    "concurrent.futures",
+    "jsonschema",
+    "mistral_common",
+    "mistralai",
+    "openai",
+    "sqlite3",
+    "tiktoken",
+    "yaml",
+)
+
+
+def run_python(*args):
+    return subprocess.run(
+        [sys.executable, *args],
+        capture_output=True,
+        text=True,
+        env=os.environ | {"PYTHONPATH": os.getcwd()},
+    )
+
+
+def loaded_heavy_modules(code):
+    result = run_python(
+        "-c",
+        f"import sys\ntry:\n    {code}\nfinally:\n"
+        f"    print('loaded:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))",
+    )
+
+    return result.stdout.strip().splitlines()[-1].removeprefix("loaded:")
+
+
+def test_import_does_not_load_heavy_dependencies():
+    assert loaded_heavy_modules("import clai") == ""
+
+
+def test_help_does_not_load_heavy_dependencies():
+    code = "import clai; sys.argv = ['clai', '--config', 'x', '--backend', 'openai', '--instance', 'x', '--help']; clai.main()"
+
+    assert loaded_heavy_modules(code) == ""
+
+
+def test_import_time_budget():
+    def import_time():
+        result = run_python("-X", "importtime", "-c", "import clai")
+        for line in result.stderr.splitlines():
+            _, _, cumulative, name = (
+                part.strip() for part in line.replace(":", "|").split("|")
+            )
+            if name == "clai":
+                return int(cumulative)
+
+    assert min(import_time() for _ in range(3)) < IMPORT_TIME_BUDGET_US
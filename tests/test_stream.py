@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+import clai
+from clai.backend.azure_openai import Client as AzureOpenAIClient
+from clai.backend.mistral import Client as MistralClient
+from clai.backend.openai import Client as OpenAIClient
+from clai.cache import CachedClient, ResponseCache
+
+
+class FakeStream:
+    def __init__(self, events):
+        self.events = events
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.closed = True
+
+    def __iter__(self):
+        return iter(self.events)
+
+
+class FakeResponses:
+    def __init__(self):
+        self.requests = []
+
+    def create(self, stream=False, **request):
+        self.requests.append(request)
+        return FakeStream(
+            [
+                SimpleNamespace(type="response.created"),
+                SimpleNamespace(type="response.output_text.delta", delta="hel"),
+                SimpleNamespace(type="response.output_text.delta", delta="lo"),
+                SimpleNamespace(type="response.completed"),
+            ]
+        )
+
+
+def test_openai_prompt_stream_yields_text_deltas():
+    client = OpenAIClient(
+        token="token",
+        model="gpt-5.4",
+        max_tokens=100,
+        system="sys",
+        debug=False,
+        token_counting="off",
+    )
+    client.client = SimpleNamespace(responses=FakeResponses())
+
+    assert list(client.prompt_stream("hi", lambda: iter(["a"]))) == ["hel", "lo"]
+    assert client.client.responses.requests[0]["input"] == "hi\na"
+
+
+def test_azure_openai_prompt_stream_targets_deployment():
+    client = AzureOpenAIClient(
+        endpoint="https://test.openai.azure.com",
+        deployment="my-deployment",
+        token="token",
+        model="gpt-5.4",
+        max_tokens=100,
+        system="sys",
+        debug=False,
+        token_counting="off",
+    )
+    client.client = SimpleNamespace(responses=FakeResponses())
+
+    assert "".join(client.prompt_stream("hi", lambda: iter([]))) == "hello"
+    assert client.client.responses.requests[0]["model"] == "my-deployment"
+
+
+def test_mistral_prompt_stream_yields_content_deltas():
+    def event(content):
+        delta = SimpleNamespace(content=content)
+        return SimpleNamespace(
+            data=SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+        )
+
+    client = MistralClient(
+        token="token",
+        model="mistral-small-latest",
+        max_tokens=100,
+        system="sys",
+        debug=False,
+    )
+    client.client = SimpleNamespace(
+        chat=SimpleNamespace(
+            stream=lambda **kwargs: FakeStream([event("hel"), event(None), event("lo")])
+        )
+    )
+
+    assert list(client.prompt_stream("hi", lambda: iter([]))) == ["hel", "lo"]
+
+
+def test_cached_client_prompt_stream_stores_full_response(tmp_path):
+    class Streaming:
+        def prompt_stream(self, prompt, stdin):
+            yield from ["hel", "lo"]
+
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    namespace = {"backend": "openai"}
+    client = CachedClient(factory=Streaming, cache=cache, namespace=namespace)
+    assert list(client.prompt_stream("hi", lambda: iter([]))) == ["hel", "lo"]
+
+    client = CachedClient(factory=lambda: None, cache=cache, namespace=namespace)
+    assert list(client.prompt_stream("hi", lambda: iter([]))) == ["hello"]
+    assert client.prompt("hi", lambda: iter([])) == "hello"
+
+
+def test_write_stream_flushes_every_chunk(monkeypatch):
+    writes = []
+    monkeypatch.setattr(
+        clai.sys,
+        "stdout",
+        SimpleNamespace(write=writes.append, flush=lambda: writes.append(None)),
+    )
+
+    clai.write_stream(iter(["hel", "lo"]))
+
+    assert writes == ["hel", None, "lo", None, "\n", None]
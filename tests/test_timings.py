@@ -0,0 +1,167 @@
+import json
+import sys
+import threading
+
+import pytest
+
+import clai
+from benchmarks.mock_server import MockAPI
+from clai import timings
+from clai.backend.mistral import Client as MistralClient
+from clai.backend.openai import Client as OpenAIClient
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    recorder = timings.Timings()
+    monkeypatch.setattr(timings, "TIMINGS", recorder)
+    return recorder
+
+
+def test_phases_are_not_recorded_unless_enabled(monkeypatch):
+    monkeypatch.setattr(timings, "TIMINGS", None)
+
+    with timings.phase("network"):
+        pass
+    timings.add_usage({"input_tokens": 1})
+    timings.mark_first_token()
+
+    assert not timings.enabled()
+
+
+def test_summary_adds_up_phases_in_order(recorder):
+    def request():
+        with timings.phase("network"):
+            pass
+
+    with timings.phase("parsing"):
+        pass
+    threads = [threading.Thread(target=request) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with timings.phase("config"):
+        pass
+    timings.add_usage({"input_tokens": 3, "output_tokens": 1})
+    timings.add_usage({"input_tokens": 2, "output_tokens": 4})
+
+    summary = recorder.summary()
+
+    assert list(summary["phases"]) == ["config", "network", "parsing"]
+    assert summary["phases"]["network"]["count"] == 3
+    assert summary["ttft_ms"] is None
+    assert summary["usage"] == {"input_tokens": 5, "output_tokens": 5}
+
+
+def test_trace_uses_chrome_trace_event_format(recorder, tmp_path):
+    with timings.phase("network"):
+        timings.mark_first_token()
+        timings.mark_first_token()
+
+    timings.write_trace(str(tmp_path / "trace.json"))
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+
+    assert [event["ph"] for event in events] == ["X", "i"]
+    assert events[0]["name"] == "network"
+    assert events[0]["dur"] >= 0
+    assert events[1]["ts"] >= events[0]["ts"]
+    assert recorder.summary()["ttft_ms"] >= 0
+
+
+def test_clients_record_phases_and_usage(recorder):
+    stdin = lambda: iter(["input"])
+    with MockAPI() as api:
+        openai = OpenAIClient(
+            token="token",
+            model="gpt-5.4",
+            max_tokens=10000,
+            system="sys",
+            debug=False,
+            token_counting="approximate",
+            base_url=f"{api.url}/v1",
+        )
+        mistral = MistralClient(
+            token="token",
+            model="mistral-small-latest",
+            max_tokens=10000,
+            system="sys",
+            debug=False,
+            token_counting="approximate",
+            server_url=api.url,
+        )
+        openai.bool_prompt(prompt="p", stdin=stdin)
+        list(openai.prompt_stream(prompt="p", stdin=stdin))
+        list(mistral.prompt_stream(prompt="p", stdin=stdin))
+
+    summary = recorder.summary()
+
+    assert set(summary["phases"]) == {
+        "imports",
+        "tokenization",
+        "network",
+        "streaming",
+        "parsing",
+    }
+    assert summary["phases"]["network"]["count"] == 3
+    assert summary["phases"]["streaming"]["count"] == 2
+    assert summary["usage"]["total_tokens"] > 0
+    assert summary["usage"]["output_tokens"] > 0
+
+
+def test_timings_are_written_to_stderr_only(monkeypatch, capsys, tmp_path):
+    monkeypatch.setattr(timings, "TIMINGS", None)
+    config = tmp_path / "config.yaml"
+    config.write_text(
+        json.dumps(
+            {
+                "backends": {
+                    "openai": {
+                        "default": {
+                            "token": "token",
+                            "model": "gpt-5.4",
+                            "max_tokens": 10000,
+                            "system": "sys",
+                            "token_counting": "approximate",
+                        }
+                    }
+                }
+            }
+        )
+    )
+    monkeypatch.setattr(
+        clai,
+        "run_command",
+        lambda **kwargs: (0, iter(["hello", " world"])),
+    )
+    monkeypatch.setattr(clai, "read_stdin", lambda: iter([]))
+    monkeypatch.setenv("CLAI_TIMINGS", "1")
+    monkeypatch.setenv("CLAI_CONFIG_CACHE", str(tmp_path / "cache"))
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "clai",
+            "--config",
+            str(config),
+            "--backend",
+            "openai",
+            "--instance",
+            "default",
+            "--timings-trace",
+            str(tmp_path / "trace.json"),
+            "prompt",
+            "hi",
+            "--stream",
+        ],
+    )
+
+    with pytest.raises(SystemExit):
+        clai.main()
+
+    captured = capsys.readouterr()
+    assert captured.out == "hello world\n"
+    label, _, summary = captured.err.strip().partition(" ")
+    assert label == "Timings:"
+    assert "config" in json.loads(summary)["phases"]
+    assert json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
@@ -0,0 +1,145 @@
+import os
+
+import pytest
+
+from clai.backend import (
+    BaseBackend,
+    BaseValidateTokenLength,
+    TokenCount,
+    approximate_token_count,
+)
+from clai.backend.mistral import tools as mistral_tools
+from clai.backend.openai import tools as openai_tools
+
+SAMPLES = [
+    "",
+    "Mixing pigments black and white yields grey.",
+    "2024-01-01T00:00:00Z ERROR [worker-3] connection reset by peer",
+    "Grüße aus Köln, ça va? 日本語のテキスト 🚀🚀",
+]
+
+
+def test_approximate_token_count_is_utf8_length():
+    assert approximate_token_count("abc") == 3
+    assert approximate_token_count("é") == 2
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+def test_mistral_approximate_count_is_upper_bound(sample):
+    exact = mistral_tools.ValidateTokenLength(model="m", max_tokens=10)
+    approximate = mistral_tools.ValidateTokenLength(
+        model="m", max_tokens=10, token_counting="approximate"
+    )
+
+    assert approximate.count(sample) >= exact.count(sample)
+
+
+def test_openai_approximate_and_off_do_not_load_tokenizer(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("tokenizer loaded")
+
+    monkeypatch.setattr(openai_tools, "get_tokenizer", fail)
+
+    approximate = openai_tools.ValidateTokenLength(
+        model="gpt-5.4", max_tokens=10, token_counting="approximate"
+    )
+    approximate.add("a" * 10)
+    with pytest.raises(Exception, match="exceeds"):
+        approximate.add("a")
+
+    off = openai_tools.ValidateTokenLength(
+        model="gpt-5.4", max_tokens=10, token_counting="off"
+    )
+    off.add("a" * 1000)
+    assert off.total_tokens == 0
+
+
+def test_openai_tokenizer_uses_cache_dir(monkeypatch, tmp_path):
+    monkeypatch.delenv("TIKTOKEN_CACHE_DIR", raising=False)
+    monkeypatch.setattr(openai_tools, "_encoding_for_model", lambda model: model)
+
+    assert openai_tools.get_tokenizer("gpt-5.4", cache_dir=str(tmp_path)) == "gpt-5.4"
+    assert os.environ["TIKTOKEN_CACHE_DIR"] == str(tmp_path)
+
+
+def test_openai_tokenizer_load_failure_suggests_offline_options(monkeypatch):
+    def offline(model):
+        raise ConnectionError("network unreachable")
+
+    monkeypatch.setattr(openai_tools, "_encoding_for_model", offline)
+
+    with pytest.raises(Exception, match="token_counting"):
+        openai_tools.get_tokenizer("gpt-5.4")
+
+
+def test_base_backend_rejects_invalid_token_counting():
+    with pytest.raises(ValueError, match="Token counting"):
+        BaseBackend(
+            token="token",
+            model="gpt-5.4",
+            max_tokens=1000,
+            debug=False,
+            token_counting="fast",
+        )
+
+
+class RecordingValidator(BaseValidateTokenLength):
+    def __init__(self, max_tokens):
+        super().__init__(max_tokens=max_tokens)
+        self.batches = []
+
+    def count_exact(self, batch):
+        self.batches.append(len(batch))
+        return sum(len(data.split()) for data in batch)
+
+    def max_token_bytes(self):
+        return 8
+
+
+def test_add_many_rejects_input_from_lower_bound_without_tokenizing():
+    vtl = RecordingValidator(max_tokens=100)
+
+    with pytest.raises(Exception, match="exceeds"):
+        vtl.add_many("x" * 1000 for _ in range(10_000))
+
+    assert vtl.batches == []
+
+
+def test_add_many_tokenizes_in_batches_and_stops_early():
+    consumed = []
+
+    def lines():
+        for i in range(100_000):
+            consumed.append(i)
+            yield "word " * 20
+
+    vtl = RecordingValidator(max_tokens=300_000)
+    with pytest.raises(Exception, match="exceeds"):
+        vtl.add_many(lines())
+
+    assert len(vtl.batches) == 1
+    assert len(consumed) < 100_000
+
+
+def test_add_many_returns_joined_blocks_and_token_count():
+    vtl = RecordingValidator(max_tokens=100)
+
+    assert vtl.add_many(["a b", "c"]) == ["a b\nc"]
+    assert vtl.result() == TokenCount(total=3, token_counting="exact")
+    assert vtl.batches == [2]
+
+
+def test_mistral_build_messages_returns_token_count():
+    messages, token_count = mistral_tools.build_messages(
+        max_tokens=1000,
+        model="mistral-small-latest",
+        system="sys",
+        prompts=["prompt"],
+        stdin=lambda: iter(["black and white"]),
+    )
+
+    assert messages[-1]["content"] == "black and white"
+    assert token_count.total == sum(
+        mistral_tools.get_token_length(data)
+        for data in ("sys", "prompt", "black and white")
+    )
@@ -0,0 +1,74 @@
+import importlib.util
+
+import pytest
+
+from clai.backend.mistral import Client as MistralClient
+from clai.backend.openai import Client as OpenAIClient
+from clai.backend.transport import (
+    TransportSettings,
+    get_http_client,
+    get_transport_settings,
+)
+
+
+def openai_client(**kwargs):
+    return OpenAIClient(
+        token="token",
+        model="gpt-5.4",
+        max_tokens=100,
+        system="sys",
+        debug=False,
+        **kwargs,
+    )
+
+
+def test_transport_settings_defaults_and_validation():
+    assert get_transport_settings(None) == TransportSettings()
+    assert get_transport_settings({"http2": True}).http2 is True
+
+    with pytest.raises(ValueError, match="Unknown transport parameter `pool`"):
+        get_transport_settings({"pool": 1})
+
+
+def test_http_client_is_shared_per_endpoint_and_settings():
+    settings = TransportSettings(max_connections=7)
+    client = get_http_client("https://a.example", settings)
+
+    assert get_http_client("https://a.example", settings) is client
+    assert get_http_client("https://b.example", settings) is not client
+    assert get_http_client("https://a.example", TransportSettings()) is not client
+
+
+def test_clients_of_same_endpoint_share_connection_pool():
+    first = openai_client(transport={"read_timeout": 30})
+    second = openai_client(token_counting="off", transport={"read_timeout": 30})
+
+    assert first.client._client is second.client._client
+    assert first.client.timeout.read == 30
+    assert first.client.timeout.connect == 5.0
+
+
+def test_mistral_client_uses_transport_settings():
+    client = MistralClient(
+        token="token",
+        model="mistral-small-latest",
+        max_tokens=100,
+        system="sys",
+        debug=False,
+        transport={"connect_timeout": 2, "max_keepalive_connections": 4},
+    )
+    http_client = client.client.sdk_configuration.client
+
+    assert http_client.timeout.connect == 2
+    assert http_client is get_http_client(
+        "https://api.mistral.ai",
+        TransportSettings(connect_timeout=2, max_keepalive_connections=4),
+    )
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("h2") is not None, reason="h2 is installed"
+)
+def test_http2_without_h2_suggests_installing_it():
+    with pytest.raises(Exception, match="h2"):
+        get_http_client("https://c.example", TransportSettings(http2=True))